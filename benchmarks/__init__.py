@@ -0,0 +1 @@
+# Benchmarks (run from project root, e.g. python -m benchmarks.rasterize)
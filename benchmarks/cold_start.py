@@ -0,0 +1,211 @@
+"""
+Time to ready of a new API process, measured from spawning uvicorn until GET
+/health/ready returns 200, against a synthetic corpus and the fake OpenAI API:
+
+  ingest   empty vector store, INGEST_ON_STARTUP=true: ready once the first ingest is done
+  attach   the collection that run left, INGEST_ON_STARTUP=false: ready once it is
+           attached (repeated --runs times; also times the first /rag answer)
+
+It also reports how long importing src.app takes and which of the heavy optional
+modules (PyMuPDF, Tesseract, the pgvector integration) that import loads.
+
+Usage:
+    python -m benchmarks.cold_start [--out report.json] [--runs 5] [--text-pdfs 10] [--scanned-pdfs 2]
+                                    [--images 4] [--pages 3] [--database-url URL] [--timeout 600]
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import shutil
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.error
+import urllib.request
+from typing import Any, Dict, List, Optional
+
+from benchmarks.corpus import generate_corpus
+from benchmarks.fake_openai import FakeOpenAI
+
+_REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+_POLL_INTERVAL = 0.01
+_HEAVY_MODULES = ("fitz", "pytesseract", "PIL.Image", "pikepdf", "langchain_community.vectorstores.pgvector", "sqlalchemy", "chromadb")
+_IMPORT_PROBE = f"""
+import json, sys, time
+start = time.perf_counter()
+import src.app
+print(json.dumps({{
+    "seconds": round(time.perf_counter() - start, 4),
+    "heavy_modules_loaded": [m for m in {_HEAVY_MODULES!r} if m in sys.modules],
+}}))
+"""
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _env(args: argparse.Namespace, base_url: str, workdir: str, corpus_dir: str, ingest: bool) -> Dict[str, str]:
+    env = dict(os.environ)
+    env.update({
+        "OPENAI_API_KEY": "benchmark",
+        "OPENAI_BASE_URL": base_url,
+        "OPENAI_API_BASE": base_url,
+        "DOCS_DIR": corpus_dir,
+        "VECTOR_PERSIST_DIR": os.path.join(workdir, "vectors"),
+        "COLLECTION_NAME": "cold_start",
+        "DATABASE_URL": args.database_url,
+        "INGEST_ON_STARTUP": "true" if ingest else "false",
+        "ATTACH_ON_STARTUP": "true",
+        "ENCRYPTED_DOCS_DIR": "",
+        "EXPORT_OCR_TXT": "",
+        "OCR_CACHE_DIR": "",
+        "EMBEDDING_CACHE_PATH": "",
+        "ANSWER_CACHE_MAX_ENTRIES": "0",
+        "PYTHONPATH": os.pathsep.join(filter(None, [_REPO_ROOT, os.environ.get("PYTHONPATH")])),
+    })
+    return env
+
+
+def _get(url: str) -> int:
+    try:
+        with urllib.request.urlopen(url, timeout=5) as response:
+            return response.status
+    except urllib.error.HTTPError as exc:
+        return exc.code
+    except (urllib.error.URLError, ConnectionError):
+        return 0  # not listening yet
+
+
+def _post_rag(base: str) -> None:
+    body = json.dumps({"question": "Who must pay the monthly rent?", "bypass_cache": True}).encode("utf-8")
+    request = urllib.request.Request(f"{base}/rag", data=body, headers={"Content-Type": "application/json"})
+    with urllib.request.urlopen(request, timeout=60) as response:
+        response.read()
+
+
+def _start_server(env: Dict[str, str], timeout: float, log_path: str) -> Dict[str, Any]:
+    """Spawns uvicorn and waits until it is ready; returns time to ready and to the first /rag answer."""
+    port = _free_port()
+    base = f"http://127.0.0.1:{port}"
+    command = [sys.executable, "-m", "uvicorn", "src.app:app", "--host", "127.0.0.1", "--port", str(port)]
+    with open(log_path, "ab") as log:
+        start = time.perf_counter()
+        process = subprocess.Popen(command, env=env, cwd=_REPO_ROOT, stdout=log, stderr=subprocess.STDOUT)
+        try:
+            listening = None
+            while True:
+                if process.poll() is not None:
+                    raise RuntimeError(f"API exited with code {process.returncode}; see {log_path}")
+                if time.perf_counter() - start > timeout:
+                    raise RuntimeError(f"API not ready after {timeout}s; see {log_path}")
+                status = _get(f"{base}/health/ready")
+                if status and listening is None:
+                    listening = time.perf_counter() - start
+                if status == 200:
+                    break
+                time.sleep(_POLL_INTERVAL)
+            ready = time.perf_counter() - start
+            _post_rag(base)
+            answered = time.perf_counter() - start
+        finally:
+            process.terminate()
+            process.wait(timeout=30)
+    return {
+        "listening_s": round(listening, 4),
+        "ready_s": round(ready, 4),
+        "first_answer_s": round(answered, 4),
+    }
+
+
+def _summary(runs: List[Dict[str, Any]]) -> Dict[str, Any]:
+    summary: Dict[str, Any] = {"runs": len(runs)}
+    for key in ("listening_s", "ready_s", "first_answer_s"):
+        values = [run[key] for run in runs]
+        summary[f"{key}_median"] = round(statistics.median(values), 4)
+        summary[f"{key}_max"] = round(max(values), 4)
+    return summary
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True, cwd=_REPO_ROOT
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--out", help="Write the JSON report here as well as to stdout.")
+    parser.add_argument("--runs", type=int, default=5, help="Attach startups to time.")
+    parser.add_argument("--text-pdfs", type=int, default=10)
+    parser.add_argument("--scanned-pdfs", type=int, default=2)
+    parser.add_argument("--images", type=int, default=4)
+    parser.add_argument("--pages", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--dim", type=int, default=1536, help="Embedding size returned by the fake API.")
+    parser.add_argument("--database-url", default="", help="Benchmark pgvector instead of the local store.")
+    parser.add_argument("--timeout", type=float, default=600.0, help="Seconds to wait for a server to be ready.")
+    parser.add_argument("--keep", action="store_true", help="Keep the temporary work directory (and server logs).")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="ocr_rag_cold_start_")
+    log_path = os.path.join(workdir, "server.log")
+    server = FakeOpenAI(dim=args.dim).start()
+    try:
+        corpus_dir = os.path.join(workdir, "docs")
+        corpus = generate_corpus(corpus_dir, args.text_pdfs, args.scanned_pdfs, args.images, args.pages, args.seed)
+        env = _env(args, server.base_url, workdir, corpus_dir, ingest=False)
+
+        probe = subprocess.run(
+            [sys.executable, "-c", _IMPORT_PROBE], env=env, cwd=_REPO_ROOT, capture_output=True, text=True, check=True
+        )
+        import_report = json.loads(probe.stdout.strip().splitlines()[-1])
+        print(f"import src.app: {import_report['seconds']:.2f}s", file=sys.stderr, flush=True)
+
+        ingest = _start_server(_env(args, server.base_url, workdir, corpus_dir, ingest=True), args.timeout, log_path)
+        print(f"ingest: ready in {ingest['ready_s']:.2f}s", file=sys.stderr, flush=True)
+
+        attach_runs = []
+        for _ in range(args.runs):
+            attach_runs.append(_start_server(env, args.timeout, log_path))
+            print(f"attach: ready in {attach_runs[-1]['ready_s']:.2f}s", file=sys.stderr, flush=True)
+
+        report = {
+            "git_commit": _git_commit(),
+            "created_at": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "config": {k: v for k, v in vars(args).items() if k not in ("out", "database_url")},
+            "backend": "pgvector" if args.database_url else os.environ.get("VECTOR_BACKEND", "chroma"),
+            "corpus": corpus,
+            "import": import_report,
+            "ingest": ingest,
+            "attach": {**_summary(attach_runs), "samples": attach_runs},
+        }
+    finally:
+        server.stop()
+        if args.keep:
+            print(f"Work directory kept at {workdir}", file=sys.stderr)
+        else:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    output = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(output + "\n")
+    print(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""
+Compares two reports of benchmarks.run (e.g. the base commit and a change) stage by
+stage: throughput (higher is better), latency, time and peak RSS (lower is better).
+
+Usage:
+    python -m benchmarks.compare BASE.json NEW.json [--threshold 5]
+"""
+import argparse
+import json
+from typing import Any, Dict, List, Optional
+
+_METRICS = [
+    "pages_per_sec",
+    "chunks_per_sec",
+    "seconds",
+    "p50_ms",
+    "p95_ms",
+    "p99_ms",
+    "mean_ms",
+    "peak_rss_mb",
+]
+
+
+def _higher_is_better(metric: str) -> bool:
+    return metric.endswith("_per_sec")
+
+
+def compare(base: Dict[str, Any], new: Dict[str, Any], threshold: float = 5.0) -> List[Dict[str, Any]]:
+    """
+    One row per (stage, metric) present in both reports. change_pct is relative to base;
+    verdict is "better"/"worse" when the change exceeds threshold percent, otherwise "same".
+    """
+    rows = []
+    for stage, base_stage in base.get("stages", {}).items():
+        new_stage = new.get("stages", {}).get(stage)
+        if new_stage is None:
+            continue
+        for metric in _METRICS:
+            old, cur = base_stage.get(metric), new_stage.get(metric)
+            if old is None or cur is None:
+                continue
+            change: Optional[float] = (cur - old) / old * 100 if old else None
+            verdict = "same"
+            if change is not None and abs(change) > threshold:
+                improved = change > 0 if _higher_is_better(metric) else change < 0
+                verdict = "better" if improved else "worse"
+            rows.append({
+                "stage": stage,
+                "metric": metric,
+                "base": old,
+                "new": cur,
+                "change_pct": None if change is None else round(change, 1),
+                "verdict": verdict,
+            })
+    return rows
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("base")
+    parser.add_argument("new")
+    parser.add_argument("--threshold", type=float, default=5.0, help="Percent change reported as better/worse.")
+    parser.add_argument("--json", action="store_true", help="Print rows as JSON instead of a table.")
+    args = parser.parse_args()
+    with open(args.base, encoding="utf-8") as f:
+        base = json.load(f)
+    with open(args.new, encoding="utf-8") as f:
+        new = json.load(f)
+
+    rows = compare(base, new, args.threshold)
+    if args.json:
+        print(json.dumps({"base_commit": base.get("git_commit"), "new_commit": new.get("git_commit"), "rows": rows}, indent=2))
+        return
+    print(f"base {base.get('git_commit')}  new {new.get('git_commit')}")
+    for row in rows:
+        change = "n/a" if row["change_pct"] is None else f"{row['change_pct']:+.1f}%"
+        print(f"{row['stage']:<8} {row['metric']:<15} {row['base']:>12} {row['new']:>12} {change:>9}  {row['verdict']}")
+
+
+if __name__ == "__main__":
+    main()
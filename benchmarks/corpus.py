@@ -0,0 +1,132 @@
+"""
+Synthetic corpus for the ingest/query benchmarks: contract-like text PDFs, scanned PDFs
+(pages are images only, so they go through OCR) and standalone page images. Content is
+generated from a seed, so the same arguments always produce the same corpus.
+
+Usage:
+    python -m benchmarks.corpus OUT_DIR [--text-pdfs 20] [--scanned-pdfs 5] [--images 10] [--pages 5] [--seed 0]
+"""
+import argparse
+import json
+import os
+import random
+from typing import Dict, List
+
+import fitz
+
+_SUBJECTS = ["The lessee", "The lessor", "The contractor", "The client", "Each party", "The guarantor", "The supplier"]
+_VERBS = ["shall pay", "shall deliver", "must notify", "may terminate", "shall indemnify", "agrees to maintain"]
+_OBJECTS = [
+    "the monthly rent",
+    "written notice within thirty days",
+    "the insured premises",
+    "all outstanding invoices",
+    "the confidential information",
+    "the equipment described in Annex I",
+]
+_CONDITIONS = [
+    "unless otherwise agreed in writing",
+    "subject to clause {clause}",
+    "as provided in section {clause}",
+    "under penalty of a fine of {amount} reais",
+    "pursuant to case no. {case}",
+    "as registered under CNPJ {cnpj}",
+]
+_SCAN_DPI = 150
+
+
+def _sentence(rng: random.Random) -> str:
+    condition = rng.choice(_CONDITIONS).format(
+        clause=f"{rng.randint(1, 30)}.{rng.randint(1, 9)}",
+        amount=f"{rng.randint(1, 99)}.{rng.randint(100, 999)},00",
+        case=f"{rng.randint(1000000, 9999999)}-{rng.randint(10, 99)}.{rng.randint(2015, 2025)}",
+        cnpj=f"{rng.randint(10, 99)}.{rng.randint(100, 999)}.{rng.randint(100, 999)}/0001-{rng.randint(10, 99)}",
+    )
+    return f"{rng.choice(_SUBJECTS)} {rng.choice(_VERBS)} {rng.choice(_OBJECTS)}, {condition}."
+
+
+def page_text(rng: random.Random, sentences: int = 35) -> str:
+    clause = rng.randint(1, 40)
+    lines = [f"CLAUSE {clause} - OBLIGATIONS"]
+    lines.extend(_sentence(rng) for _ in range(sentences))
+    return "\n".join(lines)
+
+
+def _text_page(doc: fitz.Document, text: str) -> None:
+    page = doc.new_page()
+    page.insert_textbox(fitz.Rect(50, 50, page.rect.width - 50, page.rect.height - 50), text, fontsize=9)
+
+
+def _render(text: str) -> fitz.Pixmap:
+    """Grayscale raster of a text page, as a scanner would produce it."""
+    with fitz.open() as doc:
+        _text_page(doc, text)
+        return doc[0].get_pixmap(dpi=_SCAN_DPI, colorspace=fitz.csGRAY)
+
+
+def generate_corpus(
+    out_dir: str,
+    text_pdfs: int = 20,
+    scanned_pdfs: int = 5,
+    images: int = 10,
+    pages: int = 5,
+    seed: int = 0,
+) -> Dict[str, int]:
+    """Writes the corpus to out_dir and returns its file and page counts."""
+    rng = random.Random(seed)
+    os.makedirs(out_dir, exist_ok=True)
+    questions: List[str] = []
+
+    for i in range(text_pdfs):
+        with fitz.open() as doc:
+            for _ in range(pages):
+                text = page_text(rng)
+                questions.append(text.splitlines()[rng.randint(1, 10)])
+                _text_page(doc, text)
+            doc.save(os.path.join(out_dir, f"contract_{i:04d}.pdf"))
+
+    for i in range(scanned_pdfs):
+        with fitz.open() as doc:
+            for _ in range(pages):
+                pix = _render(page_text(rng))
+                page = doc.new_page(width=pix.width * 72 / _SCAN_DPI, height=pix.height * 72 / _SCAN_DPI)
+                page.insert_image(page.rect, pixmap=pix)
+            doc.save(os.path.join(out_dir, f"scan_{i:04d}.pdf"))
+
+    for i in range(images):
+        _render(page_text(rng)).save(os.path.join(out_dir, f"page_{i:04d}.png"))
+
+    with open(os.path.join(out_dir, "questions.json"), "w", encoding="utf-8") as f:
+        json.dump(questions, f)
+    return {
+        "text_pdfs": text_pdfs,
+        "scanned_pdfs": scanned_pdfs,
+        "images": images,
+        "pages": (text_pdfs + scanned_pdfs) * pages + images,
+    }
+
+
+def load_questions(corpus_dir: str) -> List[str]:
+    """Questions written with the corpus (sentences taken from text PDFs); empty for other folders."""
+    path = os.path.join(corpus_dir, "questions.json")
+    if not os.path.isfile(path):
+        return []
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("out_dir")
+    parser.add_argument("--text-pdfs", type=int, default=20)
+    parser.add_argument("--scanned-pdfs", type=int, default=5)
+    parser.add_argument("--images", type=int, default=10)
+    parser.add_argument("--pages", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    counts = generate_corpus(args.out_dir, args.text_pdfs, args.scanned_pdfs, args.images, args.pages, args.seed)
+    print(json.dumps({"out_dir": args.out_dir, **counts}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,203 @@
+"""
+Local stand-in for the OpenAI embeddings and chat completions endpoints, so ingest and
+/rag can be benchmarked without network, cost or rate limits. Embeddings are hashed
+bag-of-words vectors (deterministic, and similar texts get similar vectors); chat
+completions return a fixed answer, streamed or not. Latency per request is configurable
+to model the real API.
+
+Usage:
+    python -m benchmarks.fake_openai [--port 8100] [--dim 1536] [--embed-latency-ms 0] [--chat-latency-ms 0]
+
+Then point the API at it with OPENAI_BASE_URL=http://127.0.0.1:8100/v1 (and OPENAI_API_BASE
+for langchain-openai).
+"""
+import argparse
+import base64
+import hashlib
+import json
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Union
+
+import numpy as np
+
+ANSWER = "According to the documents, the obligation applies as stated in the cited clause."
+
+
+def embed_text(item: Union[str, List[int]], dim: int) -> np.ndarray:
+    """Unit vector of hashed tokens (words, or token ids when the client sends pre-tokenized input)."""
+    tokens = item.lower().split() if isinstance(item, str) else item
+    vector = np.zeros(dim, dtype=np.float32)
+    for token in tokens:
+        h = zlib.crc32(str(token).encode("utf-8"))
+        vector[h % dim] += 1.0 if h & 0x80000000 else -1.0
+    norm = float(np.linalg.norm(vector))
+    if norm == 0.0:
+        vector[0] = 1.0
+        return vector
+    return vector / norm
+
+
+def _usage(prompt_tokens: int, completion_tokens: int = 0) -> Dict[str, int]:
+    return {
+        "prompt_tokens": prompt_tokens,
+        "completion_tokens": completion_tokens,
+        "total_tokens": prompt_tokens + completion_tokens,
+    }
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server: "_Server"
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def log_message(self, format: str, *args: Any) -> None:  # noqa: A002
+        pass
+
+    def _json(self, status: int, body: Dict[str, Any]) -> None:
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_POST(self) -> None:  # noqa: N802
+        length = int(self.headers.get("Content-Length") or 0)
+        payload = json.loads(self.rfile.read(length) or b"{}")
+        path = self.path.rstrip("/")
+        if path.endswith("/embeddings"):
+            self._embeddings(payload)
+        elif path.endswith("/chat/completions"):
+            self._chat(payload)
+        else:
+            self._json(404, {"error": {"message": f"Unknown path {self.path}", "type": "invalid_request_error"}})
+
+    def _embeddings(self, payload: Dict[str, Any]) -> None:
+        time.sleep(self.server.embed_latency)
+        inputs = payload.get("input")
+        if isinstance(inputs, str) or (isinstance(inputs, list) and inputs and isinstance(inputs[0], int)):
+            inputs = [inputs]
+        dim = int(payload.get("dimensions") or self.server.dim)
+        as_base64 = payload.get("encoding_format") == "base64"
+        data = []
+        tokens = 0
+        for i, item in enumerate(inputs or []):
+            vector = embed_text(item, dim)
+            tokens += len(item.split()) if isinstance(item, str) else len(item)
+            embedding = base64.b64encode(vector.astype("<f4").tobytes()).decode("ascii") if as_base64 else vector.tolist()
+            data.append({"object": "embedding", "index": i, "embedding": embedding})
+        self.server.count("embeddings", len(data))
+        self._json(200, {"object": "list", "data": data, "model": payload.get("model", ""), "usage": _usage(tokens)})
+
+    def _chat(self, payload: Dict[str, Any]) -> None:
+        time.sleep(self.server.chat_latency)
+        self.server.count("chat_completions", 1)
+        model = payload.get("model", "")
+        completion_id = "chatcmpl-" + hashlib.sha1(json.dumps(payload.get("messages")).encode("utf-8")).hexdigest()[:24]
+        created = int(time.time())
+        if not payload.get("stream"):
+            self._json(200, {
+                "id": completion_id,
+                "object": "chat.completion",
+                "created": created,
+                "model": model,
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": ANSWER}, "finish_reason": "stop"}],
+                "usage": _usage(0, len(ANSWER.split())),
+            })
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        words = ANSWER.split(" ")
+        deltas = [{"role": "assistant", "content": ""}] + [{"content": (" " if i else "") + w} for i, w in enumerate(words)]
+        for i, delta in enumerate(deltas):
+            chunk = {
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": created,
+                "model": model,
+                "choices": [{"index": 0, "delta": delta, "finish_reason": "stop" if i == len(deltas) - 1 else None}],
+            }
+            self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode("utf-8"))
+        self.wfile.write(b"data: [DONE]\n\n")
+        self.wfile.flush()
+        self.close_connection = True
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, dim: int, embed_latency: float, chat_latency: float):
+        super().__init__(address, _Handler)
+        self.dim = dim
+        self.embed_latency = embed_latency
+        self.chat_latency = chat_latency
+        self.counts: Dict[str, int] = {"embeddings": 0, "chat_completions": 0}
+        self._lock = threading.Lock()
+
+    def count(self, key: str, n: int) -> None:
+        with self._lock:
+            self.counts[key] += n
+
+
+class FakeOpenAI:
+    """The fake API on a background thread; port 0 picks a free port."""
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        dim: int = 1536,
+        embed_latency_ms: float = 0.0,
+        chat_latency_ms: float = 0.0,
+    ):
+        self._server = _Server((host, port), dim, embed_latency_ms / 1000.0, chat_latency_ms / 1000.0)
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    @property
+    def counts(self) -> Dict[str, int]:
+        """Embedded inputs and chat completions served so far."""
+        return dict(self._server.counts)
+
+    def start(self) -> "FakeOpenAI":
+        self._thread = threading.Thread(target=self._server.serve_forever, name="fake-openai", daemon=True)
+        self._thread.start()
+        return self
+
+    def serve_forever(self) -> None:
+        self._server.serve_forever()
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8100)
+    parser.add_argument("--dim", type=int, default=1536)
+    parser.add_argument("--embed-latency-ms", type=float, default=0.0)
+    parser.add_argument("--chat-latency-ms", type=float, default=0.0)
+    args = parser.parse_args()
+    server = FakeOpenAI(args.host, args.port, args.dim, args.embed_latency_ms, args.chat_latency_ms)
+    print(f"Fake OpenAI API at {server.base_url}", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,183 @@
+"""
+Check of ingest coordination between API processes sharing one collection. Starts
+--processes API servers at once (as uvicorn --workers or replicas would) on the same
+store with INGEST_ON_STARTUP=true, against a synthetic corpus and the fake OpenAI API,
+and verifies that:
+
+  - exactly one process ingests; the others report their startup job as "skipped"
+    (or find nothing left to do), and every chunk was embedded once;
+  - every process becomes ready on the same collection version;
+  - after a document is added and one process is asked to ingest, every process
+    attaches the newly published version (reported as propagation lag).
+
+Exits with status 1 if a check fails.
+
+Usage:
+    python -m benchmarks.multi_worker [--processes 4] [--poll-seconds 0.5] [--database-url URL] [--out report.json]
+"""
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.error
+import urllib.request
+from typing import Any, Dict, List, Optional, Tuple
+
+from benchmarks.cold_start import _env, _free_port, _git_commit
+from benchmarks.corpus import generate_corpus
+from benchmarks.fake_openai import FakeOpenAI
+
+_REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+_POLL_INTERVAL = 0.05
+_JOB_ACTIVE = ("pending", "running")
+
+
+def _request(url: str, body: Optional[Dict[str, Any]] = None) -> Tuple[int, Dict[str, Any]]:
+    """HTTP status and JSON body of a GET (or POST with body); status 0 when not listening."""
+    data = json.dumps(body).encode("utf-8") if body is not None else None
+    method = "POST" if body is not None else "GET"
+    request = urllib.request.Request(url, data=data, method=method, headers={"Content-Type": "application/json"})
+    try:
+        with urllib.request.urlopen(request, timeout=60) as response:
+            return response.status, json.loads(response.read() or b"{}")
+    except urllib.error.HTTPError as exc:
+        return exc.code, json.loads(exc.read() or b"{}")
+    except (urllib.error.URLError, ConnectionError):
+        return 0, {}
+
+
+def _wait(condition, timeout: float, what: str) -> float:
+    start = time.perf_counter()
+    while not condition():
+        if time.perf_counter() - start > timeout:
+            raise RuntimeError(f"Timed out after {timeout}s waiting for {what}")
+        time.sleep(_POLL_INTERVAL)
+    return time.perf_counter() - start
+
+
+def _wait_job(base: str, job_id: str, timeout: float) -> Dict[str, Any]:
+    job: Dict[str, Any] = {}
+
+    def done() -> bool:
+        nonlocal job
+        job = _request(f"{base}/ingest/{job_id}")[1]
+        return job.get("status") not in _JOB_ACTIVE
+
+    _wait(done, timeout, f"ingest job {job_id}")
+    return job
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--out", help="Write the JSON report here as well as to stdout.")
+    parser.add_argument("--processes", type=int, default=4)
+    parser.add_argument("--poll-seconds", type=float, default=0.5, help="COLLECTION_POLL_SECONDS of the processes.")
+    parser.add_argument("--text-pdfs", type=int, default=6)
+    parser.add_argument("--scanned-pdfs", type=int, default=1)
+    parser.add_argument("--images", type=int, default=2)
+    parser.add_argument("--pages", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--dim", type=int, default=1536, help="Embedding size returned by the fake API.")
+    parser.add_argument("--database-url", default="", help="Coordinate on pgvector instead of the local store.")
+    parser.add_argument("--timeout", type=float, default=600.0)
+    parser.add_argument("--keep", action="store_true", help="Keep the temporary work directory (and server logs).")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="ocr_rag_multi_worker_")
+    fake = FakeOpenAI(dim=args.dim).start()
+    processes: List[subprocess.Popen] = []
+    checks: Dict[str, bool] = {}
+    try:
+        corpus_dir = os.path.join(workdir, "docs")
+        corpus = generate_corpus(corpus_dir, args.text_pdfs, args.scanned_pdfs, args.images, args.pages, args.seed)
+        env = _env(args, fake.base_url, workdir, corpus_dir, ingest=True)
+        env["COLLECTION_NAME"] = "multi_worker"
+        env["COLLECTION_POLL_SECONDS"] = str(args.poll_seconds)
+
+        bases = []
+        for i in range(args.processes):
+            port = _free_port()
+            bases.append(f"http://127.0.0.1:{port}")
+            log = open(os.path.join(workdir, f"server_{i}.log"), "wb")
+            command = [sys.executable, "-m", "uvicorn", "src.app:app", "--host", "127.0.0.1", "--port", str(port)]
+            processes.append(subprocess.Popen(command, env=env, cwd=_REPO_ROOT, stdout=log, stderr=subprocess.STDOUT))
+            log.close()
+
+        def all_ready() -> bool:
+            for process in processes:
+                if process.poll() is not None:
+                    raise RuntimeError(f"An API process exited with code {process.returncode}; see {workdir}")
+            return all(_request(f"{base}/health/ready")[0] == 200 for base in bases)
+
+        ready_s = _wait(all_ready, args.timeout, "all processes to be ready")
+        print(f"all {args.processes} processes ready in {ready_s:.2f}s", file=sys.stderr, flush=True)
+
+        ready = [_request(f"{base}/health/ready")[1] for base in bases]
+        jobs = [_wait_job(base, r["ingest_job"], args.timeout) for base, r in zip(bases, ready)]
+        embedded = fake.counts["embeddings"]
+        ingested = [job for job in jobs if job["status"] == "succeeded" and job["files_to_process"]]
+        checks["one_process_ingested"] = len(ingested) == 1
+        checks["others_skipped"] = all(
+            job["status"] == "skipped" or (job["status"] == "succeeded" and not job["files_to_process"])
+            for job in jobs
+            if job not in ingested
+        )
+        checks["chunks_embedded_once"] = bool(ingested) and embedded == ingested[0]["chunks_added"]
+        checks["same_version_everywhere"] = len({r["collection_version"] for r in ready}) == 1
+
+        # A new document, ingested by one process, must reach every process
+        extra_dir = os.path.join(workdir, "extra")
+        generate_corpus(extra_dir, 1, 0, 0, args.pages, args.seed + 1)
+        shutil.copy(os.path.join(extra_dir, "contract_0000.pdf"), os.path.join(corpus_dir, "added_0000.pdf"))
+        leader = bases[-1]
+        job = _wait_job(leader, _request(f"{leader}/ingest", {})[1]["job_id"], args.timeout)
+        checks["added_document_ingested"] = job["status"] == "succeeded" and job["files_to_process"] == 1
+        version = _request(f"{leader}/health/ready")[1]["collection_version"]
+        lag_s = _wait(
+            lambda: all(_request(f"{base}/health/ready")[1].get("collection_version") == version for base in bases),
+            args.timeout,
+            "every process to attach the new version",
+        )
+        checks["new_version_everywhere"] = True
+        print(f"new version attached everywhere {lag_s:.2f}s after the ingest finished", file=sys.stderr, flush=True)
+
+        question = {"question": "Who must pay the monthly rent?", "bypass_cache": True}
+        checks["every_process_answers"] = all(_request(f"{base}/rag", question)[0] == 200 for base in bases)
+
+        report = {
+            "git_commit": _git_commit(),
+            "config": {k: v for k, v in vars(args).items() if k not in ("out", "database_url")},
+            "backend": "pgvector" if args.database_url else os.environ.get("VECTOR_BACKEND", "chroma"),
+            "corpus": corpus,
+            "ready_s": round(ready_s, 3),
+            "startup_jobs": [{k: job[k] for k in ("status", "files_to_process", "chunks_added", "error")} for job in jobs],
+            "embedded_inputs": embedded,
+            "propagation_lag_s": round(lag_s, 3),
+            "checks": checks,
+        }
+    finally:
+        for process in processes:
+            process.terminate()
+        for process in processes:
+            process.wait(timeout=30)
+        fake.stop()
+        if args.keep:
+            print(f"Work directory kept at {workdir}", file=sys.stderr)
+        else:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    output = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(output + "\n")
+    print(output)
+    if not all(checks.values()):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""
+Micro-benchmark for page rasterization before OCR.
+
+Compares the old PNG round trip (pixmap -> PNG bytes -> PIL decode -> RGB) with the
+raw-samples paths in extraction_service, including the temp-file encoding pytesseract
+performs on the result. Each variant runs in a fresh process so that its peak RSS
+(which includes MuPDF and PIL native buffers) can be compared with an idle baseline.
+
+Usage:
+    python -m benchmarks.rasterize [--pdf path.pdf] [--pages 10] [--dpi 300]
+"""
+import argparse
+import io
+import json
+import os
+import multiprocessing
+import resource
+import statistics
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Dict
+
+os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+
+import fitz  # noqa: E402
+from PIL import Image  # noqa: E402
+
+from src.services.extraction_service import page_to_ocr_image, page_to_pil_image  # noqa: E402
+
+
+def _legacy_png_roundtrip(page: fitz.Page, dpi: int) -> Image.Image:
+    zoom = dpi / 72.0
+    pix = page.get_pixmap(matrix=fitz.Matrix(zoom, zoom), alpha=False)
+    img = Image.open(io.BytesIO(pix.tobytes("png")))
+    return img.convert("RGB")
+
+
+def _handoff(img: Image.Image) -> None:
+    """What pytesseract does before running tesseract: write the image in img.format (default PNG)."""
+    img.save(io.BytesIO(), format=img.format or "PNG")
+
+
+def _synthetic_pdf(pages: int) -> str:
+    path = os.path.join(tempfile.mkdtemp(prefix="bench_raster_"), "scan.pdf")
+    doc = fitz.open()
+    for i in range(pages):
+        page = doc.new_page()
+        for line in range(40):
+            page.insert_text((50, 60 + line * 18), f"Clause {i}.{line} The parties agree to the terms herein.")
+    doc.save(path)
+    return path
+
+
+VARIANTS: Dict[str, Callable[[fitz.Page, int], Image.Image]] = {
+    "png_roundtrip_rgb": _legacy_png_roundtrip,
+    "raw_samples_rgb": lambda page, dpi: page_to_pil_image(page, dpi=dpi),
+    "raw_samples_gray": lambda page, dpi: page_to_ocr_image(page, dpi=dpi),
+}
+
+
+def _peak_rss_mb() -> float:
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024  # KiB on Linux
+
+
+def _measure(pdf_path: str, dpi: int, variant: str, pages: int) -> Dict[str, float]:
+    """Runs in a child process; variant "baseline" only opens the document."""
+    timings = []
+    with fitz.open(pdf_path) as doc:
+        baseline_rss = _peak_rss_mb()
+        if variant == "baseline":
+            return {"peak_rss_mb": round(baseline_rss, 1)}
+        fn = VARIANTS[variant]
+        for index in range(min(pages, len(doc))):
+            start = time.perf_counter()
+            _handoff(fn(doc[index], dpi))
+            timings.append(time.perf_counter() - start)
+    return {
+        "pages": len(timings),
+        "ms_per_page_mean": round(statistics.mean(timings) * 1000, 2),
+        "ms_per_page_p50": round(statistics.median(timings) * 1000, 2),
+        "peak_rss_mb": round(_peak_rss_mb(), 1),
+        "peak_rss_over_baseline_mb": round(_peak_rss_mb() - baseline_rss, 1),
+    }
+
+
+def _measure_isolated(pdf_path: str, dpi: int, variant: str, pages: int) -> Dict[str, float]:
+    ctx = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=1, mp_context=ctx) as pool:
+        return pool.submit(_measure, pdf_path, dpi, variant, pages).result()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pdf", help="PDF to render (default: synthetic text PDF)")
+    parser.add_argument("--pages", type=int, default=10)
+    parser.add_argument("--dpi", type=int, default=300)
+    args = parser.parse_args()
+
+    pdf_path = args.pdf or _synthetic_pdf(args.pages)
+    results = {
+        variant: _measure_isolated(pdf_path, args.dpi, variant, args.pages)
+        for variant in ["baseline", *VARIANTS]
+    }
+    print(json.dumps({"pdf": pdf_path, "dpi": args.dpi, "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,284 @@
+"""
+End-to-end benchmark of ingestion and querying against a synthetic corpus and a local
+fake OpenAI API (benchmarks.fake_openai), so runs are reproducible and free. Stages:
+
+  load     load_all_documents (extraction + OCR)       pages/s
+  chunk    chunk_documents                             chunks/s
+  index    build_vectorstore (embed + write)           chunks/s
+  ingest   run_ingest on the same folder (production path, manifest rebuild)
+  answer   answer_with_rag, sequential                 p50/p95/p99 latency
+  rag      POST /rag through the FastAPI app           p50/p95/p99 latency
+
+Each stage also reports peak RSS while it ran. Caches (OCR, embeddings, answers) are
+disabled so each run does the full work. The JSON report is meant to be kept per commit
+and compared with benchmarks.compare.
+
+Usage:
+    python -m benchmarks.run [--out report.json] [--text-pdfs 20] [--scanned-pdfs 5] [--images 10] [--pages 5]
+                             [--queries 50] [--embed-latency-ms 0] [--chat-latency-ms 0] [--corpus DIR]
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import resource
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+from benchmarks.corpus import generate_corpus, load_questions
+from benchmarks.fake_openai import FakeOpenAI
+
+_RSS_INTERVAL = 0.01
+_DEFAULT_QUESTIONS = [
+    "Who must pay the monthly rent?",
+    "What fine applies for late delivery?",
+    "Which party may terminate the contract?",
+    "What notice is required before termination?",
+    "Who indemnifies the confidential information?",
+]
+
+
+def _current_rss() -> Optional[int]:
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def _max_rss() -> int:
+    """Process peak RSS in bytes (ru_maxrss is KiB on Linux, bytes on macOS)."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+class _RSSSampler:
+    """
+    Samples RSS on a background thread so each stage gets its own peak; ru_maxrss alone only
+    ever grows, which hides the peak of any stage after the largest one. Without /proc the
+    process-wide ru_maxrss is reported instead.
+    """
+
+    def __init__(self) -> None:
+        self._peak = 0
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.available = _current_rss() is not None
+
+    def start(self) -> None:
+        if self.available:
+            self._thread = threading.Thread(target=self._run, name="rss-sampler", daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _run(self) -> None:
+        while not self._stop.wait(_RSS_INTERVAL):
+            self._sample()
+
+    def _sample(self) -> None:
+        rss = _current_rss() or 0
+        with self._lock:
+            self._peak = max(self._peak, rss)
+
+    def reset(self) -> None:
+        with self._lock:
+            self._peak = _current_rss() or 0
+
+    def peak(self) -> int:
+        if not self.available:
+            return _max_rss()
+        self._sample()
+        with self._lock:
+            return self._peak
+
+
+@contextmanager
+def _stage(report: Dict[str, Any], name: str, rss: _RSSSampler) -> Iterator[Dict[str, Any]]:
+    result: Dict[str, Any] = {}
+    rss.reset()
+    start = time.perf_counter()
+    yield result
+    result["seconds"] = round(time.perf_counter() - start, 4)
+    result["peak_rss_mb"] = round(rss.peak() / (1024 * 1024), 1)
+    report["stages"][name] = result
+    print(f"{name}: {result['seconds']:.2f}s", file=sys.stderr, flush=True)
+
+
+def _percentiles(latencies: List[float]) -> Dict[str, float]:
+    ms = sorted(x * 1000 for x in latencies)
+    cuts = statistics.quantiles(ms, n=100, method="inclusive") if len(ms) > 1 else ms * 99
+    return {
+        "queries": len(ms),
+        "p50_ms": round(cuts[49], 2),
+        "p95_ms": round(cuts[94], 2),
+        "p99_ms": round(cuts[98], 2),
+        "mean_ms": round(statistics.fmean(ms), 2),
+    }
+
+
+def _timed(fn: Callable[[str], Any], questions: List[str]) -> List[float]:
+    latencies = []
+    for question in questions:
+        start = time.perf_counter()
+        fn(question)
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _configure_env(args: argparse.Namespace, base_url: str, workdir: str, corpus_dir: str) -> None:
+    """Must run before src is imported: SETTINGS is read once at import."""
+    os.environ.update({
+        "OPENAI_API_KEY": "benchmark",
+        "OPENAI_BASE_URL": base_url,
+        "OPENAI_API_BASE": base_url,
+        "DOCS_DIR": corpus_dir,
+        "VECTOR_PERSIST_DIR": os.path.join(workdir, "vectors"),
+        "COLLECTION_NAME": "benchmark",
+        "DATABASE_URL": args.database_url,
+        "INGEST_ON_STARTUP": "false",
+        "ENCRYPTED_DOCS_DIR": "",
+        "EXPORT_OCR_TXT": "",
+        "OCR_CACHE_DIR": "",
+        "EMBEDDING_CACHE_PATH": "",
+        "ANSWER_CACHE_MAX_ENTRIES": "0",
+    })
+
+
+def _run(args: argparse.Namespace, corpus_dir: str, corpus: Dict[str, Any]) -> Dict[str, Any]:
+    from fastapi.testclient import TestClient
+
+    import src.app as app_module
+    from src.core.constants import RAG_TOP_K
+    from src.models import SETTINGS
+    from src.services import answer_with_rag, build_vectorstore, chunk_documents, load_all_documents, run_ingest
+
+    report: Dict[str, Any] = {
+        "git_commit": _git_commit(),
+        "created_at": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "config": {k: v for k, v in vars(args).items() if k not in ("out", "database_url")},
+        "backend": "pgvector" if SETTINGS.use_postgres else SETTINGS.vector_backend,
+        "corpus": corpus,
+        "stages": {},
+    }
+    rss = _RSSSampler()
+    rss.start()
+    try:
+        with _stage(report, "load", rss) as result:
+            docs = load_all_documents(corpus_dir, ocr_language=SETTINGS.ocr_language)
+        result["pages"] = len(docs)
+        result["pages_per_sec"] = round(len(docs) / result["seconds"], 2) if result["seconds"] else None
+
+        with _stage(report, "chunk", rss) as result:
+            chunks = chunk_documents(docs)
+        result["chunks"] = len(chunks)
+        result["chunks_per_sec"] = round(len(chunks) / result["seconds"], 2) if result["seconds"] else None
+
+        with _stage(report, "index", rss) as result:
+            vectorstore = build_vectorstore(chunks)
+        result["chunks"] = len(chunks)
+        result["chunks_per_sec"] = round(len(chunks) / result["seconds"], 2) if result["seconds"] else None
+
+        if not args.skip_ingest:
+            with _stage(report, "ingest", rss) as result:
+                ingest = run_ingest(corpus_dir, ocr_language=SETTINGS.ocr_language)
+            result.update(
+                pages=ingest.stats.pages,
+                chunks=ingest.stats.chunks_added,
+                pages_per_sec=round(ingest.stats.pages / result["seconds"], 2) if result["seconds"] else None,
+                chunks_per_sec=round(ingest.stats.chunks_added / result["seconds"], 2) if result["seconds"] else None,
+            )
+            vectorstore = ingest.vectorstore
+
+        questions = load_questions(corpus_dir) or _DEFAULT_QUESTIONS
+        questions = [questions[i % len(questions)] for i in range(args.queries)]
+
+        with _stage(report, "answer", rss) as result:
+            latencies = _timed(lambda q: answer_with_rag(vectorstore, q, k=RAG_TOP_K), questions)
+        result.update(_percentiles(latencies))
+
+        app_module.VECTORSTORE = vectorstore
+        client = TestClient(app_module.app)
+
+        def post_rag(question: str) -> None:
+            response = client.post("/rag", json={"question": question, "bypass_cache": True})
+            response.raise_for_status()
+
+        post_rag(questions[0])  # first request pays for the event loop and client setup
+        with _stage(report, "rag", rss) as result:
+            latencies = _timed(post_rag, questions)
+        result.update(_percentiles(latencies))
+    finally:
+        rss.stop()
+    return report
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--out", help="Write the JSON report here as well as to stdout.")
+    parser.add_argument("--corpus", help="Use this folder instead of generating a synthetic corpus.")
+    parser.add_argument("--text-pdfs", type=int, default=20)
+    parser.add_argument("--scanned-pdfs", type=int, default=5)
+    parser.add_argument("--images", type=int, default=10)
+    parser.add_argument("--pages", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("--dim", type=int, default=1536, help="Embedding size returned by the fake API.")
+    parser.add_argument("--embed-latency-ms", type=float, default=0.0)
+    parser.add_argument("--chat-latency-ms", type=float, default=0.0)
+    parser.add_argument("--skip-ingest", action="store_true", help="Skip the run_ingest stage.")
+    parser.add_argument("--database-url", default="", help="Benchmark pgvector instead of the local store.")
+    parser.add_argument("--keep", action="store_true", help="Keep the temporary work directory.")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="ocr_rag_bench_")
+    server = FakeOpenAI(dim=args.dim, embed_latency_ms=args.embed_latency_ms, chat_latency_ms=args.chat_latency_ms).start()
+    try:
+        corpus_dir = args.corpus or os.path.join(workdir, "docs")
+        if args.corpus:
+            corpus = {"path": args.corpus}
+        else:
+            corpus = generate_corpus(corpus_dir, args.text_pdfs, args.scanned_pdfs, args.images, args.pages, args.seed)
+        _configure_env(args, server.base_url, workdir, corpus_dir)
+        report = _run(args, corpus_dir, corpus)
+        report["fake_api_calls"] = server.counts
+    finally:
+        server.stop()
+        if args.keep:
+            print(f"Work directory kept at {workdir}", file=sys.stderr)
+        else:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    output = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(output + "\n")
+    print(output)
+
+
+if __name__ == "__main__":
+    main()
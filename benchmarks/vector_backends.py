@@ -0,0 +1,163 @@
+"""
+Benchmark of the local vector store backends: Chroma and the memory-mapped NumPy store
+(float32, float16, int8, each exact and with an IVF index).
+
+Vectors are synthetic unit embeddings drawn around random topic centres, so the IVF
+lists have structure to exploit, as real document embeddings do. Recall@k is measured
+against exact float64 cosine search. Open time is measured on a fresh handle to the
+persisted collection, which is what startup and reload pay.
+
+Usage:
+    python -m benchmarks.vector_backends [--rows 100000] [--dim 1536] [--queries 200] [--k 10]
+"""
+import argparse
+import json
+import os
+import shutil
+import statistics
+import tempfile
+import time
+from typing import Any, Callable, Dict, List
+
+os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+
+import numpy as np  # noqa: E402
+from langchain_core.embeddings import Embeddings  # noqa: E402
+
+from src.services.numpy_store_service import NumpyVectorStore  # noqa: E402
+
+_LOAD_BATCH = 5000
+
+
+class _NoEmbeddings(Embeddings):
+    """Vectors are supplied directly; nothing should be embedded."""
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        raise NotImplementedError
+
+    def embed_query(self, text: str) -> List[float]:
+        raise NotImplementedError
+
+
+def _synthetic(rows: int, dim: int, queries: int, seed: int = 0) -> Dict[str, np.ndarray]:
+    rng = np.random.default_rng(seed)
+    centres = rng.standard_normal((max(8, rows // 500), dim)).astype(np.float32)
+    data = centres[rng.integers(len(centres), size=rows)] + 0.6 * rng.standard_normal((rows, dim)).astype(np.float32)
+    picks = rng.integers(rows, size=queries)
+    query = data[picks] + 0.3 * rng.standard_normal((queries, dim)).astype(np.float32)
+    data /= np.linalg.norm(data, axis=1, keepdims=True)
+    query /= np.linalg.norm(query, axis=1, keepdims=True)
+    return {"data": data, "queries": query}
+
+
+def _ground_truth(data: np.ndarray, queries: np.ndarray, k: int) -> List[set]:
+    truth = []
+    for query in queries:
+        scores = data.astype(np.float64) @ query.astype(np.float64)
+        truth.append(set(np.argpartition(-scores, k - 1)[:k].tolist()))
+    return truth
+
+
+def _time_queries(search: Callable[[List[float]], List[int]], queries: np.ndarray, truth: List[set], k: int) -> Dict[str, float]:
+    search(queries[0].tolist())  # warm-up (page cache, lazy init)
+    latencies, hits = [], 0
+    for query, expected in zip(queries, truth):
+        start = time.perf_counter()
+        found = search(query.tolist())
+        latencies.append(time.perf_counter() - start)
+        hits += len(expected.intersection(found))
+    latencies.sort()
+    return {
+        "query_ms_p50": round(statistics.median(latencies) * 1000, 3),
+        "query_ms_p95": round(latencies[int(0.95 * (len(latencies) - 1))] * 1000, 3),
+        f"recall_at_{k}": round(hits / (k * len(queries)), 4),
+    }
+
+
+def _bench_numpy(base: str, data: np.ndarray, queries: np.ndarray, truth: List[set], k: int, dtype: str, ivf: bool) -> Dict[str, Any]:
+    directory = os.path.join(base, f"numpy_{dtype}_{'ivf' if ivf else 'exact'}")
+    ivf_min_rows = 1 if ivf else 0
+    store = NumpyVectorStore(directory, _NoEmbeddings(), dtype=dtype, ivf_min_rows=ivf_min_rows)
+    start = time.perf_counter()
+    for offset in range(0, len(data), _LOAD_BATCH):
+        block = data[offset:offset + _LOAD_BATCH]
+        ids = [str(i) for i in range(offset, offset + len(block))]
+        store.add_embeddings(ids, block, [{} for _ in ids], ids)
+    load_seconds = time.perf_counter() - start
+    start = time.perf_counter()
+    if ivf:
+        store.optimize()
+    build_seconds = time.perf_counter() - start
+    store.close()
+
+    start = time.perf_counter()
+    store = NumpyVectorStore(directory, _NoEmbeddings(), dtype=dtype, ivf_min_rows=ivf_min_rows)
+    open_ms = (time.perf_counter() - start) * 1000
+    result = _time_queries(
+        lambda q: [int(d.metadata["chunk_id"]) for d, _ in store.similarity_search_with_score_by_vector(q, k)],
+        queries,
+        truth,
+        k,
+    )
+    store.close()
+    return {
+        "load_seconds": round(load_seconds, 2),
+        "index_build_seconds": round(build_seconds, 2),
+        "open_ms": round(open_ms, 2),
+        **result,
+    }
+
+
+def _bench_chroma(base: str, data: np.ndarray, queries: np.ndarray, truth: List[set], k: int) -> Dict[str, Any]:
+    import chromadb
+
+    directory = os.path.join(base, "chroma")
+    client = chromadb.PersistentClient(path=directory)
+    collection = client.get_or_create_collection("bench", metadata={"hnsw:space": "cosine"})
+    start = time.perf_counter()
+    for offset in range(0, len(data), _LOAD_BATCH):
+        block = data[offset:offset + _LOAD_BATCH]
+        collection.add(ids=[str(i) for i in range(offset, offset + len(block))], embeddings=block.tolist())
+    load_seconds = time.perf_counter() - start
+    del collection, client
+
+    start = time.perf_counter()
+    collection = chromadb.PersistentClient(path=directory).get_collection("bench")
+    collection.query(query_embeddings=[queries[0].tolist()], n_results=k)  # HNSW segment loads on first query
+    open_ms = (time.perf_counter() - start) * 1000
+    result = _time_queries(
+        lambda q: [int(i) for i in collection.query(query_embeddings=[q], n_results=k, include=[])["ids"][0]],
+        queries,
+        truth,
+        k,
+    )
+    return {"load_seconds": round(load_seconds, 2), "open_ms": round(open_ms, 2), **result}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--dim", type=int, default=1536)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--skip-chroma", action="store_true")
+    args = parser.parse_args()
+
+    sets = _synthetic(args.rows, args.dim, args.queries)
+    truth = _ground_truth(sets["data"], sets["queries"], args.k)
+    base = tempfile.mkdtemp(prefix="bench_vectors_")
+    results: Dict[str, Any] = {}
+    try:
+        if not args.skip_chroma:
+            results["chroma"] = _bench_chroma(base, sets["data"], sets["queries"], truth, args.k)
+        for dtype in ("float32", "float16", "int8"):
+            for ivf in (False, True):
+                name = f"numpy_{dtype}{'_ivf' if ivf else ''}"
+                results[name] = _bench_numpy(base, sets["data"], sets["queries"], truth, args.k, dtype, ivf)
+    finally:
+        shutil.rmtree(base, ignore_errors=True)
+    print(json.dumps({"rows": args.rows, "dim": args.dim, "queries": args.queries, "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
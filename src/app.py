@@ -1,53 +1,89 @@
+import asyncio
+import json
 import os
+import secrets
+import threading
+import time
 import traceback
 from contextlib import asynccontextmanager
-from typing import Dict, Optional, Union
+from typing import Any, AsyncIterator, Dict, List, Optional
 
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, Header, HTTPException, Query, Request
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 from openai import RateLimitError
-from langchain_community.vectorstores.chroma import Chroma
-from langchain_community.vectorstores.pgvector import PGVector
 
-from src.core.constants import APP_NAME, RAG_TOP_K
+from src.core.constants import APP_NAME, PROFILE_MAX_SECONDS, RAG_TIMING_HEADER, RAG_TOP_K
 from src.core.logging import configure_logging, get_logger
+from src.core.metrics import MetricsMiddleware, render_metrics
 from src.models import SETTINGS
-from src.schemas import RAGRequest, RAGResponse
+from src.schemas import (
+    IngestJobResponse,
+    RAGBatchItem,
+    RAGBatchRequest,
+    RAGBatchResponse,
+    RAGRequest,
+    RAGResponse,
+)
 from src.services import (
-    DecryptionService,
-    answer_with_rag,
-    build_vectorstore,
-    chunk_documents,
-    export_documents_to_txt,
-    load_all_documents,
+    AnyVectorStore,
+    IngestJob,
+    IngestJobManager,
+    IngestResult,
+    IngestStats,
+    aanswer_with_rag,
+    abatch_answer_with_rag,
+    aclose_http_clients,
+    astream_answer_with_rag,
+    attach_vectorstore,
+    attached_version,
+    close_pools,
+    collapsed_stacks,
+    collection_version,
+    CollectionFollower,
+    DocsWatcher,
+    get_answer_cache,
+    ingest_leadership,
+    publish_collection_version,
+    reload_lexical_index,
+    sample_stacks,
+    server_timing_header,
+    set_attached_version,
+    start_request_timings,
 )
 
 configure_logging()
 logger = get_logger(APP_NAME)
 
-VECTORSTORE: Optional[Union[PGVector, Chroma]] = None
+VECTORSTORE: Optional[AnyVectorStore] = None
+WATCHER: Optional[DocsWatcher] = None
+_INGEST_MUTEX = threading.Lock()  # one ingest at a time in this process (jobs and the DOCS_DIR watcher)
 
 
-def startup_ingest() -> None:
-    global VECTORSTORE
+def startup_ingest(stats: Optional[IngestStats] = None) -> None:
+    """Ingests DOCS_DIR; raises IngestLockBusy if another process sharing the collection is ingesting."""
+    with _INGEST_MUTEX, ingest_leadership():
+        _ingest(stats)
+
+
+def _ingest(stats: Optional[IngestStats]) -> None:
+    # Extraction and OCR load here, on the first ingest, not when the API starts
+    from src.services import DecryptionService, export_documents_to_txt, load_all_documents, run_ingest
 
     docs_dir = SETTINGS.docs_dir
     if SETTINGS.use_batch_decryption:
-        decrypted = DecryptionService().decrypt_pdfs_batch()
-        if decrypted:
+        results = DecryptionService().decrypt_pdfs_batch()
+        if any(result.ok for result in results):
             docs_dir = SETTINGS.decrypted_docs_dir
             logger.info("Batch decryption: loading from %s", docs_dir)
 
-    docs = load_all_documents(docs_dir, ocr_language=SETTINGS.ocr_language)
-
     if SETTINGS.export_only:
+        docs = load_all_documents(docs_dir, ocr_language=SETTINGS.ocr_language)
         export_documents_to_txt(docs, SETTINGS.export_ocr_txt)
         logger.info("Export-only mode: OCR text written to %s. Skipping vector store (no OpenAI).", SETTINGS.export_ocr_txt)
         return
 
-    chunks = chunk_documents(docs)
-
     try:
-        VECTORSTORE = build_vectorstore(chunks)
+        result = run_ingest(docs_dir, ocr_language=SETTINGS.ocr_language, stats=stats)
     except RateLimitError as exc:
         logger.error(
             "OpenAI quota exceeded (no balance or rate limit). "
@@ -56,25 +92,137 @@ def startup_ingest() -> None:
         raise RuntimeError(
             "OpenAI quota exceeded. Add credits at https://platform.openai.com/account/billing"
         ) from exc
+    _apply_ingest(result)
+
+
+def _ingest_changed(paths: List[str]) -> None:
+    """DocsWatcher callback: syncs the files of DOCS_DIR that changed."""
+    from src.services import run_ingest
 
+    with _INGEST_MUTEX, ingest_leadership():
+        _apply_ingest(run_ingest(SETTINGS.docs_dir, ocr_language=SETTINGS.ocr_language, paths=paths))
+
+
+def _apply_ingest(result: IngestResult) -> None:
+    global VECTORSTORE
+    # Swap only once the collection is complete; /rag serves the previous store until then
+    VECTORSTORE = result.vectorstore
+    stats = result.stats
+    if stats.files_to_process or stats.files_deleted:
+        answer_cache = get_answer_cache()
+        if answer_cache is not None:
+            answer_cache.clear()
+        publish_collection_version()
     logger.info(
-        "Ingested %s pages, %s chunks into '%s'.",
-        len(docs),
-        len(chunks),
+        "Ingested %s pages (%s blank skipped), %s chunks (%s near-duplicates collapsed) into '%s' (%s files changed, %s unchanged, %s deleted; %s stale chunks removed).",
+        stats.pages,
+        stats.blank_pages_skipped,
+        stats.chunks_added,
+        stats.chunks_deduplicated,
         SETTINGS.collection_name,
+        stats.files_to_process,
+        stats.files_unchanged,
+        stats.files_deleted,
+        stats.chunks_deleted,
+    )
+
+
+def _run_ingest_job(job: IngestJob) -> None:
+    startup_ingest(job.stats)
+
+
+def _attach_published(version: str) -> bool:
+    """CollectionFollower callback: serves the collection version another process published."""
+    global VECTORSTORE
+    vectorstore = attach_vectorstore(reload=True)
+    if vectorstore is None:
+        return False
+    VECTORSTORE = vectorstore
+    reload_lexical_index()
+    answer_cache = get_answer_cache()
+    if answer_cache is not None:
+        answer_cache.clear()
+    return True
+
+
+INGEST_JOBS = IngestJobManager(_run_ingest_job)
+
+
+def _job_response(job: IngestJob) -> IngestJobResponse:
+    stats = job.stats
+    return IngestJobResponse(
+        job_id=job.job_id,
+        status=job.status,
+        files_total=stats.files_total,
+        files_to_process=stats.files_to_process,
+        files_done=stats.files_done,
+        files_unchanged=stats.files_unchanged,
+        files_deleted=stats.files_deleted,
+        pages=stats.pages,
+        blank_pages_skipped=stats.blank_pages_skipped,
+        chunks_added=stats.chunks_added,
+        chunks_deduplicated=stats.chunks_deduplicated,
+        dedup_chars_saved=stats.dedup.chars_saved,
+        chunks_deleted=stats.chunks_deleted,
+        elapsed_seconds=round(stats.elapsed_seconds, 3),
+        pages_per_second=round(stats.pages_per_second, 3),
+        chunks_per_second=round(stats.chunks_per_second, 3),
+        error=job.error,
     )
 
 
 @asynccontextmanager
 async def lifespan(_: FastAPI):
+    global VECTORSTORE, WATCHER
+
+    if SETTINGS.attach_on_startup and not SETTINGS.export_only:
+        start = time.perf_counter()
+        version = collection_version()  # read first, so a version published meanwhile is picked up later
+        try:
+            VECTORSTORE = attach_vectorstore()
+        except Exception as exc:
+            logger.warning("Could not attach to collection '%s'. Error=%s", SETTINGS.collection_name, exc)
+        if VECTORSTORE is not None:
+            set_attached_version(version)
+            logger.info(
+                "Attached to collection '%s' in %.3fs; serving /rag",
+                SETTINGS.collection_name,
+                time.perf_counter() - start,
+            )
+        else:
+            logger.info("No complete collection '%s' to attach to", SETTINGS.collection_name)
+    if SETTINGS.watch_docs and SETTINGS.use_batch_decryption:
+        logger.warning("WATCH_DOCS is not supported with ENCRYPTED_DOCS_DIR; not watching %s", SETTINGS.docs_dir)
+    elif SETTINGS.watch_docs and not SETTINGS.export_only:
+        # Started before the startup ingest, so files added while it runs are not missed
+        WATCHER = DocsWatcher(
+            SETTINGS.docs_dir,
+            _ingest_changed,
+            debounce=SETTINGS.watch_debounce_seconds,
+            interval=SETTINGS.watch_poll_seconds,
+            polling=SETTINGS.watch_polling,
+        ).start()
     if SETTINGS.ingest_on_startup:
-        startup_ingest()
+        job = INGEST_JOBS.submit()
+        logger.info("Startup ingestion running in background as job %s", job.job_id)
     else:
         logger.info("INGEST_ON_STARTUP=false -> Skipping ingestion")
+    follower = None
+    if SETTINGS.coordinate_ingest and SETTINGS.collection_poll_seconds > 0 and not SETTINGS.export_only:
+        follower = CollectionFollower(_attach_published, SETTINGS.collection_poll_seconds).start()
     yield
+    if WATCHER is not None:
+        WATCHER.stop()
+        WATCHER = None
+    if follower is not None:
+        follower.stop()
+    INGEST_JOBS.shutdown()
+    await aclose_http_clients()
+    close_pools()
 
 
 app = FastAPI(title="OCR RAG API", lifespan=lifespan)
+app.add_middleware(MetricsMiddleware)
 
 
 @app.get("/health")
@@ -82,17 +230,88 @@ def health() -> Dict[str, str]:
     return {"status": "ok", "collection": SETTINGS.collection_name}
 
 
-@app.post("/rag", response_model=RAGResponse)
-def rag(request_body: RAGRequest) -> RAGResponse:
+@app.get("/health/live")
+def health_live() -> Dict[str, str]:
+    """Liveness: the process is up and serving, regardless of ingestion."""
+    return {"status": "ok"}
+
+
+@app.get("/health/ready")
+def health_ready() -> JSONResponse:
+    """Readiness: a vector store is attached and /rag can answer."""
+    job = INGEST_JOBS.latest()
+    body = {
+        "status": "ready" if VECTORSTORE is not None else "not_ready",
+        "collection": SETTINGS.collection_name,
+        "ingest_job": job.job_id if job else None,
+        "ingest_status": job.status if job else None,
+        "collection_version": attached_version(),
+    }
+    return JSONResponse(body, status_code=200 if VECTORSTORE is not None else 503)
+
+
+@app.get("/metrics")
+def metrics() -> Response:
+    """Prometheus exposition of the stage timings, queue depths and in-flight requests."""
+    rendered = render_metrics()
+    if rendered is None:
+        raise HTTPException(status_code=404, detail="Metrics disabled: install prometheus-client.")
+    body, content_type = rendered
+    return Response(content=body, media_type=content_type)
+
+
+@app.post("/ingest", response_model=IngestJobResponse, status_code=202)
+def start_ingest() -> IngestJobResponse:
+    """Starts a background ingest (or returns the one already running)."""
+    return _job_response(INGEST_JOBS.submit())
+
+
+@app.get("/ingest/watch")
+def ingest_watch_status() -> Dict[str, Any]:
+    """DOCS_DIR watcher: files waiting to be ingested (queue_depth), age of the oldest (lag_seconds)."""
+    if WATCHER is None:
+        return {"enabled": False}
+    return WATCHER.status()
+
+
+@app.get("/ingest/{job_id}", response_model=IngestJobResponse)
+def ingest_status(job_id: str) -> IngestJobResponse:
+    job = INGEST_JOBS.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Unknown ingest job.")
+    return _job_response(job)
+
+
+def _rag_question(request_body: RAGRequest) -> str:
     if VECTORSTORE is None:
         raise HTTPException(status_code=500, detail="Vector store not initialized.")
 
     question = (request_body.question or "").strip()
     if not question:
         raise HTTPException(status_code=400, detail="Missing 'question' in JSON body.")
+    return question
+
+
+@app.post("/rag", response_model=RAGResponse)
+async def rag(request_body: RAGRequest, request: Request, response: Response) -> RAGResponse:
+    """Send X-RAG-Timing: true to get a Server-Timing header with embed/retrieve/context/llm durations."""
+    question = _rag_question(request_body)
+    timed = request.headers.get(RAG_TIMING_HEADER, "").lower() in ("1", "true")
+    timings = start_request_timings() if timed else None
+    start = time.perf_counter()
 
     try:
-        result = answer_with_rag(VECTORSTORE, question, k=RAG_TOP_K)
+        result = await aanswer_with_rag(
+            VECTORSTORE,
+            question,
+            k=RAG_TOP_K,
+            cache=get_answer_cache(),
+            bypass_cache=request_body.bypass_cache,
+            mode=request_body.retrieval_mode,
+        )
+        if timings is not None:
+            timings["total"] = time.perf_counter() - start
+            response.headers["Server-Timing"] = server_timing_header(timings)
         return RAGResponse(**result)
     except Exception as exc:
         logger.error("Internal error: %s", exc)
@@ -100,6 +319,92 @@ def rag(request_body: RAGRequest) -> RAGResponse:
         raise HTTPException(status_code=500, detail="Internal server error.")
 
 
+def _sse(event: str, data: Any) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+@app.post("/rag/stream")
+async def rag_stream(request_body: RAGRequest) -> StreamingResponse:
+    """
+    Server-sent events: a "sources" event as soon as retrieval is done, "token" events
+    with answer deltas, then "done" (or "error" if generation fails mid-stream).
+    """
+    question = _rag_question(request_body)
+    vectorstore = VECTORSTORE
+
+    async def events() -> AsyncIterator[str]:
+        try:
+            async for event, data in astream_answer_with_rag(
+                vectorstore,
+                question,
+                k=RAG_TOP_K,
+                cache=get_answer_cache(),
+                bypass_cache=request_body.bypass_cache,
+                mode=request_body.retrieval_mode,
+            ):
+                yield _sse(event, data)
+        except Exception as exc:
+            logger.error("Internal error: %s", exc)
+            traceback.print_exc()
+            yield _sse("error", {"detail": "Internal server error."})
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@app.post("/rag/batch", response_model=RAGBatchResponse)
+async def rag_batch(request_body: RAGBatchRequest) -> RAGBatchResponse:
+    """Answers a list of questions in order; failed questions carry an error instead of an answer."""
+    if VECTORSTORE is None:
+        raise HTTPException(status_code=500, detail="Vector store not initialized.")
+
+    questions = [(q or "").strip() for q in request_body.questions]
+    results = await abatch_answer_with_rag(
+        VECTORSTORE,
+        questions,
+        k=RAG_TOP_K,
+        cache=get_answer_cache(),
+        bypass_cache=request_body.bypass_cache,
+        mode=request_body.retrieval_mode,
+        max_concurrency=SETTINGS.rag_batch_concurrency,
+    )
+    return RAGBatchResponse(
+        results=[RAGBatchItem(question=q, **result) for q, result in zip(questions, results)]
+    )
+
+
+@app.get("/rag/cache")
+def rag_cache_stats() -> Dict[str, Any]:
+    """Answer cache hit/miss counters."""
+    answer_cache = get_answer_cache()
+    if answer_cache is None:
+        return {"enabled": False}
+    return {"enabled": True, **answer_cache.stats()}
+
+
+@app.post("/admin/profile")
+async def admin_profile(
+    seconds: float = Query(10.0, gt=0, le=PROFILE_MAX_SECONDS),
+    x_admin_token: str = Header(""),
+) -> Response:
+    """
+    Samples the stacks of every thread of this worker for `seconds` and returns them as
+    folded stacks (flamegraph.pl, speedscope). Enabled by PROFILE_ADMIN_TOKEN.
+    """
+    if not SETTINGS.profile_admin_token:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if not secrets.compare_digest(x_admin_token, SETTINGS.profile_admin_token):
+        raise HTTPException(status_code=403, detail="Invalid admin token.")
+    sampled = await asyncio.to_thread(sample_stacks, seconds)
+    if sampled is None:
+        raise HTTPException(status_code=409, detail="A profile is already being captured.")
+    samples, stacks = sampled
+    return Response(collapsed_stacks(stacks), media_type="text/plain", headers={"X-Profile-Samples": str(samples)})
+
+
 if __name__ == "__main__":
     import uvicorn
 
@@ -1,17 +1,42 @@
 from .constants import (
     APP_NAME,
+    BLANK_PAGE_DPI,
+    BLANK_PAGE_INK_LEVEL,
+    BLANK_PAGE_MAX_INK_RATIO,
+    BLANK_PAGE_MIN_STD,
+    BM25_B,
+    BM25_K1,
     CHUNK_OVERLAP,
     CHUNK_SIZE,
     DEFAULT_DPI,
     IMAGE_EXTENSIONS,
     MIN_TEXT_LEN,
-    RAG_MAX_CONTEXT_CHARS,
+    MINHASH_BANDS,
+    MINHASH_PERMUTATIONS,
+    MINHASH_SHINGLE_WORDS,
+    PROFILE_MAX_SECONDS,
+    PROFILE_SAMPLE_INTERVAL,
+    RAG_BATCH_MAX_QUESTIONS,
+    RAG_HYBRID_CANDIDATES,
+    RAG_MAX_CONTEXT_TOKENS,
+    RAG_MMR_CANDIDATES,
+    RAG_MMR_LAMBDA,
+    RAG_TIMING_HEADER,
     RAG_TOP_K,
+    RETRIEVAL_MODES,
+    RRF_K,
 )
 from .logging import configure_logging, get_logger, logger
+from .metrics import MetricsMiddleware, metrics_enabled, render_metrics
 
 __all__ = [
     "APP_NAME",
+    "BLANK_PAGE_DPI",
+    "BLANK_PAGE_INK_LEVEL",
+    "BLANK_PAGE_MAX_INK_RATIO",
+    "BLANK_PAGE_MIN_STD",
+    "BM25_B",
+    "BM25_K1",
     "CHUNK_OVERLAP",
     "CHUNK_SIZE",
     "configure_logging",
@@ -19,7 +44,22 @@ __all__ = [
     "get_logger",
     "IMAGE_EXTENSIONS",
     "logger",
+    "metrics_enabled",
+    "MetricsMiddleware",
     "MIN_TEXT_LEN",
-    "RAG_MAX_CONTEXT_CHARS",
+    "MINHASH_BANDS",
+    "MINHASH_PERMUTATIONS",
+    "MINHASH_SHINGLE_WORDS",
+    "PROFILE_MAX_SECONDS",
+    "PROFILE_SAMPLE_INTERVAL",
+    "RAG_BATCH_MAX_QUESTIONS",
+    "RAG_HYBRID_CANDIDATES",
+    "RAG_MAX_CONTEXT_TOKENS",
+    "RAG_MMR_CANDIDATES",
+    "RAG_MMR_LAMBDA",
+    "RAG_TIMING_HEADER",
     "RAG_TOP_K",
+    "render_metrics",
+    "RETRIEVAL_MODES",
+    "RRF_K",
 ]
@@ -6,10 +6,36 @@ IMAGE_EXTENSIONS = {".png", ".jpg", ".jpeg", ".tiff", ".bmp"}
 MIN_TEXT_LEN = 30
 DEFAULT_DPI = 300
 
+# Blank page detection (thumbnail checked before OCR)
+BLANK_PAGE_DPI = 36
+BLANK_PAGE_INK_LEVEL = 160  # gray values below this count as ink
+BLANK_PAGE_MAX_INK_RATIO = 0.002  # pages with less ink coverage are blank
+BLANK_PAGE_MIN_STD = 3.0  # nearly uniform pages (e.g. plain cover sheets) are blank
+
 # Chunking
 CHUNK_SIZE = 1000
 CHUNK_OVERLAP = 150
 
+# Near-duplicate chunk detection (MinHash + LSH)
+MINHASH_PERMUTATIONS = 128
+MINHASH_BANDS = 16  # 16 bands x 8 rows: chunks with Jaccard >= ~0.8 almost always share a band
+MINHASH_SHINGLE_WORDS = 3
+
 # RAG
 RAG_TOP_K = 4
-RAG_MAX_CONTEXT_CHARS = 12_000
+RAG_MAX_CONTEXT_TOKENS = 3000  # context budget in chat-model tokens
+RAG_MMR_CANDIDATES = 20  # chunks retrieved before MMR picks RAG_TOP_K of them
+RAG_MMR_LAMBDA = 0.7  # MMR trade-off: 1 = relevance only, 0 = diversity only
+RAG_BATCH_MAX_QUESTIONS = 500
+
+# Retrieval
+RETRIEVAL_MODES = ("vector", "lexical", "hybrid")
+RAG_HYBRID_CANDIDATES = 20  # hits taken from each retriever before fusion
+RRF_K = 60  # reciprocal rank fusion constant
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+# Profiling
+PROFILE_MAX_SECONDS = 60  # longest sampling profile /admin/profile captures
+PROFILE_SAMPLE_INTERVAL = 0.005  # seconds between stack samples
+RAG_TIMING_HEADER = "X-RAG-Timing"  # request header asking /rag for a Server-Timing breakdown
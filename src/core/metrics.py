@@ -0,0 +1,180 @@
+"""
+Prometheus metrics for ingestion and querying, exposed by the API on GET /metrics.
+prometheus_client is optional: without it every metric is a no-op and /metrics returns 404.
+Install with: pip install prometheus-client
+
+Metric objects are module-level so instrumented code only pays a label lookup and an
+observe. OCR runs in worker processes, so OCR and render timings are measured there and
+observed in the parent when the page result is collected.
+"""
+import time
+from contextlib import nullcontext
+from typing import Any, Awaitable, Callable, ContextManager, Dict, MutableMapping, Optional, Tuple
+
+try:
+    import prometheus_client
+    from prometheus_client import Counter, Gauge, Histogram
+except ImportError:
+    prometheus_client = None  # type: ignore[assignment]
+
+_PREFIX = "ocr_rag"
+_FAST_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+_SLOW_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0, 120.0)
+_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024)
+_TOKEN_BUCKETS = (100, 250, 500, 1000, 1500, 2000, 3000, 4000, 6000, 8000, 16000)
+
+
+class _NoopMetric:
+    """Stands in for any metric (and its labelled children) when prometheus_client is missing."""
+
+    def labels(self, *args: Any, **kwargs: Any) -> "_NoopMetric":
+        return self
+
+    def observe(self, amount: float) -> None:
+        pass
+
+    def inc(self, amount: float = 1) -> None:
+        pass
+
+    def dec(self, amount: float = 1) -> None:
+        pass
+
+    def set(self, value: float) -> None:
+        pass
+
+    def set_function(self, fn: Callable[[], float]) -> None:
+        pass
+
+    def time(self) -> ContextManager[None]:
+        return nullcontext()
+
+    def track_inprogress(self) -> ContextManager[None]:
+        return nullcontext()
+
+
+def _histogram(name: str, doc: str, labels: Tuple[str, ...] = (), buckets: Tuple[float, ...] = _FAST_BUCKETS) -> Any:
+    if prometheus_client is None:
+        return _NoopMetric()
+    return Histogram(f"{_PREFIX}_{name}", doc, labels, buckets=buckets)
+
+
+def _counter(name: str, doc: str, labels: Tuple[str, ...] = ()) -> Any:
+    if prometheus_client is None:
+        return _NoopMetric()
+    return Counter(f"{_PREFIX}_{name}", doc, labels)
+
+
+def _gauge(name: str, doc: str, labels: Tuple[str, ...] = ()) -> Any:
+    if prometheus_client is None:
+        return _NoopMetric()
+    return Gauge(f"{_PREFIX}_{name}", doc, labels)
+
+
+# Extraction
+PAGE_RENDER_SECONDS = _histogram(
+    "page_render_seconds", "Time to rasterize a PDF page.", ("purpose",)  # ocr | blank_check
+)
+OCR_SECONDS = _histogram(
+    "ocr_seconds", "OCR engine time per page or image (cache hits excluded).", ("backend", "kind"), _SLOW_BUCKETS
+)
+PAGES_EXTRACTED = _counter("pages_extracted", "Pages extracted with text.", ("kind", "used_ocr"))
+DECRYPTION_SECONDS = _histogram(
+    "decryption_seconds", "Time to decrypt a PDF.", ("outcome",), _SLOW_BUCKETS
+)
+
+# Ingestion
+CHUNKING_SECONDS = _histogram("chunking_seconds", "Time to split a set of pages into chunks.")
+CHUNKS_CREATED = _counter("chunks_created", "Chunks produced by the splitter.", ("used_ocr",))
+EMBEDDING_BATCH_SECONDS = _histogram(
+    "embedding_batch_seconds", "Time to embed one ingest batch.", ("model",), _SLOW_BUCKETS
+)
+EMBEDDING_BATCH_SIZE = _histogram(
+    "embedding_batch_size", "Chunks per ingest embedding batch.", ("model",), _SIZE_BUCKETS
+)
+VECTOR_UPSERT_SECONDS = _histogram(
+    "vector_upsert_seconds", "Time to write one batch of vectors.", ("backend",), _SLOW_BUCKETS
+)
+INGEST_QUEUE_DEPTH = _gauge(
+    "ingest_queue_depth", "Items waiting in the output queue of an ingest pipeline stage.", ("stage",)
+)
+WATCH_QUEUE_DEPTH = _gauge("watch_queue_depth", "Changed files in DOCS_DIR not ingested yet (settling or queued).")
+WATCH_LAG_SECONDS = _gauge("watch_lag_seconds", "Age of the oldest change in DOCS_DIR not ingested yet.")
+WATCH_INGEST_LAG_SECONDS = _histogram(
+    "watch_ingest_lag_seconds", "Time from a change in DOCS_DIR until it is ingested.", (), _SLOW_BUCKETS
+)
+WATCH_BATCHES = _counter("watch_batches", "Watcher ingest batches.", ("outcome",))  # ingested | busy | error
+
+# Querying
+VECTOR_SEARCH_SECONDS = _histogram("vector_search_seconds", "Time of one (batched) nearest-neighbour search.", ("backend",))
+RETRIEVAL_SECONDS = _histogram("retrieval_seconds", "Time to retrieve candidate chunks, embedding excluded.", ("mode",))
+LLM_SECONDS = _histogram(
+    "llm_seconds", "Chat completion time (until the last token when streaming).", ("model", "streaming"), _SLOW_BUCKETS
+)
+CONTEXT_TOKENS = _histogram("context_tokens", "Tokens of context packed into a prompt.", ("model",), _TOKEN_BUCKETS)
+CONTEXT_CHUNKS = _histogram("context_chunks", "Chunks packed into a prompt.", (), _SIZE_BUCKETS)
+
+# HTTP
+HTTP_REQUESTS_IN_FLIGHT = _gauge("http_requests_in_flight", "Requests being served.", ("route",))
+HTTP_REQUEST_SECONDS = _histogram(
+    "http_request_seconds", "Request latency until the response is complete.", ("method", "route", "status"), _SLOW_BUCKETS
+)
+
+
+def metrics_enabled() -> bool:
+    return prometheus_client is not None
+
+
+def render_metrics() -> Optional[Tuple[bytes, str]]:
+    """(body, content type) of the Prometheus exposition of the default registry; None when disabled."""
+    if prometheus_client is None:
+        return None
+    return prometheus_client.generate_latest(), prometheus_client.CONTENT_TYPE_LATEST
+
+
+_Scope = MutableMapping[str, Any]
+_Receive = Callable[[], Awaitable[Dict[str, Any]]]
+_Send = Callable[[Dict[str, Any]], Awaitable[None]]
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware recording in-flight requests and latency per route template
+    (e.g. /ingest/{job_id}, so label cardinality stays bounded). Streaming responses
+    count as in flight until their last chunk is sent.
+    """
+
+    def __init__(self, app: Callable[[_Scope, _Receive, _Send], Awaitable[None]]):
+        self.app = app
+
+    @staticmethod
+    def _route(scope: _Scope) -> str:
+        from starlette.routing import Match
+
+        for route in scope["app"].router.routes:
+            match, _ = route.matches(scope)
+            if match == Match.FULL:
+                return getattr(route, "path", "unmatched")
+        return "unmatched"
+
+    async def __call__(self, scope: _Scope, receive: _Receive, send: _Send) -> None:
+        if scope["type"] != "http" or prometheus_client is None:
+            await self.app(scope, receive, send)
+            return
+
+        route = self._route(scope)
+        status = 500
+
+        async def send_with_status(message: Dict[str, Any]) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        start = time.perf_counter()
+        with HTTP_REQUESTS_IN_FLIGHT.labels(route=route).track_inprogress():
+            try:
+                await self.app(scope, receive, send_with_status)
+            finally:
+                HTTP_REQUEST_SECONDS.labels(method=scope["method"], route=route, status=str(status)).observe(
+                    time.perf_counter() - start
+                )
@@ -17,11 +17,52 @@ class Settings:
     embedding_model: str
     chat_model: str
     ingest_on_startup: bool
+    attach_on_startup: bool  # Serve the collection of an earlier ingest at startup, before (or without) ingesting
+    coordinate_ingest: bool  # One process ingests at a time (file lock or Postgres advisory lock); others follow
+    collection_poll_seconds: float  # How often followers check for a newly published collection; 0 disables
+    watch_docs: bool  # Ingest files added, changed or removed in DOCS_DIR while the API runs
+    watch_debounce_seconds: float  # A changed file is ingested once its size and mtime held this long
+    watch_poll_seconds: float  # How often changed files are checked (and DOCS_DIR scanned without watchdog)
+    watch_polling: bool  # Scan DOCS_DIR instead of using watchdog events (e.g. network shares without inotify)
     ocr_language: str
     export_ocr_txt: str  # When set, write OCR text to this file and skip vector store (no OpenAI)
     encrypted_docs_dir: str  # Optional: folder with encrypted PDFs for batch decryption
     decrypted_docs_dir: str  # Output folder for decrypted PDFs (batch)
     processed_encrypted_dir: str  # Optional: move originals here after batch decryption
+    decrypt_workers: int  # Worker processes for batch decryption (<= 1 decrypts sequentially)
+    ocr_backend: str  # "pytesseract" (CLI per call) or "tesserocr" (persistent in-process engine)
+    ocr_workers: int  # Worker processes for page rendering/OCR (<= 1 disables the pool)
+    ocr_cache_dir: str  # On-disk OCR text cache; empty disables it
+    ocr_cache_max_mb: int  # Size limit of the OCR cache before LRU eviction
+    embedding_cache_path: str  # SQLite file caching embeddings by (model, text hash); empty disables it
+    embedding_cache_max_entries: int  # LRU bound of the embedding cache
+    ingest_batch_size: int  # Chunks per embedding call / vector upsert during ingestion
+    ingest_queue_size: int  # Items buffered between ingestion pipeline stages
+    openai_max_connections: int  # Pooled HTTP connections shared by chat and embedding calls
+    openai_max_keepalive: int  # Idle connections kept open in the pool
+    openai_timeout: float  # Seconds per OpenAI request
+    answer_cache_max_entries: int  # LRU bound of the /rag answer cache; 0 disables it
+    answer_cache_ttl_seconds: float  # Lifetime of a cached answer
+    answer_cache_similarity: float  # Opt-in: min query-embedding cosine similarity to reuse an answer; 0 = exact match only
+    rag_batch_concurrency: int  # Concurrent LLM calls per /rag/batch request
+    dedup_chunks: bool  # Collapse near-duplicate chunks (MinHash/LSH) into one stored vector before embedding
+    dedup_threshold: float  # Min estimated Jaccard similarity of word shingles for two chunks to be collapsed
+    lexical_index: bool  # Maintain the local BM25 index during ingestion and use it for retrieval
+    retrieval_mode: str  # Default retrieval: "vector", "lexical" or "hybrid" (BM25 + vector, RRF-fused)
+    vector_backend: str  # Local store when database_url is empty: "chroma" or "numpy" (memory-mapped matrix)
+    vector_dtype: str  # NumPy store element type: "float32", "float16" or "int8" (fixed when a collection is created)
+    vector_ivf_min_rows: int  # NumPy store builds an IVF index from this many chunks (0 disables IVF)
+    vector_ivf_nprobe: int  # IVF lists scanned per query (higher: better recall, slower)
+    pg_pool_min_connections: int  # Postgres connections opened up front and kept in the shared pool
+    pg_pool_max_connections: int  # Upper bound of the shared pool; callers wait for a free connection
+    pg_index_type: str  # ANN index per pgvector collection: "hnsw", "ivfflat" or "none" (exact scan)
+    pg_hnsw_m: int  # HNSW graph degree (build time)
+    pg_hnsw_ef_construction: int  # HNSW build candidate list size
+    pg_hnsw_ef_search: int  # HNSW query candidate list size (raised to k when smaller)
+    pg_ivfflat_probes: int  # IVFFlat lists scanned per query
+    profile_ingest: bool  # Write a cProfile file per extracted file (including its OCR in worker processes)
+    profile_dir: str  # Output folder for ingest profiles
+    profile_admin_token: str  # Enables POST /admin/profile for requests sending it as X-Admin-Token; empty disables it
 
     @property
     def use_postgres(self) -> bool:
@@ -60,11 +101,52 @@ def load_settings() -> Settings:
         embedding_model=os.getenv("EMBEDDING_MODEL", "text-embedding-3-small"),
         chat_model=os.getenv("CHAT_MODEL", "gpt-4o-mini"),
         ingest_on_startup=os.getenv("INGEST_ON_STARTUP", "true").lower() == "true",
+        attach_on_startup=os.getenv("ATTACH_ON_STARTUP", "true").lower() == "true",
+        coordinate_ingest=os.getenv("COORDINATE_INGEST", "true").lower() == "true",
+        collection_poll_seconds=float(os.getenv("COLLECTION_POLL_SECONDS", "5")),
+        watch_docs=os.getenv("WATCH_DOCS", "false").lower() == "true",
+        watch_debounce_seconds=float(os.getenv("WATCH_DEBOUNCE_SECONDS", "2")),
+        watch_poll_seconds=float(os.getenv("WATCH_POLL_SECONDS", "1")),
+        watch_polling=os.getenv("WATCH_POLLING", "false").lower() == "true",
         ocr_language=os.getenv("OCR_LANGUAGE", "eng"),
         export_ocr_txt=export_ocr_txt,
         encrypted_docs_dir=encrypted_docs_dir,
         decrypted_docs_dir=decrypted_docs_dir or ".data/decrypted",
         processed_encrypted_dir=processed_encrypted_dir or ".data/processed_encrypted",
+        decrypt_workers=int(os.getenv("DECRYPT_WORKERS", "").strip() or os.cpu_count() or 1),
+        ocr_backend=os.getenv("OCR_BACKEND", "pytesseract").strip().lower() or "pytesseract",
+        ocr_workers=int(os.getenv("OCR_WORKERS", "").strip() or os.cpu_count() or 1),
+        ocr_cache_dir=os.getenv("OCR_CACHE_DIR", ".data/ocr_cache").strip(),
+        ocr_cache_max_mb=int(os.getenv("OCR_CACHE_MAX_MB", "512")),
+        embedding_cache_path=os.getenv("EMBEDDING_CACHE_PATH", ".data/embedding_cache.sqlite").strip(),
+        embedding_cache_max_entries=int(os.getenv("EMBEDDING_CACHE_MAX_ENTRIES", "500000")),
+        ingest_batch_size=int(os.getenv("INGEST_BATCH_SIZE", "128")),
+        ingest_queue_size=int(os.getenv("INGEST_QUEUE_SIZE", "4")),
+        openai_max_connections=int(os.getenv("OPENAI_MAX_CONNECTIONS", "100")),
+        openai_max_keepalive=int(os.getenv("OPENAI_MAX_KEEPALIVE", "20")),
+        openai_timeout=float(os.getenv("OPENAI_TIMEOUT", "60")),
+        answer_cache_max_entries=int(os.getenv("ANSWER_CACHE_MAX_ENTRIES", "1000")),
+        answer_cache_ttl_seconds=float(os.getenv("ANSWER_CACHE_TTL_SECONDS", "3600")),
+        answer_cache_similarity=float(os.getenv("ANSWER_CACHE_SIMILARITY", "0")),
+        rag_batch_concurrency=int(os.getenv("RAG_BATCH_CONCURRENCY", "8")),
+        dedup_chunks=os.getenv("DEDUP_CHUNKS", "false").lower() == "true",
+        dedup_threshold=float(os.getenv("DEDUP_THRESHOLD", "0.9")),
+        lexical_index=os.getenv("LEXICAL_INDEX", "false").lower() == "true",
+        retrieval_mode=os.getenv("RETRIEVAL_MODE", "vector").strip().lower() or "vector",
+        vector_backend=os.getenv("VECTOR_BACKEND", "chroma").strip().lower() or "chroma",
+        vector_dtype=os.getenv("VECTOR_DTYPE", "float32").strip().lower() or "float32",
+        vector_ivf_min_rows=int(os.getenv("VECTOR_IVF_MIN_ROWS", "50000")),
+        vector_ivf_nprobe=int(os.getenv("VECTOR_IVF_NPROBE", "16")),
+        pg_pool_min_connections=int(os.getenv("PG_POOL_MIN_CONNECTIONS", "1")),
+        pg_pool_max_connections=int(os.getenv("PG_POOL_MAX_CONNECTIONS", "10")),
+        pg_index_type=os.getenv("PG_INDEX_TYPE", "hnsw").strip().lower() or "hnsw",
+        pg_hnsw_m=int(os.getenv("PG_HNSW_M", "16")),
+        pg_hnsw_ef_construction=int(os.getenv("PG_HNSW_EF_CONSTRUCTION", "64")),
+        pg_hnsw_ef_search=int(os.getenv("PG_HNSW_EF_SEARCH", "40")),
+        pg_ivfflat_probes=int(os.getenv("PG_IVFFLAT_PROBES", "10")),
+        profile_ingest=os.getenv("PROFILE_INGEST", "false").lower() == "true",
+        profile_dir=os.getenv("PROFILE_DIR", ".data/profiles").strip(),
+        profile_admin_token=os.getenv("PROFILE_ADMIN_TOKEN", "").strip(),
     )
 
 
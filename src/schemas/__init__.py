@@ -1,3 +1,11 @@
-from .rag import RAGRequest, RAGResponse
+from .ingest import IngestJobResponse
+from .rag import RAGBatchItem, RAGBatchRequest, RAGBatchResponse, RAGRequest, RAGResponse
 
-__all__ = ["RAGRequest", "RAGResponse"]
+__all__ = [
+    "IngestJobResponse",
+    "RAGBatchItem",
+    "RAGBatchRequest",
+    "RAGBatchResponse",
+    "RAGRequest",
+    "RAGResponse",
+]
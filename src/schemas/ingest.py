@@ -0,0 +1,23 @@
+from typing import Optional
+
+from pydantic import BaseModel
+
+
+class IngestJobResponse(BaseModel):
+    job_id: str
+    status: str
+    files_total: int
+    files_to_process: int
+    files_done: int
+    files_unchanged: int
+    files_deleted: int
+    pages: int
+    blank_pages_skipped: int
+    chunks_added: int
+    chunks_deduplicated: int
+    dedup_chars_saved: int
+    chunks_deleted: int
+    elapsed_seconds: float
+    pages_per_second: float
+    chunks_per_second: float
+    error: Optional[str] = None
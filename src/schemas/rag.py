@@ -1,12 +1,37 @@
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Literal, Optional
 
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
+
+from src.core.constants import RAG_BATCH_MAX_QUESTIONS
+
+RetrievalMode = Literal["vector", "lexical", "hybrid"]
 
 
 class RAGRequest(BaseModel):
     question: str
+    bypass_cache: bool = False  # skip the answer cache lookup (the fresh answer is still cached)
+    retrieval_mode: Optional[RetrievalMode] = None  # default: RETRIEVAL_MODE
 
 
 class RAGResponse(BaseModel):
     answer: str
     sources: List[Dict[str, Any]]
+    cached: bool = False
+
+
+class RAGBatchRequest(BaseModel):
+    questions: List[str] = Field(..., min_length=1, max_length=RAG_BATCH_MAX_QUESTIONS)
+    bypass_cache: bool = False
+    retrieval_mode: Optional[RetrievalMode] = None
+
+
+class RAGBatchItem(BaseModel):
+    question: str
+    answer: Optional[str] = None
+    sources: List[Dict[str, Any]] = Field(default_factory=list)
+    cached: bool = False
+    error: Optional[str] = None  # set instead of answer when this question failed
+
+
+class RAGBatchResponse(BaseModel):
+    results: List[RAGBatchItem]
@@ -1,30 +1,333 @@
-from src.services.chunking_service import chunk_documents
-from src.services.database_service import ensure_pgvector_extension
-from src.services.decryption_service import DecryptionService
-from src.services.parser_service import (
-    export_documents_to_txt,
-    load_all_documents,
-    list_supported_files,
-)
-from src.services.extraction_service import (
-    extract_image_document,
-    extract_pdf_documents_with_ocr,
-    page_to_pil_image,
-)
-from src.services.rag_service import answer_with_rag, RAG_PROMPT
-from src.services.vectorstore_service import build_vectorstore
+"""
+Service layer. Exports are imported on first use (module __getattr__), so importing a
+name only loads the modules behind it: the API starts without PyMuPDF, Tesseract or the
+pgvector integration, which load when ingestion or a Postgres store first needs them.
+"""
+import importlib
+from typing import TYPE_CHECKING, Any, Dict, List, Tuple
+
+if TYPE_CHECKING:
+    from src.services.chunking_service import chunk_documents, chunk_file_documents
+    from src.services.database_service import (
+        close_pools,
+        ensure_pgvector_extension,
+        ensure_vector_index,
+        pg_connection,
+    )
+    from src.services.context_service import get_token_counter, mmr_select, pack_by_tokens
+    from src.services.coordination_service import (
+        attached_version,
+        collection_version,
+        CollectionFollower,
+        ingest_leadership,
+        IngestLockBusy,
+        publish_collection_version,
+        set_attached_version,
+    )
+    from src.services.decryption_service import DecryptionResult, DecryptionService, PdfPasswordRequired
+    from src.services.dedup_service import DedupIndex, DedupStats, get_dedup_index, minhash_signature
+    from src.services.parser_service import (
+        export_documents_to_txt,
+        iter_documents,
+        load_all_documents,
+        load_documents,
+        list_supported_files,
+        split_supported_files,
+    )
+    from src.services.extraction_service import (
+        ExtractionStats,
+        extract_image_document,
+        extract_pdf_documents_with_ocr,
+        get_ocr_engine,
+        is_blank_page,
+        ocr_executor,
+        OcrEngine,
+        page_to_ocr_image,
+        page_to_pil_image,
+        submit_image_extraction,
+        submit_pdf_extraction,
+    )
+    from src.services.embedding_cache_service import CachedEmbeddings
+    from src.services.answer_cache_service import AnswerCache, get_answer_cache, normalize_question
+    from src.services.ocr_cache_service import OcrCache, file_sha256, get_ocr_cache
+    from src.services.openai_client_service import (
+        aclose_http_clients,
+        get_async_http_client,
+        get_http_client,
+    )
+    from src.services.rag_service import (
+        aanswer_with_rag,
+        abatch_answer_with_rag,
+        answer_with_rag,
+        aretrieve,
+        aretrieve_many,
+        astream_answer_with_rag,
+        build_context,
+        get_chat_model,
+        pack_context,
+        RAG_PROMPT,
+        reciprocal_rank_fusion,
+        resolve_retrieval_mode,
+        source_refs,
+    )
+    from src.services.lexical_index_service import (
+        get_lexical_index,
+        LexicalIndex,
+        LexicalIndexBuilder,
+        lexical_index_path,
+        reload_lexical_index,
+        tokenize,
+    )
+    from src.services.numpy_store_service import NumpyVectorStore
+    from src.services.profiling_service import (
+        collapsed_stacks,
+        FileProfiler,
+        sample_stacks,
+        server_timing_header,
+        stage_timer,
+        start_request_timings,
+    )
+    from src.services.vectorstore_service import (
+        add_chunks,
+        attach_vectorstore,
+        AnyVectorStore,
+        batch_similarity_search,
+        batch_similarity_search_with_vectors,
+        build_vectorstore,
+        delete_chunks,
+        get_chunks,
+        get_chunks_with_vectors,
+        get_embeddings,
+        iter_collection_chunks,
+        numpy_store_dir,
+        open_vectorstore,
+        optimize_vectorstore,
+        promote_collection,
+        reset_vectorstore,
+        upsert_embeddings,
+        vectorstore_backend,
+    )
+    from src.services.manifest_service import IngestManifest, load_manifest, save_manifest
+    from src.services.ingest_service import IngestResult, IngestStats, run_ingest
+    from src.services.ingest_job_service import IngestJob, IngestJobManager
+    from src.services.watcher_service import DocsWatcher
+
+# Submodule -> the names it exports
+_EXPORTS: Dict[str, Tuple[str, ...]] = {
+    "chunking_service": ("chunk_documents", "chunk_file_documents"),
+    "database_service": ("close_pools", "ensure_pgvector_extension", "ensure_vector_index", "pg_connection"),
+    "context_service": ("get_token_counter", "mmr_select", "pack_by_tokens"),
+    "coordination_service": (
+        "attached_version",
+        "collection_version",
+        "CollectionFollower",
+        "ingest_leadership",
+        "IngestLockBusy",
+        "publish_collection_version",
+        "set_attached_version",
+    ),
+    "decryption_service": ("DecryptionResult", "DecryptionService", "PdfPasswordRequired"),
+    "dedup_service": ("DedupIndex", "DedupStats", "get_dedup_index", "minhash_signature"),
+    "parser_service": (
+        "export_documents_to_txt",
+        "iter_documents",
+        "load_all_documents",
+        "load_documents",
+        "list_supported_files",
+        "split_supported_files",
+    ),
+    "extraction_service": (
+        "ExtractionStats",
+        "extract_image_document",
+        "extract_pdf_documents_with_ocr",
+        "get_ocr_engine",
+        "is_blank_page",
+        "ocr_executor",
+        "OcrEngine",
+        "page_to_ocr_image",
+        "page_to_pil_image",
+        "submit_image_extraction",
+        "submit_pdf_extraction",
+    ),
+    "embedding_cache_service": ("CachedEmbeddings",),
+    "answer_cache_service": ("AnswerCache", "get_answer_cache", "normalize_question"),
+    "ocr_cache_service": ("OcrCache", "file_sha256", "get_ocr_cache"),
+    "openai_client_service": ("aclose_http_clients", "get_async_http_client", "get_http_client"),
+    "rag_service": (
+        "aanswer_with_rag",
+        "abatch_answer_with_rag",
+        "answer_with_rag",
+        "aretrieve",
+        "aretrieve_many",
+        "astream_answer_with_rag",
+        "build_context",
+        "get_chat_model",
+        "pack_context",
+        "RAG_PROMPT",
+        "reciprocal_rank_fusion",
+        "resolve_retrieval_mode",
+        "source_refs",
+    ),
+    "lexical_index_service": (
+        "get_lexical_index",
+        "LexicalIndex",
+        "LexicalIndexBuilder",
+        "lexical_index_path",
+        "reload_lexical_index",
+        "tokenize",
+    ),
+    "numpy_store_service": ("NumpyVectorStore",),
+    "profiling_service": (
+        "collapsed_stacks",
+        "FileProfiler",
+        "sample_stacks",
+        "server_timing_header",
+        "stage_timer",
+        "start_request_timings",
+    ),
+    "vectorstore_service": (
+        "add_chunks",
+        "attach_vectorstore",
+        "AnyVectorStore",
+        "batch_similarity_search",
+        "batch_similarity_search_with_vectors",
+        "build_vectorstore",
+        "delete_chunks",
+        "get_chunks",
+        "get_chunks_with_vectors",
+        "get_embeddings",
+        "iter_collection_chunks",
+        "numpy_store_dir",
+        "open_vectorstore",
+        "optimize_vectorstore",
+        "promote_collection",
+        "reset_vectorstore",
+        "upsert_embeddings",
+        "vectorstore_backend",
+    ),
+    "manifest_service": ("IngestManifest", "load_manifest", "save_manifest"),
+    "ingest_service": ("IngestResult", "IngestStats", "run_ingest"),
+    "ingest_job_service": ("IngestJob", "IngestJobManager"),
+    "watcher_service": ("DocsWatcher",),
+}
+_MODULE_OF: Dict[str, str] = {name: module for module, names in _EXPORTS.items() for name in names}
+
+
+def __getattr__(name: str) -> Any:
+    module = _MODULE_OF.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f"{__name__}.{module}"), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> List[str]:
+    return sorted(set(globals()) | set(_MODULE_OF))
+
 
 __all__ = [
+    "aanswer_with_rag",
+    "abatch_answer_with_rag",
+    "aclose_http_clients",
+    "add_chunks",
     "answer_with_rag",
+    "AnswerCache",
+    "AnyVectorStore",
+    "aretrieve",
+    "aretrieve_many",
+    "astream_answer_with_rag",
+    "attach_vectorstore",
+    "attached_version",
+    "batch_similarity_search",
+    "batch_similarity_search_with_vectors",
+    "build_context",
     "build_vectorstore",
+    "CachedEmbeddings",
     "chunk_documents",
+    "chunk_file_documents",
+    "close_pools",
+    "collapsed_stacks",
+    "collection_version",
+    "CollectionFollower",
+    "DecryptionResult",
     "DecryptionService",
+    "DedupIndex",
+    "DedupStats",
+    "delete_chunks",
+    "DocsWatcher",
     "ensure_pgvector_extension",
+    "ensure_vector_index",
     "export_documents_to_txt",
     "extract_image_document",
     "extract_pdf_documents_with_ocr",
+    "ExtractionStats",
+    "file_sha256",
+    "FileProfiler",
+    "get_answer_cache",
+    "get_async_http_client",
+    "get_chat_model",
+    "get_chunks",
+    "get_chunks_with_vectors",
+    "get_dedup_index",
+    "get_embeddings",
+    "get_http_client",
+    "get_lexical_index",
+    "get_ocr_cache",
+    "get_ocr_engine",
+    "get_token_counter",
+    "ingest_leadership",
+    "IngestJob",
+    "IngestJobManager",
+    "IngestLockBusy",
+    "IngestManifest",
+    "IngestResult",
+    "IngestStats",
+    "is_blank_page",
+    "iter_collection_chunks",
+    "iter_documents",
+    "lexical_index_path",
+    "LexicalIndex",
+    "LexicalIndexBuilder",
     "list_supported_files",
     "load_all_documents",
+    "load_documents",
+    "load_manifest",
+    "minhash_signature",
+    "mmr_select",
+    "normalize_question",
+    "numpy_store_dir",
+    "NumpyVectorStore",
+    "ocr_executor",
+    "OcrCache",
+    "OcrEngine",
+    "open_vectorstore",
+    "optimize_vectorstore",
+    "pack_by_tokens",
+    "pack_context",
+    "page_to_ocr_image",
     "page_to_pil_image",
+    "PdfPasswordRequired",
+    "pg_connection",
+    "promote_collection",
+    "publish_collection_version",
     "RAG_PROMPT",
+    "reciprocal_rank_fusion",
+    "reload_lexical_index",
+    "reset_vectorstore",
+    "resolve_retrieval_mode",
+    "run_ingest",
+    "sample_stacks",
+    "save_manifest",
+    "server_timing_header",
+    "set_attached_version",
+    "source_refs",
+    "split_supported_files",
+    "stage_timer",
+    "start_request_timings",
+    "submit_image_extraction",
+    "submit_pdf_extraction",
+    "tokenize",
+    "upsert_embeddings",
+    "vectorstore_backend",
 ]
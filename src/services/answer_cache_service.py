@@ -0,0 +1,227 @@
+"""
+In-memory cache of /rag answers. Questions match exactly after normalization or,
+optionally, by cosine similarity of their query embeddings (the embedding is computed
+for retrieval anyway, so similarity lookups cost no extra API call). The embeddings of
+each scope are kept in one matrix, so a similarity lookup is a single matrix product.
+Entries expire after a TTL, are evicted LRU beyond a size bound, and are dropped on
+re-ingestion.
+"""
+import re
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, Hashable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from src.core.constants import APP_NAME
+from src.core.logging import get_logger
+from src.models import SETTINGS
+
+logger = get_logger(APP_NAME)
+
+_TRAILING_PUNCTUATION = re.compile(r"[\s?!.]+$")
+_INITIAL_SLOTS = 16
+
+_Key = Tuple[str, Hashable]
+
+
+def normalize_question(question: str) -> str:
+    """Case-folded, whitespace-collapsed question without trailing punctuation."""
+    return _TRAILING_PUNCTUATION.sub("", " ".join(question.casefold().split()))
+
+
+@dataclass
+class _Entry:
+    scope: Hashable
+    answer: Dict[str, Any]
+    expires_at: float
+    vector: Optional[np.ndarray] = None  # unit-length query embedding
+
+
+class _ScopeVectors:
+    """Unit query embeddings of one scope's entries, one matrix row per entry; free rows are zero."""
+
+    def __init__(self, dim: int):
+        self.matrix = np.zeros((_INITIAL_SLOTS, dim), dtype=np.float32)
+        self.keys: List[Optional[_Key]] = [None] * _INITIAL_SLOTS
+        self.slots: Dict[_Key, int] = {}
+        self.free = list(range(_INITIAL_SLOTS - 1, -1, -1))
+
+    def add(self, key: _Key, vector: np.ndarray) -> None:
+        slot = self.slots.get(key)
+        if slot is None:
+            if not self.free:
+                size = len(self.keys)
+                self.matrix = np.vstack([self.matrix, np.zeros_like(self.matrix)])
+                self.keys.extend([None] * size)
+                self.free = list(range(2 * size - 1, size - 1, -1))
+            slot = self.free.pop()
+            self.slots[key] = slot
+            self.keys[slot] = key
+        self.matrix[slot] = vector
+
+    def remove(self, key: _Key) -> None:
+        slot = self.slots.pop(key, None)
+        if slot is not None:
+            self.matrix[slot] = 0.0
+            self.keys[slot] = None
+            self.free.append(slot)
+
+    def ranked(self, query: np.ndarray, threshold: float) -> List[_Key]:
+        """Keys whose embedding is at least threshold similar to query, most similar first."""
+        if query.shape[0] != self.matrix.shape[1]:
+            return []
+        scores = self.matrix @ query
+        rows = np.flatnonzero(scores >= threshold)  # free rows score 0, below any enabled threshold
+        rows = rows[np.argsort(-scores[rows], kind="stable")]
+        return [key for key in (self.keys[i] for i in rows) if key is not None]
+
+    def __len__(self) -> int:
+        return len(self.slots)
+
+
+class AnswerCache:
+    """Thread-safe TTL + LRU answer cache; similarity_threshold <= 0 disables embedding matching."""
+
+    def __init__(self, max_entries: int, ttl_seconds: float, similarity_threshold: float):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.similarity_threshold = similarity_threshold
+        self.generation = 0  # bumped by clear(); answers computed before a clear are not stored
+        self.exact_hits = 0
+        self.similar_hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[_Key, _Entry]" = OrderedDict()
+        self._vectors: Dict[Hashable, _ScopeVectors] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def similarity_enabled(self) -> bool:
+        return self.similarity_threshold > 0
+
+    def get(self, question: str, scope: Hashable) -> Optional[Dict[str, Any]]:
+        """
+        Exact lookup on the normalized question. scope holds the retrieval parameters the
+        answer depends on (e.g. k and retrieval mode). Counts a miss unless similarity
+        matching is enabled, in which case get_similar is the last lookup and counts it.
+        """
+        key = (normalize_question(question), scope)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.expires_at <= time.time():
+                self._remove(key)
+                entry = None
+            if entry is None:
+                if not self.similarity_enabled:
+                    self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.exact_hits += 1
+            return entry.answer
+
+    def get_similar(self, vector: Sequence[float], scope: Hashable) -> Optional[Dict[str, Any]]:
+        """
+        Best entry whose query embedding is at least similarity_threshold similar; counts a
+        miss otherwise. Always None (and no miss: get counted it) when matching is disabled.
+        """
+        if not self.similarity_enabled:
+            return None
+        query = _unit(vector)
+        with self._lock:
+            vectors = self._vectors.get(scope)
+            if vectors is not None:
+                now = time.time()
+                for key in vectors.ranked(query, self.similarity_threshold):
+                    if self._entries[key].expires_at <= now:
+                        self._remove(key)
+                        continue
+                    self._entries.move_to_end(key)
+                    self.similar_hits += 1
+                    return self._entries[key].answer
+            self.misses += 1
+            return None
+
+    def put(
+        self,
+        question: str,
+        scope: Hashable,
+        answer: Dict[str, Any],
+        vector: Optional[Sequence[float]] = None,
+        generation: Optional[int] = None,
+    ) -> None:
+        """Stores an answer; skipped when the cache was cleared since `generation` was read."""
+        if self.max_entries <= 0:
+            return
+        key = (normalize_question(question), scope)
+        entry = _Entry(
+            scope=scope,
+            answer=answer,
+            expires_at=time.time() + self.ttl_seconds,
+            vector=_unit(vector) if vector is not None and self.similarity_enabled else None,
+        )
+        with self._lock:
+            if generation is not None and generation != self.generation:
+                return
+            self._remove(key)
+            self._entries[key] = entry
+            if entry.vector is not None:
+                vectors = self._vectors.get(scope)
+                if vectors is None:
+                    vectors = self._vectors[scope] = _ScopeVectors(entry.vector.shape[0])
+                vectors.add(key, entry.vector)
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+
+    def _remove(self, key: _Key) -> None:
+        """Drops an entry and its embedding row; caller holds the lock."""
+        entry = self._entries.pop(key, None)
+        if entry is None or entry.vector is None:
+            return
+        vectors = self._vectors[entry.scope]
+        vectors.remove(key)
+        if not len(vectors):
+            del self._vectors[entry.scope]
+
+    def clear(self) -> None:
+        with self._lock:
+            dropped = len(self._entries)
+            self._entries.clear()
+            self._vectors.clear()
+            self.generation += 1
+        logger.info("Answer cache cleared (%s entries)", dropped)
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            hits = self.exact_hits + self.similar_hits
+            total = hits + self.misses
+            return {
+                "hits": hits,
+                "exact_hits": self.exact_hits,
+                "similar_hits": self.similar_hits,
+                "misses": self.misses,
+                "hit_rate": round(hits / total, 4) if total else 0.0,
+                "entries": len(self._entries),
+            }
+
+
+def _unit(vector: Sequence[float]) -> np.ndarray:
+    arr = np.asarray(vector, dtype=np.float32)
+    norm = float(np.linalg.norm(arr))
+    return arr / norm if norm > 0 else arr
+
+
+_answer_cache: Optional[AnswerCache] = None
+
+
+def get_answer_cache() -> Optional[AnswerCache]:
+    """Process-wide answer cache, or None when ANSWER_CACHE_MAX_ENTRIES is 0."""
+    global _answer_cache
+    if _answer_cache is None and SETTINGS.answer_cache_max_entries > 0:
+        _answer_cache = AnswerCache(
+            max_entries=SETTINGS.answer_cache_max_entries,
+            ttl_seconds=SETTINGS.answer_cache_ttl_seconds,
+            similarity_threshold=SETTINGS.answer_cache_similarity,
+        )
+    return _answer_cache
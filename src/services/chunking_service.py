@@ -1,9 +1,11 @@
+import uuid
 from typing import List, Sequence
 
 from langchain_core.documents import Document
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 
 from src.core.constants import CHUNK_OVERLAP, CHUNK_SIZE
+from src.core.metrics import CHUNKING_SECONDS, CHUNKS_CREATED
 
 
 def chunk_documents(docs: Sequence[Document]) -> List[Document]:
@@ -11,4 +13,20 @@ def chunk_documents(docs: Sequence[Document]) -> List[Document]:
         chunk_size=CHUNK_SIZE,
         chunk_overlap=CHUNK_OVERLAP,
     )
-    return splitter.split_documents(docs)
+    with CHUNKING_SECONDS.time():
+        chunks = splitter.split_documents(docs)
+    ocr_chunks = sum(1 for chunk in chunks if chunk.metadata.get("used_ocr"))
+    CHUNKS_CREATED.labels(used_ocr="true").inc(ocr_chunks)
+    CHUNKS_CREATED.labels(used_ocr="false").inc(len(chunks) - ocr_chunks)
+    return chunks
+
+
+def chunk_file_documents(docs: Sequence[Document], path: str, file_hash: str) -> List[Document]:
+    """
+    Chunks the pages of one file and sets metadata["chunk_id"].
+    IDs are deterministic: the same content at the same path always yields the same IDs.
+    """
+    chunks = chunk_documents(docs)
+    for index, chunk in enumerate(chunks):
+        chunk.metadata["chunk_id"] = str(uuid.uuid5(uuid.NAMESPACE_URL, f"{path}#{file_hash}#{index}"))
+    return chunks
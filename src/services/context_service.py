@@ -0,0 +1,98 @@
+"""
+Context selection for the RAG prompt: maximal marginal relevance over the candidate
+chunks (NumPy matrix ops) and packing against a token budget of the chat model.
+"""
+import threading
+from typing import Callable, List, Optional, Sequence
+
+import numpy as np
+
+from src.core.constants import APP_NAME
+from src.core.logging import get_logger
+
+logger = get_logger(APP_NAME)
+
+
+def mmr_select(
+    candidates: np.ndarray,
+    relevance: np.ndarray,
+    k: int,
+    lambda_mult: float = 0.5,
+) -> List[int]:
+    """
+    Indices of k candidates in maximal-marginal-relevance order: each step takes the
+    candidate maximizing lambda * relevance - (1 - lambda) * (max cosine similarity to
+    the ones already taken). candidates is (n, dim); relevance is (n,), higher is better.
+    """
+    n = len(candidates)
+    if n == 0 or k <= 0:
+        return []
+    unit = candidates / np.maximum(np.linalg.norm(candidates, axis=1, keepdims=True), 1e-12)
+    similarity = unit @ unit.T
+    relevance = np.asarray(relevance, dtype=np.float64)
+
+    selected = [int(np.argmax(relevance))]
+    redundancy = similarity[selected[0]].copy()
+    taken = np.zeros(n, dtype=bool)
+    taken[selected[0]] = True
+    while len(selected) < min(k, n):
+        scores = lambda_mult * relevance - (1.0 - lambda_mult) * redundancy
+        scores[taken] = -np.inf
+        best = int(np.argmax(scores))
+        selected.append(best)
+        taken[best] = True
+        np.maximum(redundancy, similarity[best], out=redundancy)
+    return selected
+
+
+def cosine_relevance(query: Sequence[float], candidates: np.ndarray) -> np.ndarray:
+    q = np.asarray(query, dtype=np.float64)
+    norms = np.linalg.norm(candidates, axis=1) * max(np.linalg.norm(q), 1e-12)
+    return (candidates @ q) / np.maximum(norms, 1e-12)
+
+
+def rank_relevance(n: int) -> np.ndarray:
+    """Relevance from retrieval order alone (fused or BM25 rankings carry no comparable score): 1 down to 1/n."""
+    return 1.0 - np.arange(n, dtype=np.float64) / n
+
+
+_counter: Optional[Callable[[str], int]] = None
+_counter_lock = threading.Lock()
+
+
+def get_token_counter(model: str) -> Callable[[str], int]:
+    """
+    Token count function for model (tiktoken), created once. If the encoding cannot be
+    loaded (unknown model, no network for the BPE file), falls back to ~4 characters per token.
+    """
+    global _counter
+    with _counter_lock:
+        if _counter is None:
+            try:
+                import tiktoken
+
+                try:
+                    encoding = tiktoken.encoding_for_model(model)
+                except KeyError:
+                    encoding = tiktoken.get_encoding("o200k_base")
+                _counter = lambda text: len(encoding.encode(text, disallowed_special=()))  # noqa: E731
+            except Exception as exc:
+                logger.warning("No tokenizer for %s (%s); estimating 4 characters per token", model, exc)
+                _counter = lambda text: -(-len(text) // 4)  # noqa: E731
+        return _counter
+
+
+def pack_by_tokens(texts: Sequence[str], budget: int, count_tokens: Callable[[str], int], separator_tokens: int = 0) -> List[int]:
+    """
+    Indices of texts, in order, that fit in budget tokens together. A text that does not
+    fit is skipped rather than ending the packing, so a smaller later one can still use the room.
+    """
+    chosen: List[int] = []
+    used = 0
+    for i, text in enumerate(texts):
+        cost = count_tokens(text) + (separator_tokens if chosen else 0)
+        if used + cost > budget:
+            continue
+        chosen.append(i)
+        used += cost
+    return chosen
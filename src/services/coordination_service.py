@@ -0,0 +1,244 @@
+"""
+Coordination of ingestion between API processes sharing one collection (uvicorn --workers,
+replicas). One process ingests at a time: it holds the collection's ingest lock (a file
+lock next to a local store, a Postgres advisory lock for pgvector) and publishes a new
+collection version when the ingest changed the collection. The other processes skip
+their ingest, keep serving the collection they attached and reattach when a new version
+is published (CollectionFollower).
+
+The file lock uses flock, which is reliable on local disks but not on every network
+filesystem; replicas on several hosts should share a Postgres collection.
+"""
+import hashlib
+import os
+import tempfile
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Callable, Iterator, Optional, Union
+
+import psycopg2
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None  # type: ignore[assignment]
+
+from src.core.constants import APP_NAME
+from src.core.logging import get_logger
+from src.models import SETTINGS
+from src.services.database_service import load_collection_version, save_collection_version
+
+logger = get_logger(APP_NAME)
+
+_version_lock = threading.Lock()
+_attached_version: Optional[str] = None  # version of the collection this process serves
+
+
+class IngestLockBusy(Exception):
+    """Another process is ingesting into the collection."""
+
+
+class FileIngestLock:
+    """Exclusive flock on VECTOR_PERSIST_DIR/<collection>.ingest.lock; the OS releases it if the process dies."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._fd: Optional[int] = None
+
+    def acquire(self) -> bool:
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        if fcntl is None:
+            logger.warning("fcntl unavailable; ingestion is not coordinated between processes")
+        else:
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                os.close(fd)
+                return False
+        os.ftruncate(fd, 0)
+        os.write(fd, f"{os.getpid()}\n".encode("ascii"))  # holder, for operators
+        self._fd = fd
+        return True
+
+    def release(self) -> None:
+        if self._fd is None:
+            return
+        try:
+            if fcntl is not None:
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+        finally:
+            os.close(self._fd)
+            self._fd = None
+
+
+class PgAdvisoryLock:
+    """
+    Session-level advisory lock on a connection of its own (not the pool), held for the
+    whole ingest. Postgres releases it when that session ends, so a crashed ingester
+    never blocks the others.
+    """
+
+    def __init__(self, database_url: str, name: str):
+        self.database_url = database_url
+        digest = hashlib.sha256(f"{APP_NAME}:ingest:{name}".encode("utf-8")).digest()
+        self.key = int.from_bytes(digest[:8], "big", signed=True)
+        self._conn = None
+
+    def acquire(self) -> bool:
+        conn = psycopg2.connect(self.database_url)
+        conn.autocommit = True
+        try:
+            with conn.cursor() as cur:
+                cur.execute("SELECT pg_try_advisory_lock(%s);", (self.key,))
+                acquired = cur.fetchone()[0]
+        except Exception:
+            conn.close()
+            raise
+        if not acquired:
+            conn.close()
+            return False
+        self._conn = conn
+        return True
+
+    def release(self) -> None:
+        if self._conn is None:
+            return
+        try:
+            with self._conn.cursor() as cur:
+                cur.execute("SELECT pg_advisory_unlock(%s);", (self.key,))
+        except psycopg2.Error as exc:
+            logger.warning("Could not release ingest lock (released with the session). Error=%s", exc)
+        finally:
+            self._conn.close()
+            self._conn = None
+
+
+def _local_path(suffix: str) -> str:
+    return os.path.join(SETTINGS.vector_persist_dir, f"{SETTINGS.collection_name}.{suffix}")
+
+
+def ingest_lock() -> Union[FileIngestLock, PgAdvisoryLock]:
+    if SETTINGS.use_postgres:
+        return PgAdvisoryLock(SETTINGS.database_url, SETTINGS.collection_name)
+    return FileIngestLock(_local_path("ingest.lock"))
+
+
+@contextmanager
+def ingest_leadership() -> Iterator[None]:
+    """
+    Runs the block as the collection's only ingester; raises IngestLockBusy if another
+    process is ingesting. No-op when COORDINATE_INGEST is off.
+    """
+    if not SETTINGS.coordinate_ingest:
+        yield
+        return
+    lock = ingest_lock()
+    try:
+        acquired = lock.acquire()
+    except psycopg2.OperationalError as exc:
+        # Same fallback as the vector store: without Postgres, ingestion goes to the local store
+        logger.warning("Postgres unavailable for the ingest lock (%s); using a file lock", exc)
+        lock = FileIngestLock(_local_path("ingest.lock"))
+        acquired = lock.acquire()
+    if not acquired:
+        raise IngestLockBusy(f"Another process is ingesting into '{SETTINGS.collection_name}'")
+    try:
+        yield
+    finally:
+        lock.release()
+
+
+def collection_version() -> Optional[str]:
+    """Version last published for the collection, or None (never published, or unreadable)."""
+    if SETTINGS.use_postgres:
+        try:
+            return load_collection_version(SETTINGS.database_url, SETTINGS.collection_name)
+        except psycopg2.OperationalError as exc:
+            logger.debug("Could not read the collection version from Postgres. Error=%s", exc)
+    try:
+        with open(_local_path("version"), encoding="utf-8") as f:
+            return f.read().strip() or None
+    except OSError:
+        return None
+
+
+def publish_collection_version() -> str:
+    """Announces that the collection changed, so other processes reattach; returns the new version."""
+    global _attached_version
+    version = f"{int(time.time() * 1000)}-{uuid.uuid4().hex[:8]}"
+    published = False
+    if SETTINGS.use_postgres:
+        try:
+            save_collection_version(SETTINGS.database_url, SETTINGS.collection_name, version)
+            published = True
+        except psycopg2.OperationalError as exc:
+            logger.warning("Could not publish the collection version to Postgres. Error=%s", exc)
+    if not published:
+        path = _local_path("version")
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path) or ".", suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(version + "\n")
+        os.replace(tmp_path, path)
+    with _version_lock:
+        _attached_version = version
+    logger.info("Published collection '%s' version %s", SETTINGS.collection_name, version)
+    return version
+
+
+def attached_version() -> Optional[str]:
+    with _version_lock:
+        return _attached_version
+
+
+def set_attached_version(version: Optional[str]) -> None:
+    """Records the version of the collection this process serves (read before attaching)."""
+    global _attached_version
+    with _version_lock:
+        _attached_version = version
+
+
+class CollectionFollower:
+    """
+    Polls the published collection version every `interval` seconds on a daemon thread
+    and calls on_change(version) when another process published a new one. on_change
+    returns False (or raises) to be called again on the next poll.
+    """
+
+    def __init__(self, on_change: Callable[[str], bool], interval: float):
+        self.on_change = on_change
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> "CollectionFollower":
+        self._thread = threading.Thread(target=self._run, name="collection-follower", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.interval + 1)
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            self.check()
+
+    def check(self) -> bool:
+        """Reattaches if a new version was published; True when it did."""
+        version = collection_version()
+        if version is None or version == attached_version():
+            return False
+        try:
+            attached = self.on_change(version)
+        except Exception as exc:
+            logger.warning("Could not attach collection version %s. Error=%s", version, exc)
+            return False
+        if attached:
+            set_attached_version(version)
+            logger.info("Attached collection '%s' version %s", SETTINGS.collection_name, version)
+        return attached
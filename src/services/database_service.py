@@ -1,26 +1,453 @@
+import csv
+import io
+import json
+import math
+import threading
+import uuid
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
 import psycopg2
+from psycopg2.extensions import connection as PGConnection
+from psycopg2.extras import Json
+from psycopg2.pool import ThreadedConnectionPool
 
 from src.core.constants import APP_NAME
 from src.core.logging import get_logger
+from src.models import SETTINGS
 
 logger = get_logger(APP_NAME)
 
+PG_INDEX_TYPES = ("hnsw", "ivfflat", "none")
+_OPERATOR_OPCLASS = {"<=>": "cosine_ops", "<->": "l2_ops", "<#>": "ip_ops"}
+_MAX_VECTOR_INDEX_DIMS = 2000  # pgvector indexes vector up to 2000 dims, halfvec up to 4000
+
+
+class _BlockingPool:
+    """ThreadedConnectionPool that waits for a free connection instead of raising PoolError."""
+
+    def __init__(self, database_url: str, min_connections: int, max_connections: int):
+        max_connections = max(1, max_connections)
+        self._pool = ThreadedConnectionPool(min(min_connections, max_connections), max_connections, database_url)
+        self._slots = threading.BoundedSemaphore(max_connections)
+
+    @contextmanager
+    def connection(self) -> Iterator[PGConnection]:
+        with self._slots:
+            conn = self._pool.getconn()
+            try:
+                yield conn
+            finally:
+                # A connection left in a transaction or broken by the caller is not reused
+                broken = conn.closed != 0
+                if not broken and conn.status != psycopg2.extensions.STATUS_READY:
+                    try:
+                        conn.rollback()
+                    except psycopg2.Error:
+                        broken = True
+                self._pool.putconn(conn, close=broken)
+
+    def close(self) -> None:
+        self._pool.closeall()
+
+
+_pools: Dict[str, _BlockingPool] = {}
+_pools_lock = threading.Lock()
+_extension_ready: Set[str] = set()
+
+
+def _get_pool(database_url: str) -> _BlockingPool:
+    with _pools_lock:
+        pool = _pools.get(database_url)
+        if pool is None:
+            pool = _BlockingPool(
+                database_url,
+                SETTINGS.pg_pool_min_connections,
+                SETTINGS.pg_pool_max_connections,
+            )
+            _pools[database_url] = pool
+            logger.info("Postgres connection pool opened (max %s connections)", SETTINGS.pg_pool_max_connections)
+        return pool
+
+
+@contextmanager
+def pg_connection(database_url: str) -> Iterator[PGConnection]:
+    """Connection from the shared pool for database_url, in a transaction committed on exit (rolled back on error)."""
+    with _get_pool(database_url).connection() as conn:
+        with conn:
+            yield conn
+
+
+def close_pools() -> None:
+    """Closes every pooled Postgres connection (application shutdown)."""
+    with _pools_lock:
+        for pool in _pools.values():
+            pool.close()
+        _pools.clear()
+
 
 def ensure_pgvector_extension(database_url: str) -> None:
     """
-    Ensures pgvector extension exists.
+    Ensures pgvector extension exists (checked once per process).
     Note: this requires privileges. In managed Postgres, you may need to enable it in the provider console.
     """
-    conn = None
+    if database_url in _extension_ready:
+        return
     try:
-        conn = psycopg2.connect(database_url)
-        conn.autocommit = True
-        with conn.cursor() as cur:
+        with pg_connection(database_url) as conn, conn.cursor() as cur:
             cur.execute("CREATE EXTENSION IF NOT EXISTS vector;")
+        _extension_ready.add(database_url)
         logger.info("pgvector extension ensured")
     except Exception as exc:
         logger.error("Failed to ensure pgvector extension. Error=%s", exc)
         raise
-    finally:
-        if conn:
-            conn.close()
+
+
+_MANIFEST_TABLE_SQL = """
+CREATE TABLE IF NOT EXISTS ocr_rag_manifest (
+    collection_name TEXT PRIMARY KEY,
+    data JSONB NOT NULL,
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT now()
+);
+"""
+
+
+def load_manifest_data(database_url: str, collection_name: str) -> Optional[dict]:
+    """Returns the ingest manifest stored for collection_name, or None."""
+    with pg_connection(database_url) as conn, conn.cursor() as cur:
+        cur.execute(_MANIFEST_TABLE_SQL)
+        cur.execute(
+            "SELECT data FROM ocr_rag_manifest WHERE collection_name = %s;",
+            (collection_name,),
+        )
+        row = cur.fetchone()
+    return row[0] if row else None
+
+
+def save_manifest_data(database_url: str, collection_name: str, data: dict) -> None:
+    """Upserts the ingest manifest for collection_name."""
+    with pg_connection(database_url) as conn, conn.cursor() as cur:
+        cur.execute(_MANIFEST_TABLE_SQL)
+        cur.execute(
+            "INSERT INTO ocr_rag_manifest (collection_name, data) VALUES (%s, %s) "
+            "ON CONFLICT (collection_name) DO UPDATE SET data = EXCLUDED.data, updated_at = now();",
+            (collection_name, Json(data)),
+        )
+
+
+_COLLECTION_VERSION_TABLE_SQL = """
+CREATE TABLE IF NOT EXISTS ocr_rag_collection_version (
+    collection_name TEXT PRIMARY KEY,
+    version TEXT NOT NULL,
+    published_at TIMESTAMPTZ NOT NULL DEFAULT now()
+);
+"""
+
+
+def load_collection_version(database_url: str, collection_name: str) -> Optional[str]:
+    """Version last published for collection_name, or None. Polled, so it does not create the table."""
+    with pg_connection(database_url) as conn, conn.cursor() as cur:
+        try:
+            cur.execute(
+                "SELECT version FROM ocr_rag_collection_version WHERE collection_name = %s;",
+                (collection_name,),
+            )
+        except psycopg2.errors.UndefinedTable:
+            conn.rollback()
+            return None
+        row = cur.fetchone()
+    return row[0] if row else None
+
+
+def save_collection_version(database_url: str, collection_name: str, version: str) -> None:
+    with pg_connection(database_url) as conn, conn.cursor() as cur:
+        cur.execute(_COLLECTION_VERSION_TABLE_SQL)
+        cur.execute(
+            "INSERT INTO ocr_rag_collection_version (collection_name, version) VALUES (%s, %s) "
+            "ON CONFLICT (collection_name) DO UPDATE SET version = EXCLUDED.version, published_at = now();",
+            (collection_name, version),
+        )
+
+
+def _collection_id(cur, collection_name: str) -> Optional[str]:
+    cur.execute("SELECT uuid FROM langchain_pg_collection WHERE name = %s;", (collection_name,))
+    row = cur.fetchone()
+    return str(row[0]) if row else None
+
+
+def _index_name(collection_id: str) -> str:
+    return f"ix_ocr_rag_ann_{uuid.UUID(collection_id).hex}"
+
+
+def rename_collection(database_url: str, source_name: str, target_name: str) -> None:
+    """
+    Atomically replaces the PGVector collection target_name with source_name.
+    Embeddings of the replaced collection are removed by the ON DELETE CASCADE foreign key,
+    and its ANN index is dropped; the source collection keeps its own.
+    """
+    with pg_connection(database_url) as conn, conn.cursor() as cur:
+        target_id = _collection_id(cur, target_name)
+        if target_id:
+            cur.execute(f"DROP INDEX IF EXISTS {_index_name(target_id)};")
+        cur.execute("DELETE FROM langchain_pg_collection WHERE name = %s;", (target_name,))
+        cur.execute(
+            "UPDATE langchain_pg_collection SET name = %s WHERE name = %s;",
+            (target_name, source_name),
+        )
+
+
+def _vector_literal(vector: Sequence[float]) -> str:
+    return "[" + ",".join(repr(float(x)) for x in vector) + "]"
+
+
+def _parse_vector(literal: Optional[str]) -> Optional[np.ndarray]:
+    """Embedding from its pgvector text form ("[0.1,0.2,...]")."""
+    if not literal:
+        return None
+    return np.array(literal.strip("[]").split(","), dtype=np.float32)
+
+
+def _vector_type(dims: int) -> str:
+    """Fixed-dimension type the ANN index (and the queries that use it) cast embeddings to."""
+    return f"vector({dims})" if dims <= _MAX_VECTOR_INDEX_DIMS else f"halfvec({dims})"
+
+
+_COPY_EMBEDDINGS_SQL = (
+    "COPY langchain_pg_embedding (uuid, collection_id, embedding, document, cmetadata, custom_id) "
+    "FROM STDIN WITH (FORMAT csv)"
+)
+
+
+def copy_embeddings(
+    database_url: str,
+    collection_name: str,
+    chunk_ids: Sequence[str],
+    texts: Sequence[str],
+    vectors: Sequence[Sequence[float]],
+    metadatas: Sequence[dict],
+) -> None:
+    """
+    Bulk-loads embeddings into a collection with COPY, replacing rows with the same chunk IDs
+    in the same transaction (so an interrupted run never leaves duplicates).
+    """
+    if not chunk_ids:
+        return
+    buf = io.StringIO()
+    writer = csv.writer(buf, quoting=csv.QUOTE_ALL, lineterminator="\n")
+    with pg_connection(database_url) as conn, conn.cursor() as cur:
+        collection_id = _collection_id(cur, collection_name)
+        if collection_id is None:
+            raise ValueError(f"Unknown pgvector collection: {collection_name}")
+        for chunk_id, text, vector, metadata in zip(chunk_ids, texts, vectors, metadatas):
+            writer.writerow([
+                uuid.uuid4(),
+                collection_id,
+                _vector_literal(vector),
+                text.replace("\x00", ""),  # Postgres text cannot hold NUL
+                json.dumps(metadata, ensure_ascii=False),
+                chunk_id,
+            ])
+        buf.seek(0)
+        cur.execute(
+            "DELETE FROM langchain_pg_embedding WHERE collection_id = %s AND custom_id = ANY(%s);",
+            (collection_id, list(chunk_ids)),
+        )
+        cur.copy_expert(_COPY_EMBEDDINGS_SQL, buf)
+
+
+def delete_embeddings(database_url: str, collection_name: str, chunk_ids: Sequence[str]) -> None:
+    """Removes the rows of a collection with the given chunk IDs."""
+    if not chunk_ids:
+        return
+    with pg_connection(database_url) as conn, conn.cursor() as cur:
+        cur.execute(
+            "DELETE FROM langchain_pg_embedding e USING langchain_pg_collection c "
+            "WHERE c.uuid = e.collection_id AND c.name = %s AND e.custom_id = ANY(%s);",
+            (collection_name, list(chunk_ids)),
+        )
+
+
+def ensure_vector_index(
+    database_url: str,
+    collection_name: str,
+    operator: str,
+    index_type: str,
+    hnsw_m: int = 16,
+    hnsw_ef_construction: int = 64,
+) -> None:
+    """
+    Creates, rebuilds or drops the ANN index of a collection to match index_type.
+    The index is partial (one per collection) on the embedding cast to its fixed dimension
+    (halfvec above 2000 dims). Its settings are kept in the index comment; an IVFFlat index
+    is rebuilt when the collection size calls for a list count more than 2x off.
+    """
+    if index_type not in PG_INDEX_TYPES:
+        raise ValueError(f"Unsupported pgvector index type: {index_type} (expected one of {PG_INDEX_TYPES})")
+    with pg_connection(database_url) as conn, conn.cursor() as cur:
+        collection_id = _collection_id(cur, collection_name)
+        if collection_id is None:
+            return
+        name = _index_name(collection_id)
+        cur.execute("SELECT obj_description(to_regclass(%s), 'pg_class');", (name,))
+        row = cur.fetchone()
+        current = json.loads(row[0]) if row and row[0] else None
+
+        if index_type == "none":
+            if current is not None:
+                cur.execute(f"DROP INDEX IF EXISTS {name};")
+                logger.info("Dropped ANN index of '%s'", collection_name)
+            return
+
+        cur.execute(
+            "SELECT count(*), max(vector_dims(embedding)) FROM langchain_pg_embedding WHERE collection_id = %s;",
+            (collection_id,),
+        )
+        rows, dims = cur.fetchone()
+        if not rows:
+            return
+        vector_type = _vector_type(dims)
+        opclass = f"{vector_type.split('(')[0]}_{_OPERATOR_OPCLASS[operator]}"
+        if index_type == "hnsw":
+            params = {"m": hnsw_m, "ef_construction": hnsw_ef_construction}
+        else:
+            # pgvector guidance: rows / 1000 lists up to 1M rows, sqrt(rows) above
+            params = {"lists": max(1, rows // 1000 if rows <= 1_000_000 else int(math.sqrt(rows)))}
+        wanted = {"type": index_type, "opclass": opclass, "dims": dims, "params": params}
+
+        if current is not None:
+            same_shape = {k: v for k, v in current.items() if k != "params"} == {
+                k: v for k, v in wanted.items() if k != "params"
+            }
+            if index_type == "ivfflat" and same_shape:
+                ratio = params["lists"] / max(1, current["params"].get("lists", 1))
+                if 0.5 <= ratio <= 2:
+                    return
+            elif same_shape and current["params"] == params:
+                return
+            cur.execute(f"DROP INDEX IF EXISTS {name};")
+
+        with_clause = ", ".join(f"{key} = {int(value)}" for key, value in params.items())
+        cur.execute(
+            f"CREATE INDEX {name} ON langchain_pg_embedding "
+            f"USING {index_type} ((embedding::{vector_type}) {opclass}) WITH ({with_clause}) "
+            f"WHERE collection_id = %s;",
+            (collection_id,),
+        )
+        cur.execute(f"COMMENT ON INDEX {name} IS %s;", (json.dumps(wanted),))
+        logger.info(
+            "Built %s index for '%s' (%s rows, %s dims, %s)",
+            index_type,
+            collection_name,
+            rows,
+            dims,
+            with_clause,
+        )
+
+
+def drop_vector_index(database_url: str, collection_name: str) -> None:
+    """Drops the ANN index of a collection (before the collection itself is dropped)."""
+    with pg_connection(database_url) as conn, conn.cursor() as cur:
+        collection_id = _collection_id(cur, collection_name)
+        if collection_id:
+            cur.execute(f"DROP INDEX IF EXISTS {_index_name(collection_id)};")
+
+
+_BATCH_NEAREST_SQL = """
+WITH queries AS (
+    SELECT ord - 1 AS idx, q::{vector_type} AS embedding
+    FROM unnest(%(vectors)s::text[]) WITH ORDINALITY AS t(q, ord)
+)
+SELECT queries.idx, hit.document, hit.cmetadata, {embedding_column}
+FROM queries
+CROSS JOIN LATERAL (
+    SELECT e.document, e.cmetadata, e.embedding, (e.embedding::{vector_type}) {operator} queries.embedding AS distance
+    FROM langchain_pg_embedding e
+    WHERE e.collection_id = %(collection_id)s
+    ORDER BY distance
+    LIMIT %(k)s
+) hit
+ORDER BY queries.idx, hit.distance;
+"""
+
+
+def batch_nearest_chunks(
+    database_url: str,
+    collection_name: str,
+    query_vectors: Sequence[Sequence[float]],
+    k: int,
+    operator: str = "<=>",
+    ef_search: int = 40,
+    probes: int = 10,
+    with_vectors: bool = False,
+) -> List[List[Tuple[str, dict, Optional[np.ndarray]]]]:
+    """
+    Top-k (document, metadata, embedding) rows per query vector in one round trip (LATERAL
+    join over the unnested queries); the embedding is None unless with_vectors.
+    operator is the pgvector distance: <=> cosine, <-> L2, <#> inner product.
+    The distance expression matches the collection's ANN index, so the planner can use it;
+    ef_search (HNSW, at least k) and probes (IVFFlat) are set for this transaction only.
+    """
+    if operator not in _OPERATOR_OPCLASS:
+        raise ValueError(f"Unsupported pgvector operator: {operator}")
+    results: List[List[Tuple[str, dict, Optional[np.ndarray]]]] = [[] for _ in query_vectors]
+    if not query_vectors:
+        return results
+    literals = [_vector_literal(vec) for vec in query_vectors]
+    with pg_connection(database_url) as conn, conn.cursor() as cur:
+        collection_id = _collection_id(cur, collection_name)
+        if collection_id is None:
+            return results
+        cur.execute("SET LOCAL hnsw.ef_search = %s;", (max(ef_search, k),))
+        cur.execute("SET LOCAL ivfflat.probes = %s;", (probes,))
+        cur.execute(
+            _BATCH_NEAREST_SQL.format(
+                operator=operator,
+                vector_type=_vector_type(len(query_vectors[0])),
+                embedding_column="hit.embedding::text" if with_vectors else "NULL",
+            ),
+            {"vectors": literals, "collection_id": collection_id, "k": k},
+        )
+        for idx, document, metadata, embedding in cur.fetchall():
+            results[idx].append((document, metadata or {}, _parse_vector(embedding)))
+    return results
+
+
+def fetch_chunks(
+    database_url: str,
+    collection_name: str,
+    chunk_ids: Sequence[str],
+    with_vectors: bool = False,
+) -> List[Tuple[str, str, dict, Optional[np.ndarray]]]:
+    """(chunk_id, document, metadata, embedding or None unless with_vectors) rows for the given chunk IDs."""
+    if not chunk_ids:
+        return []
+    embedding_column = "e.embedding::text" if with_vectors else "NULL"
+    with pg_connection(database_url) as conn, conn.cursor() as cur:
+        cur.execute(
+            f"SELECT e.custom_id, e.document, e.cmetadata, {embedding_column} FROM langchain_pg_embedding e "
+            "JOIN langchain_pg_collection c ON c.uuid = e.collection_id "
+            "WHERE c.name = %s AND e.custom_id = ANY(%s);",
+            (collection_name, list(chunk_ids)),
+        )
+        return [(cid, doc, meta or {}, _parse_vector(emb)) for cid, doc, meta, emb in cur.fetchall()]
+
+
+def iter_collection_rows(
+    database_url: str,
+    collection_name: str,
+    batch_size: int = 1000,
+) -> Iterator[List[Tuple[str, str, dict]]]:
+    """Every (chunk_id, document, metadata) row of a collection, in batches (server-side cursor)."""
+    with pg_connection(database_url) as conn, conn.cursor(name="ocr_rag_collection_rows") as cur:
+        cur.itersize = batch_size
+        cur.execute(
+            "SELECT e.custom_id, e.document, e.cmetadata FROM langchain_pg_embedding e "
+            "JOIN langchain_pg_collection c ON c.uuid = e.collection_id WHERE c.name = %s;",
+            (collection_name,),
+        )
+        while True:
+            rows = cur.fetchmany(batch_size)
+            if not rows:
+                return
+            yield [(cid, doc, meta or {}) for cid, doc, meta in rows]
@@ -1,13 +1,20 @@
 """
 Service for handling PDF decryption (password-protected or encrypted PDFs).
-Uses pikepdf to decrypt and save to a readable format before OCR/extraction.
+Uses pikepdf to decrypt PDFs MuPDF cannot open itself; for extraction the decrypted
+PDF stays in memory, batch decryption writes it to DECRYPTED_DOCS_DIR.
 Install with: pip install pikepdf
 """
+import io
 import os
 import shutil
 import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
 from pathlib import Path
-from typing import List, Optional
+from typing import List, Optional, Tuple
+
+import fitz  # PyMuPDF
 
 try:
     import pikepdf
@@ -16,6 +23,7 @@ except ImportError:
 
 from src.core.constants import APP_NAME
 from src.core.logging import get_logger
+from src.core.metrics import DECRYPTION_SECONDS
 from src.models import SETTINGS
 
 logger = get_logger(APP_NAME)
@@ -23,6 +31,47 @@ logger = get_logger(APP_NAME)
 _PIKEPDF_REQUIRED_MSG = "pikepdf is required for decryption. Install with: pip install pikepdf"
 
 
+class PdfPasswordRequired(Exception):
+    """The PDF has a non-empty user password, so it cannot be opened without it."""
+
+
+@dataclass
+class DecryptionResult:
+    """Outcome of decrypting one file of a batch."""
+    source: str
+    status: str  # "decrypted" | "password_required" | "error"
+    output_path: Optional[str] = None
+    seconds: float = 0.0
+    error: Optional[str] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.status == "decrypted"
+
+
+def _clean_filename(filename: str) -> str:
+    """Remove 'decrypted_' prefixes from filename."""
+    clean_name = filename
+    while clean_name.lower().startswith("decrypted_"):
+        clean_name = clean_name[len("decrypted_"):]
+    return clean_name
+
+
+def _decrypt_file(source: str, target_folder: str, processed_folder: str) -> DecryptionResult:
+    """Worker entry point of decrypt_pdfs_batch: decrypts one file, then moves the original to processed_folder."""
+    start = time.perf_counter()
+    output_path = os.path.join(target_folder, f"decrypted_{_clean_filename(os.path.basename(source))}")
+    try:
+        with pikepdf.open(source) as pdf:
+            pdf.save(output_path)
+        shutil.move(source, os.path.join(processed_folder, os.path.basename(source)))
+        return DecryptionResult(source, "decrypted", output_path, time.perf_counter() - start)
+    except pikepdf.PasswordError:
+        return DecryptionResult(source, "password_required", seconds=time.perf_counter() - start)
+    except Exception as exc:
+        return DecryptionResult(source, "error", seconds=time.perf_counter() - start, error=str(exc))
+
+
 class DecryptionService:
     """Service for handling PDF decryption."""
 
@@ -37,12 +86,13 @@ class DecryptionService:
             self.target_folder.mkdir(parents=True, exist_ok=True)
             self.processed_folder.mkdir(parents=True, exist_ok=True)
 
-    def decrypt_pdfs_batch(self) -> List[str]:
+    def decrypt_pdfs_batch(self, workers: Optional[int] = None) -> List[DecryptionResult]:
         """
-        Decrypt all PDFs in the encrypted folder.
+        Decrypt all PDFs in the encrypted folder on a pool of DECRYPT_WORKERS processes.
+        Each decrypted original is moved to the processed folder.
 
         Returns:
-            List of paths to successfully decrypted PDFs.
+            One result per PDF (status, output path, seconds), in folder order.
         """
         if pikepdf is None:
             raise ImportError(_PIKEPDF_REQUIRED_MSG)
@@ -51,84 +101,112 @@ class DecryptionService:
             return []
 
         self.ensure_directories()
-        pdf_files = [f for f in os.listdir(self.source_folder) if f.lower().endswith(".pdf")]
-        total_files = len(pdf_files)
-
-        if total_files == 0:
+        pdf_files = sorted(f for f in os.listdir(self.source_folder) if f.lower().endswith(".pdf"))
+        if not pdf_files:
             logger.info("No PDF files found in encrypted folder")
             return []
 
-        decrypted_files: List[str] = []
-
-        for index, pdf_file in enumerate(pdf_files, start=1):
-            encrypted_pdf_path = self.source_folder / pdf_file
-            clean_filename = self._clean_filename(pdf_file)
-            decrypted_pdf_path = self.target_folder / f"decrypted_{clean_filename}"
-
-            try:
-                logger.info("Processing %s of %s PDFs...", index, total_files)
-
-                with pikepdf.open(encrypted_pdf_path) as pdf:
-                    pdf.save(decrypted_pdf_path)
-
-                logger.info("PDF decrypted: %s", decrypted_pdf_path)
-
-                processed_path = self.processed_folder / pdf_file
-                shutil.move(str(encrypted_pdf_path), str(processed_path))
-                logger.info("Original encrypted PDF moved to: %s", processed_path)
-
-                decrypted_files.append(str(decrypted_pdf_path))
-
-            except pikepdf.PasswordError:
-                logger.error("PDF '%s' is password protected and cannot be decrypted", pdf_file)
-            except FileNotFoundError as exc:
-                logger.error("File not found: %s", exc)
-            except Exception as exc:
-                logger.error("Error decrypting '%s': %s", pdf_file, exc)
-
-        return decrypted_files
+        workers = min(SETTINGS.decrypt_workers if workers is None else workers, len(pdf_files))
+        sources = [str(self.source_folder / f) for f in pdf_files]
+        targets = [str(self.target_folder)] * len(sources)
+        processed = [str(self.processed_folder)] * len(sources)
+        start = time.perf_counter()
+        if workers > 1:
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                results = list(executor.map(_decrypt_file, sources, targets, processed))
+        else:
+            results = [_decrypt_file(*args) for args in zip(sources, targets, processed)]
+
+        for result in results:
+            name = os.path.basename(result.source)
+            DECRYPTION_SECONDS.labels(outcome=result.status).observe(result.seconds)
+            if result.ok:
+                logger.info("PDF decrypted in %.2fs: %s", result.seconds, result.output_path)
+            elif result.status == "password_required":
+                logger.error("PDF '%s' is password protected and cannot be decrypted", name)
+            else:
+                logger.error("Error decrypting '%s': %s", name, result.error)
+        logger.info(
+            "Decrypted %s of %s PDFs in %.2fs (%s workers)",
+            sum(r.ok for r in results),
+            len(results),
+            time.perf_counter() - start,
+            max(workers, 1),
+        )
+        return results
+
+    def decrypt_to_memory(self, input_path: str) -> bytes:
+        """
+        Decrypted content of a PDF, for fitz.open(stream=...). Nothing is written to disk.
+        Raises PdfPasswordRequired if the PDF needs a user password.
+        """
+        if pikepdf is None:
+            raise ImportError(_PIKEPDF_REQUIRED_MSG)
+        start = time.perf_counter()
+        buffer = io.BytesIO()
+        try:
+            with pikepdf.open(input_path) as pdf:
+                pdf.save(buffer)
+        except pikepdf.PasswordError as exc:
+            DECRYPTION_SECONDS.labels(outcome="password_required").observe(time.perf_counter() - start)
+            raise PdfPasswordRequired(input_path) from exc
+        except Exception:
+            DECRYPTION_SECONDS.labels(outcome="error").observe(time.perf_counter() - start)
+            raise
+        DECRYPTION_SECONDS.labels(outcome="decrypted").observe(time.perf_counter() - start)
+        return buffer.getvalue()
+
+    def open_pdf(self, input_path: str) -> Tuple[fitz.Document, Optional[bytes]]:
+        """
+        Opens a PDF for extraction, checking encryption up front so the file is extracted
+        once. MuPDF opens unencrypted PDFs and those with an empty user password (owner
+        password only) itself; PDFs it cannot open are decrypted in memory by pikepdf.
+        Returns the document and, when it was decrypted, its bytes (OCR workers cannot
+        reopen it by path). Raises PdfPasswordRequired if a user password is needed.
+        """
+        try:
+            doc = fitz.open(input_path)
+        except Exception as exc:
+            logger.debug("MuPDF cannot open %s (%s); decrypting with pikepdf", input_path, exc)
+            data = self.decrypt_to_memory(input_path)
+            return fitz.open(stream=data, filetype="pdf"), data
+        if doc.needs_pass and not doc.authenticate(""):
+            doc.close()
+            raise PdfPasswordRequired(input_path)
+        return doc, None
 
     def decrypt_single_pdf(self, input_path: str) -> Optional[str]:
         """
-        Decrypt a single PDF file (or copy if not encrypted).
-        Caller must delete the returned path if it is a temp file (path != input_path).
-
-        Args:
-            input_path: Path to the PDF file to decrypt.
+        Decrypt a single PDF file to a temp file (or copy it if not encrypted), for callers
+        that need a path. Extraction uses open_pdf instead, which keeps the PDF in memory.
+        Caller must delete the returned path.
 
         Returns:
-            Path to decrypted file (temp file), or None if failed.
-            If PDF was not encrypted, returns path to a temp copy.
+            Path to the temp file, or None if the PDF is password protected or failed.
         """
-        if pikepdf is None:
-            raise ImportError(_PIKEPDF_REQUIRED_MSG)
         try:
-            temp_file = tempfile.NamedTemporaryFile(delete=False, suffix=".pdf")
-            temp_path = temp_file.name
-            temp_file.close()
-
-            try:
-                with pikepdf.open(input_path) as pdf:
-                    pdf.save(temp_path)
-                logger.debug("PDF decrypted with pikepdf: %s", temp_path)
-            except pikepdf.PasswordError:
-                logger.warning("PDF is password protected, cannot decrypt: %s", input_path)
-                os.unlink(temp_path)
-                return None
-            except Exception:
-                # If not encrypted or pikepdf can't open, just copy and try extraction
-                shutil.copy(input_path, temp_path)
-                logger.debug("PDF not encrypted or opened by copy: %s", temp_path)
-
-            return temp_path
-
+            data: Optional[bytes] = self.decrypt_to_memory(input_path)
+        except PdfPasswordRequired:
+            logger.warning("PDF is password protected, cannot decrypt: %s", input_path)
+            return None
+        except ImportError:
+            raise
+        except Exception as exc:
+            # If not encrypted or pikepdf can't open, just copy and try extraction
+            logger.debug("PDF not decrypted (%s), copying: %s", exc, input_path)
+            data = None
+        try:
+            with tempfile.NamedTemporaryFile(delete=False, suffix=".pdf") as temp_file:
+                if data is None:
+                    with open(input_path, "rb") as f:
+                        shutil.copyfileobj(f, temp_file)
+                else:
+                    temp_file.write(data)
+            return temp_file.name
         except Exception as exc:
             logger.error("Error processing single PDF %s: %s", input_path, exc)
             return None
 
     def _clean_filename(self, filename: str) -> str:
         """Remove 'decrypted_' prefixes from filename."""
-        clean_name = filename
-        while clean_name.lower().startswith("decrypted_"):
-            clean_name = clean_name[len("decrypted_"):]
-        return clean_name
+        return _clean_filename(filename)
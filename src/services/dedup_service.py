@@ -0,0 +1,277 @@
+"""
+Near-duplicate chunk elimination before embedding (MinHash signatures + LSH banding).
+
+Re-signed versions of the same contract and repeated OCR boilerplate produce chunks that
+differ only in a few words. Each chunk gets a MinHash signature over word shingles; LSH
+bands find earlier chunks that may be similar, and a candidate whose estimated Jaccard
+similarity reaches DEDUP_THRESHOLD absorbs the new chunk instead of a new vector being
+embedded and stored.
+
+The index is a SQLite file next to the vector store:
+  groups   one row per stored chunk (the group's vector), with its signature
+  bands    LSH band hashes of each group
+  members  every ingested chunk (stored or collapsed) -> its group, with source/page,
+           so answers list every file and page a passage appears in
+A stored vector is only deleted once no member of its group is left.
+"""
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import zlib
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+from langchain_core.documents import Document
+
+from src.core.constants import APP_NAME, MINHASH_BANDS, MINHASH_PERMUTATIONS, MINHASH_SHINGLE_WORDS
+from src.core.logging import get_logger
+from src.models import SETTINGS
+
+logger = get_logger(APP_NAME)
+
+_MERSENNE_61 = (1 << 61) - 1
+_ROWS_PER_BAND = MINHASH_PERMUTATIONS // MINHASH_BANDS
+_SQLITE_MAX_VARS = 900
+_WORD_RE = re.compile(r"\w+")
+
+# Fixed seed: signatures are persisted and must stay comparable across runs
+_rng = np.random.default_rng(20240917)
+_HASH_A = _rng.integers(1, 1 << 32, size=MINHASH_PERMUTATIONS, dtype=np.uint64)
+_HASH_B = _rng.integers(0, 1 << 32, size=MINHASH_PERMUTATIONS, dtype=np.uint64)
+
+SourceRef = Tuple[Optional[str], Optional[int], Optional[bool]]  # (source, page, used_ocr)
+
+
+@dataclass
+class DedupStats:
+    """What the dedup stage saved during one ingest run."""
+    chunks_seen: int = 0
+    duplicates: int = 0  # chunks collapsed into an existing vector (not embedded, not stored)
+    chars_saved: int = 0  # characters of those chunks, i.e. embedding input avoided
+
+    @property
+    def saved_ratio(self) -> float:
+        return self.duplicates / self.chunks_seen if self.chunks_seen else 0.0
+
+
+def _shingle_hashes(text: str) -> np.ndarray:
+    words = _WORD_RE.findall(text.casefold())
+    if len(words) <= MINHASH_SHINGLE_WORDS:
+        shingles = {" ".join(words)}
+    else:
+        shingles = {
+            " ".join(words[i:i + MINHASH_SHINGLE_WORDS])
+            for i in range(len(words) - MINHASH_SHINGLE_WORDS + 1)
+        }
+    return np.fromiter((zlib.crc32(s.encode("utf-8")) for s in shingles), dtype=np.uint64, count=len(shingles))
+
+
+def minhash_signature(text: str) -> np.ndarray:
+    """MINHASH_PERMUTATIONS minimums of (a * shingle + b) mod 2^61-1, as uint32."""
+    shingles = _shingle_hashes(text)
+    # a, shingle < 2^32, so a * shingle + b stays below 2^64
+    values = (np.outer(shingles, _HASH_A) + _HASH_B) % np.uint64(_MERSENNE_61)
+    return (values.min(axis=0) & np.uint64(0xFFFFFFFF)).astype(np.uint32)
+
+
+def _band_hashes(signature: np.ndarray) -> List[int]:
+    return [
+        int.from_bytes(
+            hashlib.blake2b(signature[band * _ROWS_PER_BAND:(band + 1) * _ROWS_PER_BAND].tobytes(), digest_size=8).digest(),
+            "little",
+            signed=True,
+        )
+        for band in range(MINHASH_BANDS)
+    ]
+
+
+def dedup_index_path() -> str:
+    return os.path.join(SETTINGS.vector_persist_dir, f"{SETTINGS.collection_name}.dedup.sqlite")
+
+
+class DedupIndex:
+    """
+    MinHash/LSH index of the stored chunks (see module docstring).
+    Ingestion writes in one transaction (begin ... commit) so queries keep seeing the
+    previous state until the run is complete; close() without commit() discards the run.
+    """
+
+    def __init__(self, path: str, threshold: float = 0.9):
+        self.path = path
+        self.threshold = threshold
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        if self._conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'members'").fetchone():
+            return  # schema exists; do not wait on the write lock an ingest run may hold
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+            CREATE TABLE IF NOT EXISTS groups (stored_id TEXT PRIMARY KEY, signature BLOB NOT NULL);
+            CREATE TABLE IF NOT EXISTS bands (band INTEGER NOT NULL, hash INTEGER NOT NULL, stored_id TEXT NOT NULL);
+            CREATE INDEX IF NOT EXISTS bands_lookup ON bands (band, hash);
+            CREATE INDEX IF NOT EXISTS bands_group ON bands (stored_id);
+            CREATE TABLE IF NOT EXISTS members (
+                chunk_id TEXT PRIMARY KEY, stored_id TEXT NOT NULL, source TEXT, page INTEGER, used_ocr INTEGER
+            );
+            CREATE INDEX IF NOT EXISTS members_group ON members (stored_id);
+            """
+        )
+
+    @property
+    def collection_name(self) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM meta WHERE key = 'collection_name'").fetchone()
+        return row[0] if row else None
+
+    def begin(self, collection_name: str, reset: bool = False) -> None:
+        """Starts the ingest transaction; reset (or another collection) empties the index first."""
+        reset = reset or self.collection_name != collection_name
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            if reset:
+                for table in ("groups", "bands", "members"):
+                    self._conn.execute(f"DELETE FROM {table}")
+            self._conn.execute(
+                "INSERT OR REPLACE INTO meta (key, value) VALUES ('collection_name', ?)",
+                (collection_name,),
+            )
+
+    def commit(self) -> None:
+        with self._lock:
+            if self._conn.in_transaction:
+                self._conn.execute("COMMIT")
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn.in_transaction:
+                self._conn.execute("ROLLBACK")
+            self._conn.close()
+
+    def _execute_in(self, sql: str, values: Sequence) -> List[tuple]:
+        """Runs sql (with one "IN ({})" placeholder list) over values in SQLite-sized batches."""
+        rows: List[tuple] = []
+        for start in range(0, len(values), _SQLITE_MAX_VARS):
+            batch = list(values[start:start + _SQLITE_MAX_VARS])
+            rows.extend(self._conn.execute(sql.format(",".join("?" * len(batch))), batch).fetchall())
+        return rows
+
+    def _best_match(self, signature: np.ndarray, bands: List[int]) -> Optional[str]:
+        placeholders = ",".join("(?, ?)" for _ in bands)
+        params = [v for band, h in enumerate(bands) for v in (band, h)]
+        candidates = self._conn.execute(
+            "SELECT DISTINCT g.stored_id, g.signature FROM bands b JOIN groups g ON g.stored_id = b.stored_id "
+            f"WHERE (b.band, b.hash) IN (VALUES {placeholders})",
+            params,
+        ).fetchall()
+        best_id, best_score = None, self.threshold
+        for stored_id, blob in candidates:
+            score = float(np.mean(np.frombuffer(blob, dtype=np.uint32) == signature))
+            if score >= best_score:
+                best_id, best_score = stored_id, score
+        return best_id
+
+    def _add_group(self, chunk: Document, signature: np.ndarray, bands: List[int]) -> None:
+        stored_id = chunk.metadata["chunk_id"]
+        self._conn.execute(
+            "INSERT OR REPLACE INTO groups (stored_id, signature) VALUES (?, ?)",
+            (stored_id, signature.tobytes()),
+        )
+        self._conn.executemany(
+            "INSERT INTO bands (band, hash, stored_id) VALUES (?, ?, ?)",
+            [(band, h, stored_id) for band, h in enumerate(bands)],
+        )
+        self._add_member(chunk, stored_id)
+
+    def _add_member(self, chunk: Document, stored_id: str) -> None:
+        meta = chunk.metadata
+        used_ocr = meta.get("used_ocr")
+        self._conn.execute(
+            "INSERT OR REPLACE INTO members (chunk_id, stored_id, source, page, used_ocr) VALUES (?, ?, ?, ?, ?)",
+            (meta["chunk_id"], stored_id, meta.get("source"), meta.get("page"), None if used_ocr is None else int(used_ocr)),
+        )
+
+    def add(self, chunks: Sequence[Document], stats: Optional[DedupStats] = None) -> List[Document]:
+        """
+        Registers chunks and returns those that need a vector of their own; the others are
+        recorded as members of the near-identical stored chunk they collapse into.
+        """
+        kept: List[Document] = []
+        with self._lock:
+            for chunk in chunks:
+                signature = minhash_signature(chunk.page_content)
+                bands = _band_hashes(signature)
+                match = self._best_match(signature, bands)
+                if match is None:
+                    self._add_group(chunk, signature, bands)
+                    kept.append(chunk)
+                else:
+                    self._add_member(chunk, match)
+                    if stats is not None:
+                        stats.duplicates += 1
+                        stats.chars_saved += len(chunk.page_content)
+            if stats is not None:
+                stats.chunks_seen += len(chunks)
+        return kept
+
+    def add_stored(self, chunks: Iterable[Document]) -> None:
+        """Registers chunks already in the vector store as groups of their own (backfill)."""
+        with self._lock:
+            for chunk in chunks:
+                signature = minhash_signature(chunk.page_content)
+                self._add_group(chunk, signature, _band_hashes(signature))
+
+    def release(self, chunk_ids: Sequence[str]) -> List[str]:
+        """
+        Forgets chunks of changed or deleted files. Returns the IDs to delete from the
+        vector store: groups left without members, plus IDs the index never tracked.
+        """
+        with self._lock:
+            tracked = dict(self._execute_in("SELECT chunk_id, stored_id FROM members WHERE chunk_id IN ({})", chunk_ids))
+            self._execute_in("DELETE FROM members WHERE chunk_id IN ({})", list(tracked))
+            groups = sorted(set(tracked.values()))
+            alive = {row[0] for row in self._execute_in("SELECT DISTINCT stored_id FROM members WHERE stored_id IN ({})", groups)}
+            emptied = [g for g in groups if g not in alive]
+            self._execute_in("DELETE FROM groups WHERE stored_id IN ({})", emptied)
+            self._execute_in("DELETE FROM bands WHERE stored_id IN ({})", emptied)
+        return emptied + [cid for cid in chunk_ids if cid not in tracked]
+
+    def sources(self, stored_ids: Sequence[str]) -> Dict[str, List[SourceRef]]:
+        """(source, page, used_ocr) of every member of the given stored chunks, by stored ID."""
+        with self._lock:
+            rows = self._execute_in(
+                "SELECT stored_id, source, page, used_ocr FROM members WHERE stored_id IN ({}) ORDER BY source, page",
+                list(stored_ids),
+            )
+        found: Dict[str, List[SourceRef]] = {}
+        for stored_id, source, page, used_ocr in rows:
+            found.setdefault(stored_id, []).append((source, page, None if used_ocr is None else bool(used_ocr)))
+        return found
+
+
+_index: Optional[DedupIndex] = None
+_index_lock = threading.Lock()
+
+
+def get_dedup_index() -> Optional[DedupIndex]:
+    """Process-wide read handle on the dedup index; None when DEDUP_CHUNKS is off or nothing was ingested yet."""
+    global _index
+    if not SETTINGS.dedup_chunks:
+        return None
+    with _index_lock:
+        if _index is None and os.path.isfile(dedup_index_path()):
+            _index = DedupIndex(dedup_index_path(), SETTINGS.dedup_threshold)
+        return _index
+
+
+def chunk_sources(docs: Sequence[Document]) -> Dict[str, List[SourceRef]]:
+    """Every (source, page, used_ocr) of the retrieved chunks, by chunk ID; empty without a dedup index."""
+    index = get_dedup_index()
+    chunk_ids = [doc.metadata["chunk_id"] for doc in docs if doc.metadata.get("chunk_id")]
+    if index is None or not chunk_ids:
+        return {}
+    return index.sources(chunk_ids)
@@ -0,0 +1,157 @@
+"""
+Persistent embedding cache wrapping any LangChain Embeddings (e.g. OpenAIEmbeddings).
+Vectors are stored in SQLite keyed by (embedding model, hash of the whitespace-normalized
+text), identical texts in a batch are embedded once, and the least recently used
+entries are evicted beyond a size bound. The async methods run the SQLite work on a
+worker thread, so cache lookups never block the event loop.
+"""
+import asyncio
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from array import array
+from typing import Dict, List, Sequence, Tuple
+
+from langchain_core.embeddings import Embeddings
+
+from src.core.constants import APP_NAME
+from src.core.logging import get_logger
+
+logger = get_logger(APP_NAME)
+
+_EVICT_SLACK_RATIO = 0.05  # evict 5% extra so eviction doesn't run on every insert
+_TOUCH_INTERVAL_SECONDS = 3600.0  # a hit refreshes last_used only if older than this (no write per hit)
+
+
+def normalize_text(text: str) -> str:
+    return " ".join(text.split())
+
+
+class CachedEmbeddings(Embeddings):
+    """Embeddings with a persistent (model, text hash) -> vector cache and LRU eviction."""
+
+    def __init__(self, underlying: Embeddings, model: str, cache_path: str, max_entries: int):
+        self.underlying = underlying
+        self.model = model
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        parent = os.path.dirname(cache_path)
+        if parent:
+            os.makedirs(parent, exist_ok=True)
+        self._conn = sqlite3.connect(cache_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            "key TEXT PRIMARY KEY, vector BLOB NOT NULL, last_used REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS ix_embeddings_last_used ON embeddings (last_used)")
+        self._conn.commit()
+        self._count = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+
+    def _key(self, text: str) -> str:
+        normalized = normalize_text(text)
+        return hashlib.sha256(f"{self.model}\0{normalized}".encode("utf-8")).hexdigest()
+
+    def _lookup(self, keys: Sequence[str]) -> Dict[str, List[float]]:
+        found: Dict[str, List[float]] = {}
+        stale: List[str] = []
+        unique = list(dict.fromkeys(keys))
+        now = time.time()
+        with self._lock:
+            for start in range(0, len(unique), 500):  # stay under SQLite's variable limit
+                batch = unique[start:start + 500]
+                placeholders = ",".join("?" * len(batch))
+                rows = self._conn.execute(
+                    f"SELECT key, vector, last_used FROM embeddings WHERE key IN ({placeholders})", batch
+                ).fetchall()
+                for key, blob, last_used in rows:
+                    found[key] = array("f", blob).tolist()
+                    if now - last_used > _TOUCH_INTERVAL_SECONDS:
+                        stale.append(key)
+            if stale:
+                # LRU order at _TOUCH_INTERVAL_SECONDS granularity is enough for eviction
+                self._conn.executemany("UPDATE embeddings SET last_used = ? WHERE key = ?", [(now, k) for k in stale])
+                self._conn.commit()
+        return found
+
+    def _store(self, vectors: Dict[str, List[float]]) -> None:
+        if not vectors:
+            return
+        now = time.time()
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (key, vector, last_used) VALUES (?, ?, ?)",
+                [(key, array("f", vec).tobytes(), now) for key, vec in vectors.items()],
+            )
+            self._count += len(vectors)
+            if self._count > self.max_entries:
+                self._evict()
+            self._conn.commit()
+
+    def _evict(self) -> None:
+        self._count = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+        excess = self._count - self.max_entries
+        if excess <= 0:
+            return
+        excess += int(self.max_entries * _EVICT_SLACK_RATIO)
+        self._conn.execute(
+            "DELETE FROM embeddings WHERE key IN "
+            "(SELECT key FROM embeddings ORDER BY last_used LIMIT ?)",
+            (excess,),
+        )
+        self._count = max(self._count - excess, 0)
+        logger.debug("Embedding cache evicted %s entries", excess)
+
+    def _plan(self, texts: Sequence[str]) -> Tuple[List[str], Dict[str, List[float]], Dict[str, str]]:
+        """Returns per-text keys, cached vectors, and the unique uncached texts (key -> text)."""
+        keys = [self._key(t) for t in texts]
+        cached = self._lookup(keys)
+        missing: Dict[str, str] = {}
+        for key, text in zip(keys, texts):
+            if key not in cached and key not in missing:
+                missing[key] = text
+        n_missing = sum(1 for key in keys if key in missing)
+        with self._lock:
+            self.hits += len(keys) - n_missing
+            self.misses += n_missing
+        return keys, cached, missing
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        keys, vectors, missing = self._plan(texts)
+        if missing:
+            computed = self.underlying.embed_documents(list(missing.values()))
+            fresh = dict(zip(missing.keys(), computed))
+            self._store(fresh)
+            vectors.update(fresh)
+        return [vectors[key] for key in keys]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        keys, vectors, missing = await asyncio.to_thread(self._plan, texts)
+        if missing:
+            computed = await self.underlying.aembed_documents(list(missing.values()))
+            fresh = dict(zip(missing.keys(), computed))
+            await asyncio.to_thread(self._store, fresh)
+            vectors.update(fresh)
+        return [vectors[key] for key in keys]
+
+    async def aembed_query(self, text: str) -> List[float]:
+        return (await self.aembed_documents([text]))[0]
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / total, 4) if total else 0.0,
+                "entries": self._count,
+            }
+
@@ -1,53 +1,329 @@
-import io
+import cProfile
 import os
-from typing import List, Optional
+import threading
+import time
+from abc import ABC, abstractmethod
+from concurrent.futures import Executor, Future, ProcessPoolExecutor
+from contextlib import nullcontext
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Any, Callable, ContextManager, Dict, List, Optional, Tuple
 
 import fitz  # PyMuPDF
+import numpy as np
 import pytesseract
 from langchain_core.documents import Document
 from PIL import Image
 
-from src.core.constants import APP_NAME, DEFAULT_DPI, MIN_TEXT_LEN
+try:
+    import tesserocr
+except ImportError:
+    tesserocr = None  # type: ignore[assignment]
+
+from src.core.constants import (
+    APP_NAME,
+    BLANK_PAGE_DPI,
+    BLANK_PAGE_INK_LEVEL,
+    BLANK_PAGE_MAX_INK_RATIO,
+    BLANK_PAGE_MIN_STD,
+    DEFAULT_DPI,
+    MIN_TEXT_LEN,
+)
 from src.core.logging import get_logger
+from src.core.metrics import OCR_SECONDS, PAGE_RENDER_SECONDS, PAGES_EXTRACTED
+from src.models import SETTINGS
+from src.services.ocr_cache_service import OcrCache, file_sha256
+from src.services.profiling_service import dump_profile_part
 
 logger = get_logger(APP_NAME)
 
+_TESSEROCR_REQUIRED_MSG = "tesserocr is required for OCR_BACKEND=tesserocr. Install with: pip install tesserocr"
+
+
+def _render_pixmap(page: fitz.Page, dpi: int, grayscale: bool) -> fitz.Pixmap:
+    zoom = dpi / 72.0
+    mat = fitz.Matrix(zoom, zoom)
+    colorspace = fitz.csGRAY if grayscale else fitz.csRGB
+    return page.get_pixmap(matrix=mat, colorspace=colorspace, alpha=False)
+
+
+def _pixmap_to_image(pix: fitz.Pixmap, mode: str) -> Image.Image:
+    """Wraps the pixmap's raw samples in a PIL image (no PNG encode/decode round trip)."""
+    return Image.frombuffer(mode, (pix.width, pix.height), pix.samples, "raw", mode, pix.stride, 1)
+
 
 def page_to_pil_image(page: fitz.Page, dpi: int = DEFAULT_DPI) -> Image.Image:
     """
-    Renders a PDF page to a PIL image using PyMuPDF (no poppler needed).
+    Renders a PDF page to an RGB PIL image using PyMuPDF (no poppler needed).
     """
-    zoom = dpi / 72.0
-    mat = fitz.Matrix(zoom, zoom)
-    pix = page.get_pixmap(matrix=mat, alpha=False)
-    img_bytes = pix.tobytes("png")
-    img = Image.open(io.BytesIO(img_bytes))
-    return img.convert("RGB")
+    return _pixmap_to_image(_render_pixmap(page, dpi, grayscale=False), "RGB")
 
 
-def extract_pdf_documents_with_ocr(
-    pdf_path: str,
-    min_text_len: int = MIN_TEXT_LEN,
-    ocr_language: str = "eng",
-) -> List[Document]:
+def _pixmap_to_ocr_image(pix: fitz.Pixmap) -> Image.Image:
+    img = _pixmap_to_image(pix, "L")
+    # pytesseract hands images over as a temp file in img.format; PPM (P5 for mode "L")
+    # is an uncompressed sample dump instead of a PNG compression pass
+    img.format = "PPM"
+    return img
+
+
+def page_to_ocr_image(page: fitz.Page, dpi: int = DEFAULT_DPI) -> Image.Image:
     """
-    Extracts per-page text from a PDF. If extracted text is too short, uses OCR.
+    Renders a PDF page for OCR: 8-bit grayscale (a third of the RGB size; Tesseract
+    converts to gray anyway) built directly from the pixmap samples.
+    """
+    return _pixmap_to_ocr_image(_render_pixmap(page, dpi, grayscale=True))
+
+
+def ocr_executor(workers: int) -> ContextManager[Optional[Executor]]:
     """
-    docs: List[Document] = []
-    pdf_name = os.path.basename(pdf_path)
+    Returns a process pool for OCR work, or a no-op context (None) when workers <= 1.
+    Processes are used because rendering and Tesseract are CPU-bound.
+    """
+    if workers <= 1:
+        return nullcontext(None)
+    return ProcessPoolExecutor(max_workers=workers)
+
+
+class OcrEngine(ABC):
+    """Turns images into text for one OCR language. Instances are long-lived (one per process)."""
+    name = "base"
+
+    def __init__(self, ocr_language: str):
+        self.ocr_language = ocr_language
+        self._lock = threading.Lock()
+
+    @staticmethod
+    @abstractmethod
+    def version() -> str:
+        """Tesseract version; part of the OCR cache key."""
+
+    @abstractmethod
+    def image_to_string(self, img: Image.Image) -> str:
+        """OCR text of img, stripped."""
+
+    def pixmap_to_string(self, pix: fitz.Pixmap) -> str:
+        """OCR of a grayscale pixmap; engines that accept raw buffers override this."""
+        return self.image_to_string(_pixmap_to_ocr_image(pix))
+
+
+class PytesseractEngine(OcrEngine):
+    """Runs the tesseract CLI per call (subprocess + temp file; the model is reloaded every time)."""
+    name = "pytesseract"
 
+    @staticmethod
+    def version() -> str:
+        return str(pytesseract.get_tesseract_version())
+
+    def image_to_string(self, img: Image.Image) -> str:
+        return (pytesseract.image_to_string(img, lang=self.ocr_language) or "").strip()
+
+
+class TesserocrEngine(OcrEngine):
+    """Tesseract C API via tesserocr: the language model is loaded once and reused."""
+    name = "tesserocr"
+
+    def __init__(self, ocr_language: str):
+        if tesserocr is None:
+            raise ImportError(_TESSEROCR_REQUIRED_MSG)
+        super().__init__(ocr_language)
+        self._api = tesserocr.PyTessBaseAPI(lang=ocr_language)
+
+    @staticmethod
+    def version() -> str:
+        if tesserocr is None:
+            raise ImportError(_TESSEROCR_REQUIRED_MSG)
+        return tesserocr.tesseract_version().splitlines()[0]
+
+    def image_to_string(self, img: Image.Image) -> str:
+        with self._lock:  # a TessBaseAPI handle is not thread-safe
+            self._api.SetImage(img)
+            return (self._api.GetUTF8Text() or "").strip()
+
+    def pixmap_to_string(self, pix: fitz.Pixmap) -> str:
+        with self._lock:
+            self._api.SetImageBytes(pix.samples, pix.width, pix.height, pix.n, pix.stride)
+            return (self._api.GetUTF8Text() or "").strip()
+
+
+OCR_ENGINES = {engine.name: engine for engine in (PytesseractEngine, TesserocrEngine)}
+_engines: Dict[Tuple[str, str], OcrEngine] = {}
+_engines_lock = threading.Lock()
+
+
+@lru_cache(maxsize=None)
+def _engine_class(backend: Optional[str] = None) -> type:
+    """OCR_BACKEND's engine class, falling back to pytesseract if it is unknown or unavailable."""
+    backend = backend or SETTINGS.ocr_backend
+    engine_cls = OCR_ENGINES.get(backend)
+    if engine_cls is None:
+        logger.warning("Unknown OCR_BACKEND %s; using pytesseract", backend)
+        return PytesseractEngine
+    if engine_cls is TesserocrEngine and tesserocr is None:
+        logger.warning(_TESSEROCR_REQUIRED_MSG + "; using pytesseract")
+        return PytesseractEngine
+    return engine_cls
+
+
+def get_ocr_engine(ocr_language: str, backend: Optional[str] = None) -> OcrEngine:
+    """Returns this process's engine for (backend, language), creating it on first use."""
+    engine_cls = _engine_class(backend)
+    key = (engine_cls.name, ocr_language)
+    with _engines_lock:
+        engine = _engines.get(key)
+        if engine is None:
+            engine = engine_cls(ocr_language)
+            _engines[key] = engine
+        return engine
+
+
+@lru_cache(maxsize=None)
+def ocr_engine_version(backend: Optional[str] = None) -> str:
+    """Backend name and Tesseract version; part of the OCR cache key."""
+    engine_cls = _engine_class(backend)
+    try:
+        return f"{engine_cls.name}:{engine_cls.version()}"
+    except Exception:
+        return f"{engine_cls.name}:unknown"
+
+
+def _completed(value: Any) -> Future:
+    future: Future = Future()
+    future.set_result(value)
+    return future
+
+
+def _run_inline(fn: Callable[..., Any], *args: Any) -> Future:
+    """Runs fn in the current process and wraps the outcome in a completed Future."""
+    future: Future = Future()
+    try:
+        future.set_result(fn(*args))
+    except Exception as exc:
+        future.set_exception(exc)
+    return future
+
+
+@dataclass
+class _OcrResult:
+    """OCR text plus the timings measured where it ran (a worker process; None for cache hits)."""
+    text: str
+    render_seconds: Optional[float] = None
+    ocr_seconds: Optional[float] = None
+    profile_path: Optional[str] = None  # partial cProfile of the task (PROFILE_INGEST)
+
+    def observe(self, kind: str) -> None:
+        if self.ocr_seconds is None:
+            return
+        OCR_SECONDS.labels(backend=_engine_class().name, kind=kind).observe(self.ocr_seconds)
+        if self.render_seconds is not None:
+            PAGE_RENDER_SECONDS.labels(purpose="ocr").observe(self.render_seconds)
+
+
+def _ocr_page(page: fitz.Page, dpi: int, ocr_language: str) -> _OcrResult:
+    start = time.perf_counter()
+    pix = _render_pixmap(page, dpi, grayscale=True)
+    rendered = time.perf_counter()
+    text = get_ocr_engine(ocr_language).pixmap_to_string(pix)
+    return _OcrResult(text, rendered - start, time.perf_counter() - rendered)
+
+
+def _ocr_pdf_page(pdf_path: str, page_index: int, dpi: int, ocr_language: str) -> _OcrResult:
+    """Worker entry point: fitz documents are not picklable, so each task reopens the PDF."""
     with fitz.open(pdf_path) as pdf_doc:
-        for page_index in range(len(pdf_doc)):
-            page = pdf_doc[page_index]
-            text = (page.get_text("text") or "").strip()
+        if pdf_doc.needs_pass:
+            pdf_doc.authenticate("")  # owner password only
+        return _ocr_page(pdf_doc[page_index], dpi, ocr_language)
+
+
+def _ocr_pdf_page_bytes(page_pdf: bytes, dpi: int, ocr_language: str) -> _OcrResult:
+    """Worker entry point for PDFs decrypted in memory: the page travels as a one-page PDF."""
+    with fitz.open(stream=page_pdf, filetype="pdf") as pdf_doc:
+        return _ocr_page(pdf_doc[0], dpi, ocr_language)
+
+
+def _page_pdf_bytes(pdf_doc: fitz.Document, page_index: int) -> bytes:
+    with fitz.open() as single:
+        single.insert_pdf(pdf_doc, from_page=page_index, to_page=page_index)
+        return single.tobytes()
+
+
+def _ocr_image_file(image_path: str, ocr_language: str) -> _OcrResult:
+    with Image.open(image_path) as img:
+        start = time.perf_counter()
+        text = get_ocr_engine(ocr_language).image_to_string(img)
+        return _OcrResult(text, ocr_seconds=time.perf_counter() - start)
+
+
+def _profiled_ocr(fn: Callable[..., _OcrResult], *args: Any) -> _OcrResult:
+    """Worker entry point with PROFILE_INGEST: runs fn under cProfile and returns the profile file with the result."""
+    profile = cProfile.Profile()
+    result = profile.runcall(fn, *args)
+    result.profile_path = dump_profile_part(profile)
+    return result
+
+
+def _submit_ocr(executor: Executor, fn: Callable[..., _OcrResult], *args: Any) -> Future:
+    if SETTINGS.profile_ingest:
+        return executor.submit(_profiled_ocr, fn, *args)
+    return executor.submit(fn, *args)
+
+
+@dataclass
+class ExtractionStats:
+    """Page counters accumulated across files by submit_pdf_extraction."""
+    ocr_pages: int = 0  # pages sent to (or served from the cache of) the OCR engine
+    blank_pages_skipped: int = 0  # short-text pages whose thumbnail showed no content
+
+
+@dataclass
+class _PageTask:
+    page_index: int
+    text: str  # text layer
+    future: Optional[Future] = None  # OCR result, when the page needs OCR
+    cache_key: Optional[str] = None  # key to store the OCR result under (cache misses only)
+    blank: bool = False  # OCR skipped: blank/near-blank page
 
+
+def is_blank_page(page: fitz.Page) -> bool:
+    """
+    Cheap pre-OCR check on a low-resolution grayscale thumbnail: a page is blank when
+    almost no pixels are dark (ink coverage) or the page is nearly uniform (pixel std).
+    """
+    with PAGE_RENDER_SECONDS.labels(purpose="blank_check").time():
+        pix = _render_pixmap(page, BLANK_PAGE_DPI, grayscale=True)
+    pixels = np.frombuffer(pix.samples, dtype=np.uint8)
+    if pixels.size == 0:
+        return True
+    ink_ratio = np.count_nonzero(pixels < BLANK_PAGE_INK_LEVEL) / pixels.size
+    return ink_ratio < BLANK_PAGE_MAX_INK_RATIO or float(pixels.std()) < BLANK_PAGE_MIN_STD
+
+
+@dataclass
+class PendingPdfExtraction:
+    """Per-page text of a PDF whose OCR pages may still be running in a worker pool."""
+    pdf_path: str
+    source_path: str  # path reported in metadata (the original file when pdf_path is a decrypted copy)
+    pages: List[_PageTask] = field(default_factory=list)
+    cache: Optional[OcrCache] = None
+    profile_parts: List[str] = field(default_factory=list)  # worker profiles of collected OCR tasks
+
+    def result(self) -> List[Document]:
+        """Waits for outstanding OCR and returns the page documents in page order."""
+        docs: List[Document] = []
+        pdf_name = os.path.basename(self.source_path)
+
+        for task in self.pages:
+            page_index, text, future = task.page_index, task.text, task.future
             used_ocr = False
-            if len(text) < min_text_len:
+            if future is not None:
                 try:
-                    img = page_to_pil_image(page, dpi=DEFAULT_DPI)
-                    ocr_text = (
-                        pytesseract.image_to_string(img, lang=ocr_language) or ""
-                    ).strip()
+                    ocr = future.result()
+                    ocr.observe("pdf_page")
+                    if ocr.profile_path:
+                        self.profile_parts.append(ocr.profile_path)
+                    ocr_text = ocr.text
+                    if self.cache is not None and task.cache_key is not None:
+                        self.cache.put(task.cache_key, ocr_text)
                     if len(ocr_text) > len(text):
                         text = ocr_text
                         used_ocr = True
@@ -64,30 +340,173 @@ def extract_pdf_documents_with_ocr(
 
             metadata = {
                 "source": pdf_name,
-                "path": pdf_path,
+                "path": self.source_path,
                 "page": page_index + 1,
                 "used_ocr": used_ocr,
             }
+            if task.blank:
+                metadata["blank_page"] = True
+            PAGES_EXTRACTED.labels(kind="pdf", used_ocr=str(used_ocr).lower()).inc()
             docs.append(Document(page_content=text, metadata=metadata))
 
-    return docs
+        return docs
 
 
-def extract_image_document(image_path: str, ocr_language: str) -> Optional[Document]:
-    try:
-        with Image.open(image_path) as img:
-            text = (pytesseract.image_to_string(img, lang=ocr_language) or "").strip()
-    except Exception as exc:
-        logger.warning("OCR failed for image %s. Error=%s", image_path, exc)
-        return None
-
-    if not text:
-        return None
-
-    metadata = {
-        "source": os.path.basename(image_path),
-        "path": image_path,
-        "page": 1,
-        "used_ocr": True,
-    }
-    return Document(page_content=text, metadata=metadata)
+def submit_pdf_extraction(
+    pdf_path: str,
+    min_text_len: int = MIN_TEXT_LEN,
+    ocr_language: str = "eng",
+    executor: Optional[Executor] = None,
+    cache: Optional[OcrCache] = None,
+    file_hash: Optional[str] = None,
+    source_path: Optional[str] = None,
+    skip_blank_pages: bool = True,
+    stats: Optional[ExtractionStats] = None,
+    pdf_doc: Optional[fitz.Document] = None,
+    stream: Optional[bytes] = None,
+) -> PendingPdfExtraction:
+    """
+    Reads the text layer of every page and schedules OCR for pages whose text is too short.
+    With an executor, OCR pages fan out across workers; call .result() to collect them.
+    With a cache, OCR text is looked up by file_hash (defaults to the hash of pdf_path).
+    source_path overrides the path recorded in metadata (e.g. for a decrypted temp copy).
+    Blank/near-blank pages skip OCR (metadata "blank_page") unless skip_blank_pages is False.
+    stream is the content of pdf_path decrypted in memory: it is read instead of pdf_path,
+    and OCR workers get its pages as bytes. pdf_doc is the document already open (of
+    stream, or else of pdf_path); the caller keeps ownership and closes it.
+    """
+    pending = PendingPdfExtraction(pdf_path=pdf_path, source_path=source_path or pdf_path, cache=cache)
+    if cache is not None and file_hash is None:
+        file_hash = file_sha256(pdf_path)
+
+    if pdf_doc is not None:
+        opened: ContextManager[fitz.Document] = nullcontext(pdf_doc)
+    elif stream is not None:
+        opened = fitz.open(stream=stream, filetype="pdf")
+    else:
+        opened = fitz.open(pdf_path)
+
+    with opened as pdf_doc:
+        for page_index in range(len(pdf_doc)):
+            page = pdf_doc[page_index]
+            task = _PageTask(page_index, (page.get_text("text") or "").strip())
+            pending.pages.append(task)
+            if len(task.text) >= min_text_len:
+                continue
+
+            if skip_blank_pages and is_blank_page(page):
+                task.blank = True
+                if stats is not None:
+                    stats.blank_pages_skipped += 1
+                continue
+
+            if stats is not None:
+                stats.ocr_pages += 1
+            cached: Optional[str] = None
+            if cache is not None:
+                task.cache_key = OcrCache.key(
+                    file_hash, page_index, DEFAULT_DPI, ocr_language, ocr_engine_version()
+                )
+                cached = cache.get(task.cache_key)
+            if cached is not None:
+                task.future, task.cache_key = _completed(_OcrResult(cached)), None
+            elif executor is None:
+                task.future = _run_inline(_ocr_page, page, DEFAULT_DPI, ocr_language)
+            elif stream is not None:
+                task.future = _submit_ocr(
+                    executor, _ocr_pdf_page_bytes, _page_pdf_bytes(pdf_doc, page_index), DEFAULT_DPI, ocr_language
+                )
+            else:
+                task.future = _submit_ocr(
+                    executor, _ocr_pdf_page, pdf_path, page_index, DEFAULT_DPI, ocr_language
+                )
+
+    return pending
+
+
+def extract_pdf_documents_with_ocr(
+    pdf_path: str,
+    min_text_len: int = MIN_TEXT_LEN,
+    ocr_language: str = "eng",
+    executor: Optional[Executor] = None,
+) -> List[Document]:
+    """
+    Extracts per-page text from a PDF. If extracted text is too short, uses OCR.
+    Pass an executor (see ocr_executor) to OCR pages in parallel; output stays in page order.
+    """
+    return submit_pdf_extraction(
+        pdf_path,
+        min_text_len=min_text_len,
+        ocr_language=ocr_language,
+        executor=executor,
+    ).result()
+
+
+@dataclass
+class PendingImageExtraction:
+    """OCR of a single image that may still be running in a worker pool."""
+    image_path: str
+    future: Future
+    cache_key: Optional[str] = None
+    cache: Optional[OcrCache] = None
+    profile_parts: List[str] = field(default_factory=list)
+
+    def result(self) -> Optional[Document]:
+        try:
+            ocr = self.future.result()
+        except Exception as exc:
+            logger.warning("OCR failed for image %s. Error=%s", self.image_path, exc)
+            return None
+        ocr.observe("image")
+        if ocr.profile_path:
+            self.profile_parts.append(ocr.profile_path)
+        text = ocr.text
+        if self.cache is not None and self.cache_key is not None:
+            self.cache.put(self.cache_key, text)
+
+        if not text:
+            return None
+
+        metadata = {
+            "source": os.path.basename(self.image_path),
+            "path": self.image_path,
+            "page": 1,
+            "used_ocr": True,
+        }
+        PAGES_EXTRACTED.labels(kind="image", used_ocr="true").inc()
+        return Document(page_content=text, metadata=metadata)
+
+
+def submit_image_extraction(
+    image_path: str,
+    ocr_language: str,
+    executor: Optional[Executor] = None,
+    cache: Optional[OcrCache] = None,
+) -> PendingImageExtraction:
+    """
+    Schedules OCR of an image on the executor (or runs it inline).
+    Images are OCR'd at native resolution, so their cache key uses page 0 and DPI 0.
+    """
+    cache_key: Optional[str] = None
+    if cache is not None:
+        try:
+            cache_key = OcrCache.key(file_sha256(image_path), 0, 0, ocr_language, ocr_engine_version())
+        except OSError:
+            cache_key = None  # unreadable file: let OCR report the error
+        cached = cache.get(cache_key) if cache_key else None
+        if cached is not None:
+            return PendingImageExtraction(image_path, _completed(_OcrResult(cached)))
+
+    if executor is None:
+        future = _run_inline(_ocr_image_file, image_path, ocr_language)
+    else:
+        future = _submit_ocr(executor, _ocr_image_file, image_path, ocr_language)
+    return PendingImageExtraction(image_path, future, cache_key=cache_key, cache=cache)
+
+
+def extract_image_document(
+    image_path: str,
+    ocr_language: str,
+    cache: Optional[OcrCache] = None,
+) -> Optional[Document]:
+    return submit_image_extraction(image_path, ocr_language, cache=cache).result()
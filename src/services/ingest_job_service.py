@@ -0,0 +1,91 @@
+"""
+Background ingestion jobs: ingestion runs on a worker thread so the API keeps
+serving (health probes, /rag on the previous collection) while it progresses.
+"""
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Optional
+
+from src.core.constants import APP_NAME
+from src.core.logging import get_logger
+from src.services.coordination_service import IngestLockBusy
+from src.services.ingest_service import IngestStats
+
+logger = get_logger(APP_NAME)
+
+JOB_PENDING = "pending"
+JOB_RUNNING = "running"
+JOB_SUCCEEDED = "succeeded"
+JOB_FAILED = "failed"
+JOB_SKIPPED = "skipped"  # another process was ingesting into the collection
+
+
+@dataclass
+class IngestJob:
+    job_id: str
+    status: str = JOB_PENDING
+    created_at: float = field(default_factory=time.time)
+    stats: IngestStats = field(default_factory=IngestStats)
+    error: Optional[str] = None
+
+    @property
+    def active(self) -> bool:
+        return self.status in (JOB_PENDING, JOB_RUNNING)
+
+
+class IngestJobManager:
+    """Runs ingest jobs one at a time on a background thread and keeps recent job status."""
+
+    def __init__(self, run_job: Callable[[IngestJob], None], max_history: int = 50):
+        self._run_job = run_job
+        self._max_history = max_history
+        self._jobs: Dict[str, IngestJob] = OrderedDict()
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="ingest")
+
+    def submit(self) -> IngestJob:
+        """Starts a job, or returns the active one if a job is already pending or running."""
+        with self._lock:
+            for job in reversed(self._jobs.values()):
+                if job.active:
+                    return job
+            job = IngestJob(job_id=uuid.uuid4().hex)
+            self._jobs[job.job_id] = job
+            while len(self._jobs) > self._max_history:
+                self._jobs.pop(next(iter(self._jobs)))
+        self._executor.submit(self._run, job)
+        return job
+
+    def get(self, job_id: str) -> Optional[IngestJob]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def latest(self) -> Optional[IngestJob]:
+        with self._lock:
+            return next(reversed(self._jobs.values()), None)
+
+    def _run(self, job: IngestJob) -> None:
+        job.status = JOB_RUNNING
+        job.stats.started_at = time.time()
+        logger.info("Ingest job %s started", job.job_id)
+        try:
+            self._run_job(job)
+            job.status = JOB_SUCCEEDED
+            logger.info("Ingest job %s finished in %ss", job.job_id, round(job.stats.elapsed_seconds, 1))
+        except IngestLockBusy as exc:
+            job.status = JOB_SKIPPED
+            job.error = str(exc)
+            logger.info("Ingest job %s skipped: %s", job.job_id, exc)
+        except Exception as exc:
+            job.status = JOB_FAILED
+            job.error = str(exc)
+            logger.exception("Ingest job %s failed", job.job_id)
+        finally:
+            job.stats.finished_at = job.stats.finished_at or time.time()
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
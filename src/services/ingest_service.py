@@ -0,0 +1,418 @@
+"""
+Incremental, streaming ingestion.
+
+Only new or changed files in DOCS_DIR are extracted and embedded; chunks of modified
+or deleted files are removed from the collection. Extraction, chunking, embedding and
+upsert run as pipeline stages connected by bounded queues, so they overlap and peak
+memory depends on INGEST_BATCH_SIZE / INGEST_QUEUE_SIZE rather than on corpus size.
+"""
+import os
+import queue
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Any, Callable, Collection, Dict, Iterator, List, Optional
+
+from langchain_core.documents import Document
+
+from src.core.constants import APP_NAME
+from src.core.logging import get_logger
+from src.core.metrics import EMBEDDING_BATCH_SECONDS, EMBEDDING_BATCH_SIZE, INGEST_QUEUE_DEPTH
+from src.models import SETTINGS
+from src.services.chunking_service import chunk_file_documents
+from src.services.dedup_service import DedupIndex, DedupStats, dedup_index_path
+from src.services.embedding_cache_service import CachedEmbeddings
+from src.services.lexical_index_service import (
+    LexicalIndex,
+    LexicalIndexBuilder,
+    lexical_index_path,
+    set_lexical_index,
+)
+from src.services.manifest_service import (
+    FileRecord,
+    IngestManifest,
+    load_manifest,
+    save_manifest,
+)
+from src.services.vectorstore_service import (
+    AnyVectorStore,
+    delete_chunks,
+    get_embeddings,
+    iter_collection_chunks,
+    open_vectorstore,
+    optimize_vectorstore,
+    promote_collection,
+    reset_vectorstore,
+    staging_collection_name,
+    upsert_embeddings,
+    vectorstore_backend,
+)
+
+if TYPE_CHECKING:
+    from src.services.extraction_service import ExtractionStats
+
+logger = get_logger(APP_NAME)
+
+_DONE = object()  # end-of-stream marker passed between pipeline stages
+
+
+def _extraction_stats() -> "ExtractionStats":
+    # Extraction (PyMuPDF, Tesseract) is imported when an ingest starts, not with the API
+    from src.services.extraction_service import ExtractionStats
+
+    return ExtractionStats()
+
+
+@dataclass
+class IngestStats:
+    """Counters of one ingest run, updated while it progresses."""
+    started_at: float = field(default_factory=time.time)
+    finished_at: Optional[float] = None
+    files_total: int = 0
+    files_to_process: int = 0
+    files_done: int = 0
+    files_unchanged: int = 0
+    files_deleted: int = 0
+    pages: int = 0
+    chunks_added: int = 0
+    chunks_deleted: int = 0
+    extraction: "ExtractionStats" = field(default_factory=_extraction_stats)
+    dedup: DedupStats = field(default_factory=DedupStats)
+
+    @property
+    def blank_pages_skipped(self) -> int:
+        return self.extraction.blank_pages_skipped
+
+    @property
+    def chunks_deduplicated(self) -> int:
+        return self.dedup.duplicates
+
+    @property
+    def elapsed_seconds(self) -> float:
+        return (self.finished_at or time.time()) - self.started_at
+
+    @property
+    def pages_per_second(self) -> float:
+        elapsed = self.elapsed_seconds
+        return self.pages / elapsed if elapsed > 0 else 0.0
+
+    @property
+    def chunks_per_second(self) -> float:
+        elapsed = self.elapsed_seconds
+        return self.chunks_added / elapsed if elapsed > 0 else 0.0
+
+
+@dataclass
+class IngestResult:
+    vectorstore: AnyVectorStore
+    stats: IngestStats
+
+
+@dataclass
+class _FileChunks:
+    record: FileRecord
+    chunks: List[Document]
+    stored: List[Document]  # chunks that get a vector of their own (all of them without dedup)
+
+
+@dataclass
+class _Batch:
+    chunks: List[Document] = field(default_factory=list)
+    vectors: List[List[float]] = field(default_factory=list)
+    # Files whose last chunk is in this batch (None for files that produced no chunks)
+    completed: List[Optional[FileRecord]] = field(default_factory=list)
+
+
+class _Pipeline:
+    """Runs producer stages on threads connected by bounded queues; any error stops all stages."""
+
+    def __init__(self, queue_size: int):
+        self.queue_size = queue_size
+        self.stop = threading.Event()
+        self.errors: List[BaseException] = []
+        self.threads: List[threading.Thread] = []
+        self.stage_names: List[str] = []
+
+    def put(self, q: queue.Queue, item: Any) -> None:
+        while not self.stop.is_set():
+            try:
+                q.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+        raise _Cancelled()
+
+    def consume(self, q: queue.Queue) -> Iterator[Any]:
+        while True:
+            try:
+                item = q.get(timeout=0.1)
+            except queue.Empty:
+                if self.stop.is_set():
+                    raise _Cancelled()
+                continue
+            if item is _DONE:
+                return
+            yield item
+
+    def stage(self, name: str, fn: Callable[[queue.Queue], None]) -> queue.Queue:
+        """Starts fn(out_queue) on a thread and returns its output queue."""
+        out: queue.Queue = queue.Queue(maxsize=self.queue_size)
+        INGEST_QUEUE_DEPTH.labels(stage=name).set_function(out.qsize)
+        self.stage_names.append(name)
+
+        def run() -> None:
+            try:
+                fn(out)
+            except _Cancelled:
+                pass
+            except BaseException as exc:
+                self.errors.append(exc)
+                self.stop.set()
+            finally:
+                try:
+                    out.put(_DONE, timeout=1)
+                except queue.Full:
+                    pass  # consumer is gone (pipeline stopped)
+
+        thread = threading.Thread(target=run, name=f"ingest-{name}", daemon=True)
+        thread.start()
+        self.threads.append(thread)
+        return out
+
+    def close(self) -> None:
+        self.stop.set()
+        for thread in self.threads:
+            thread.join()
+        for name in self.stage_names:
+            INGEST_QUEUE_DEPTH.labels(stage=name).set_function(lambda: 0)
+
+
+class _Cancelled(Exception):
+    pass
+
+
+def _stream_files(
+    pipeline: _Pipeline,
+    vectorstore: AnyVectorStore,
+    manifest: IngestManifest,
+    to_process: Dict[str, FileRecord],
+    pdf_files: List[str],
+    image_files: List[str],
+    ocr_language: str,
+    stats: IngestStats,
+    lexical: Optional[LexicalIndexBuilder] = None,
+    dedup: Optional[DedupIndex] = None,
+) -> None:
+    """extract -> chunk -> embed (fixed-size batches) -> upsert, each stage on its own thread."""
+    from src.services.parser_service import iter_documents
+
+    batch_size = max(1, SETTINGS.ingest_batch_size)
+    embeddings = get_embeddings()
+
+    def extract(out: queue.Queue) -> None:
+        for path, docs in iter_documents(
+            [p for p in pdf_files if p in to_process],
+            [p for p in image_files if p in to_process],
+            ocr_language=ocr_language,
+            file_hashes={path: rec.sha256 for path, rec in to_process.items()},
+            stats=stats.extraction,
+        ):
+            pipeline.put(out, (path, docs))
+
+    def chunk(out: queue.Queue) -> None:
+        for path, docs in pipeline.consume(extracted):
+            stats.pages += len(docs)
+            record = to_process[path]
+            chunks = chunk_file_documents(docs, path, record.sha256) if docs else []
+            stored = dedup.add(chunks, stats.dedup) if dedup is not None else chunks
+            pipeline.put(out, _FileChunks(record, chunks, stored))
+
+    def embed(out: queue.Queue) -> None:
+        batch = _Batch()
+
+        def flush() -> None:
+            nonlocal batch
+            if batch.chunks:
+                EMBEDDING_BATCH_SIZE.labels(model=SETTINGS.embedding_model).observe(len(batch.chunks))
+                with EMBEDDING_BATCH_SECONDS.labels(model=SETTINGS.embedding_model).time():
+                    batch.vectors = embeddings.embed_documents([c.page_content for c in batch.chunks])
+            pipeline.put(out, batch)
+            batch = _Batch()
+
+        for item in pipeline.consume(chunked):
+            if not item.chunks:
+                # Extraction failed or found no text: not recorded, so it is retried next run
+                batch.completed.append(None)
+                continue
+            item.record.chunk_ids = [c.metadata["chunk_id"] for c in item.chunks]
+            if not item.stored:
+                # Every chunk collapsed into an existing vector
+                batch.completed.append(item.record)
+                continue
+            pos = 0
+            while pos < len(item.stored):
+                part = item.stored[pos:pos + batch_size - len(batch.chunks)]
+                batch.chunks.extend(part)
+                pos += len(part)
+                if pos >= len(item.stored):
+                    batch.completed.append(item.record)
+                if len(batch.chunks) >= batch_size:
+                    flush()
+        if batch.chunks or batch.completed:
+            flush()
+
+    extracted = pipeline.stage("extract", extract)
+    chunked = pipeline.stage("chunk", chunk)
+    embedded = pipeline.stage("embed", embed)
+
+    for batch in pipeline.consume(embedded):
+        upsert_embeddings(vectorstore, batch.chunks, batch.vectors)
+        if lexical is not None:
+            lexical.add(batch.chunks)
+        stats.chunks_added += len(batch.chunks)
+        for record in batch.completed:
+            if record is not None:
+                manifest.files[record.path] = record
+            stats.files_done += 1
+
+    if pipeline.errors:
+        raise pipeline.errors[0]
+
+
+def _lexical_builder(vectorstore: AnyVectorStore, rebuild: bool) -> LexicalIndexBuilder:
+    """Starts from the current BM25 index; without one, indexes what the collection already holds."""
+    if rebuild:
+        return LexicalIndexBuilder()
+    base = LexicalIndex.load(lexical_index_path())
+    if base is not None and base.collection_name == SETTINGS.collection_name:
+        return LexicalIndexBuilder(base)
+    logger.info("No lexical index for '%s'; indexing existing chunks", SETTINGS.collection_name)
+    builder = LexicalIndexBuilder()
+    for chunks in iter_collection_chunks(vectorstore):
+        builder.add(chunks)
+    return builder
+
+
+def _dedup_index(vectorstore: AnyVectorStore, rebuild: bool) -> DedupIndex:
+    """Opens the dedup index in a write transaction; without one for this collection, registers what the collection holds."""
+    index = DedupIndex(dedup_index_path(), SETTINGS.dedup_threshold)
+    backfill = not rebuild and index.collection_name != SETTINGS.collection_name
+    index.begin(SETTINGS.collection_name, reset=rebuild)
+    if backfill:
+        logger.info("No dedup index for '%s'; registering existing chunks", SETTINGS.collection_name)
+        for chunks in iter_collection_chunks(vectorstore):
+            index.add_stored(chunks)
+    return index
+
+
+def run_ingest(
+    docs_dir: str,
+    ocr_language: str,
+    stats: Optional[IngestStats] = None,
+    paths: Optional[Collection[str]] = None,
+) -> IngestResult:
+    """
+    Syncs the collection with docs_dir using the ingest manifest.
+    Without a usable manifest (first run, or collection/embedding model changed)
+    every file is ingested into a staging collection that replaces the live one
+    only once it is complete, so readers never see a partial collection.
+    With paths (files of docs_dir, e.g. from the DOCS_DIR watcher), only those are
+    synced: ingested if new or changed, removed if gone. The folder is not listed,
+    except for a rebuild, which always syncs all of it.
+    The BM25 index (LEXICAL_INDEX) is updated with the same chunk additions and deletions.
+    With DEDUP_CHUNKS, near-duplicate chunks are collapsed before embedding (see dedup_service).
+    Pass stats to observe progress from another thread.
+    """
+    from src.services.parser_service import list_supported_files, split_supported_files
+
+    stats = stats or IngestStats()
+    if not os.path.isdir(docs_dir):
+        raise FileNotFoundError(f"Docs folder not found: {docs_dir}")
+
+    vectorstore = open_vectorstore()
+    use_postgres = vectorstore_backend(vectorstore) == "pgvector"
+
+    manifest = load_manifest(use_postgres)
+    rebuild = manifest is None or not manifest.matches_settings()
+    if rebuild:
+        logger.info("No usable ingest manifest; rebuilding collection '%s'", SETTINGS.collection_name)
+        vectorstore = reset_vectorstore(open_vectorstore(staging_collection_name()))
+        manifest = IngestManifest.empty()
+
+    if paths is None or rebuild:
+        pdf_files, image_files = list_supported_files(docs_dir)
+        diff = manifest.diff(pdf_files + image_files)
+    else:
+        pdf_files, image_files = split_supported_files(p for p in paths if os.path.isfile(p))
+        diff = manifest.diff(pdf_files + image_files, scope=set(paths))
+    stats.files_total = len(pdf_files) + len(image_files)
+    stats.files_to_process = len(diff.to_process)
+    stats.files_unchanged = diff.unchanged
+    stats.files_deleted = len(diff.deleted)
+    logger.info(
+        "Ingest plan: %s new/changed, %s unchanged, %s deleted",
+        stats.files_to_process,
+        stats.files_unchanged,
+        stats.files_deleted,
+    )
+
+    for path in diff.to_process:
+        manifest.files.pop(path, None)
+
+    lexical = _lexical_builder(vectorstore, rebuild) if SETTINGS.lexical_index else None
+    dedup = _dedup_index(vectorstore, rebuild) if SETTINGS.dedup_chunks else None
+    try:
+        # New chunks go in before stale ones are removed, so a changed file is never missing
+        pipeline = _Pipeline(queue_size=max(1, SETTINGS.ingest_queue_size))
+        try:
+            _stream_files(
+                pipeline,
+                vectorstore,
+                manifest,
+                diff.to_process,
+                pdf_files,
+                image_files,
+                ocr_language,
+                stats,
+                lexical,
+                dedup,
+            )
+        finally:
+            pipeline.close()
+
+        # Collapsed chunks have no vector; a stored one goes only with the last chunk it stands for
+        stale_ids = dedup.release(diff.stale_chunk_ids) if dedup is not None else diff.stale_chunk_ids
+        delete_chunks(vectorstore, stale_ids)
+        if lexical is not None:
+            lexical.remove(stale_ids)
+        stats.chunks_deleted = len(stale_ids)
+        for record in diff.deleted:
+            manifest.files.pop(record.path, None)
+
+        if rebuild:
+            vectorstore = promote_collection(vectorstore)
+        else:
+            optimize_vectorstore(vectorstore)
+        manifest.deduplicated = dedup is not None
+        save_manifest(manifest, use_postgres)
+        if lexical is not None:
+            set_lexical_index(lexical.write(lexical_index_path(), SETTINGS.collection_name))
+        if dedup is not None:
+            dedup.commit()
+    finally:
+        if dedup is not None:
+            dedup.close()
+    if stats.dedup.duplicates:
+        logger.info(
+            "Dedup: %s of %s chunks collapsed into existing vectors (%.1f%%, %s characters not embedded)",
+            stats.dedup.duplicates,
+            stats.dedup.chunks_seen,
+            100 * stats.dedup.saved_ratio,
+            stats.dedup.chars_saved,
+        )
+    stats.finished_at = time.time()
+
+    embeddings = get_embeddings()
+    if isinstance(embeddings, CachedEmbeddings):
+        logger.info("Embedding cache: %s", embeddings.stats())
+    return IngestResult(vectorstore=vectorstore, stats=stats)
@@ -0,0 +1,299 @@
+"""
+Local BM25 inverted index over the ingested chunks, kept in sync by ingestion.
+
+The index is a single file, replaced atomically when ingestion finishes: a magic,
+a JSON header, then 8-byte aligned arrays that are memory-mapped on load, so opening
+the index is instant and only the postings of the query terms are paged in.
+Terms are stored as 64-bit hashes:
+  term_hashes (uint64, sorted) / term_offsets (int64): postings range per term
+  postings_doc (int32) / postings_tf (uint16): document index and term frequency
+  doc_len (int32) / chunk_ids (bytes): per-document token count and chunk ID
+"""
+import hashlib
+import json
+import os
+import re
+import tempfile
+import threading
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+from langchain_core.documents import Document
+
+from src.core.constants import APP_NAME, BM25_B, BM25_K1
+from src.core.logging import get_logger
+from src.models import SETTINGS
+
+logger = get_logger(APP_NAME)
+
+_MAGIC = b"BM25IDX1"
+_ALIGN = 8
+# Words, keeping identifiers such as "12.345.678/0001-90", "5.2" or "rc-1234" whole
+_TOKEN_RE = re.compile(r"\w+(?:[./\-]\w+)*")
+_SEPARATORS_RE = re.compile(r"[./\-]")
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Case-folded word tokens. Numeric identifiers written with separators also yield
+    their digits-only form, so "12.345.678/0001-90" matches "12345678000190".
+    """
+    tokens: List[str] = []
+    for match in _TOKEN_RE.finditer(text.casefold()):
+        token = match.group()
+        tokens.append(token)
+        if _SEPARATORS_RE.search(token):
+            digits = _SEPARATORS_RE.sub("", token)
+            if digits.isdigit() and len(digits) >= 4:
+                tokens.append(digits)
+    return tokens
+
+
+def _term_hash(term: str) -> int:
+    return int.from_bytes(hashlib.blake2b(term.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+def _term_counts(text: str) -> Tuple[np.ndarray, np.ndarray, int]:
+    """(unique term hashes, their frequencies, token count) of a text."""
+    tokens = tokenize(text)
+    counts = Counter(_term_hash(t) for t in tokens)
+    hashes = np.fromiter(counts.keys(), dtype=np.uint64, count=len(counts))
+    tfs = np.fromiter(counts.values(), dtype=np.int64, count=len(counts))
+    return hashes, np.minimum(tfs, np.iinfo(np.uint16).max).astype(np.uint16), len(tokens)
+
+
+class LexicalIndex:
+    """Read-only BM25 index over memory-mapped arrays (see module docstring)."""
+
+    def __init__(self, collection_name: str, avgdl: float, arrays: Dict[str, np.ndarray]):
+        self.collection_name = collection_name
+        self.avgdl = avgdl
+        self.term_hashes = arrays["term_hashes"]
+        self.term_offsets = arrays["term_offsets"]
+        self.postings_doc = arrays["postings_doc"]
+        self.postings_tf = arrays["postings_tf"]
+        self.doc_len = arrays["doc_len"]
+        self.chunk_ids = arrays["chunk_ids"]
+
+    @property
+    def n_docs(self) -> int:
+        return len(self.doc_len)
+
+    @classmethod
+    def load(cls, path: str) -> Optional["LexicalIndex"]:
+        """Memory-maps the index at path; None if it does not exist or is unreadable."""
+        if not os.path.isfile(path):
+            return None
+        try:
+            with open(path, "rb") as f:
+                if f.read(len(_MAGIC)) != _MAGIC:
+                    raise ValueError("not a lexical index file")
+                header_len = int.from_bytes(f.read(8), "little")
+                header = json.loads(f.read(header_len))
+            arrays = {
+                name: np.memmap(path, dtype=np.dtype(dtype), mode="r", offset=offset, shape=tuple(shape))
+                if shape[0] else np.empty(tuple(shape), dtype=np.dtype(dtype))
+                for name, (offset, dtype, shape) in header["arrays"].items()
+            }
+        except Exception as exc:
+            logger.warning("Could not load lexical index %s. Error=%s", path, exc)
+            return None
+        return cls(header["collection_name"], header["avgdl"], arrays)
+
+    def search(self, query: str, k: int) -> List[Tuple[str, float]]:
+        """Top-k (chunk_id, BM25 score) for the query, best first."""
+        if self.n_docs == 0:
+            return []
+        hashes = np.unique(np.fromiter((_term_hash(t) for t in tokenize(query)), dtype=np.uint64))
+        if hashes.size == 0:
+            return []
+        pos = np.searchsorted(self.term_hashes, hashes)
+        in_range = pos < len(self.term_hashes)
+        pos, hashes = pos[in_range], hashes[in_range]
+        pos = pos[self.term_hashes[pos] == hashes]
+
+        doc_parts: List[np.ndarray] = []
+        score_parts: List[np.ndarray] = []
+        n_docs = self.n_docs
+        avgdl = self.avgdl or 1.0
+        for p in pos:
+            start, end = int(self.term_offsets[p]), int(self.term_offsets[p + 1])
+            df = end - start
+            idf = np.log1p((n_docs - df + 0.5) / (df + 0.5))
+            docs = np.asarray(self.postings_doc[start:end])
+            tf = np.asarray(self.postings_tf[start:end], dtype=np.float32)
+            norm = BM25_K1 * (1 - BM25_B + BM25_B * self.doc_len[docs] / avgdl)
+            doc_parts.append(docs)
+            score_parts.append(idf * tf * (BM25_K1 + 1) / (tf + norm))
+        if not doc_parts:
+            return []
+
+        docs, inverse = np.unique(np.concatenate(doc_parts), return_inverse=True)
+        scores = np.bincount(inverse, weights=np.concatenate(score_parts))
+        top = np.argpartition(-scores, min(k, len(scores)) - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(self.chunk_ids[docs[i]].decode("ascii"), float(scores[i])) for i in top]
+
+
+class LexicalIndexBuilder:
+    """
+    Produces a new index from a base index (or nothing) by removing and adding chunks,
+    mirroring what ingestion does to the vector store. Base postings are merged as arrays,
+    so unchanged chunks are never re-tokenized.
+    """
+
+    def __init__(self, base: Optional[LexicalIndex] = None):
+        self.base = base
+        self._removed: set = set()
+        # chunk_id -> (term hashes, term frequencies, token count)
+        self._added: Dict[str, Tuple[np.ndarray, np.ndarray, int]] = {}
+
+    def add(self, chunks: Iterable[Document]) -> None:
+        for chunk in chunks:
+            self._added[chunk.metadata["chunk_id"]] = _term_counts(chunk.page_content)
+
+    def remove(self, chunk_ids: Iterable[str]) -> None:
+        for chunk_id in chunk_ids:
+            self._removed.add(chunk_id)
+            self._added.pop(chunk_id, None)
+
+    def _base_arrays(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """Postings (term hash, doc, tf), doc lengths and chunk IDs kept from the base index."""
+        base = self.base
+        if base is None or base.n_docs == 0:
+            return (
+                np.empty(0, np.uint64),
+                np.empty(0, np.int64),
+                np.empty(0, np.uint16),
+                np.empty(0, np.int32),
+                np.empty(0, "S1"),
+            )
+        chunk_ids = np.asarray(base.chunk_ids)
+        dropped = self._removed | set(self._added)
+        keep = ~np.isin(chunk_ids, np.array([c.encode("ascii") for c in dropped], dtype=chunk_ids.dtype)) \
+            if dropped else np.ones(len(chunk_ids), dtype=bool)
+        remap = np.cumsum(keep) - 1
+
+        hashes = np.repeat(np.asarray(base.term_hashes), np.diff(np.asarray(base.term_offsets)))
+        docs = np.asarray(base.postings_doc)
+        kept_postings = keep[docs]
+        return (
+            hashes[kept_postings],
+            remap[docs[kept_postings]],
+            np.asarray(base.postings_tf)[kept_postings],
+            np.asarray(base.doc_len)[keep],
+            chunk_ids[keep],
+        )
+
+    def write(self, path: str, collection_name: str) -> LexicalIndex:
+        """Writes the merged index to path (atomic replace) and returns it memory-mapped."""
+        hashes, docs, tfs, doc_len, chunk_ids = self._base_arrays()
+        n_base = len(doc_len)
+
+        added = list(self._added.items())
+        if added:
+            hashes = np.concatenate([hashes] + [h for _, (h, _, _) in added])
+            docs = np.concatenate(
+                [docs] + [np.full(len(h), n_base + i, dtype=np.int64) for i, (_, (h, _, _)) in enumerate(added)]
+            )
+            tfs = np.concatenate([tfs] + [tf for _, (_, tf, _) in added])
+            doc_len = np.concatenate([doc_len, np.array([n for _, (_, _, n) in added], dtype=np.int32)])
+            chunk_ids = np.concatenate(
+                [chunk_ids.astype(object), np.array([cid.encode("ascii") for cid, _ in added], dtype=object)]
+            ).astype(bytes)
+
+        order = np.lexsort((docs, hashes))
+        hashes, docs, tfs = hashes[order], docs[order], tfs[order]
+        term_hashes, starts = np.unique(hashes, return_index=True)
+        arrays = {
+            "term_hashes": term_hashes.astype(np.uint64),
+            "term_offsets": np.append(starts, len(hashes)).astype(np.int64),
+            "postings_doc": docs.astype(np.int32),
+            "postings_tf": tfs.astype(np.uint16),
+            "doc_len": doc_len.astype(np.int32),
+            "chunk_ids": chunk_ids if len(chunk_ids) else np.empty(0, "S1"),
+        }
+        avgdl = float(doc_len.mean()) if len(doc_len) else 0.0
+        _write_index_file(path, collection_name, avgdl, arrays)
+        logger.info("Lexical index written: %s chunks, %s terms", len(doc_len), len(term_hashes))
+        return LexicalIndex.load(path) or LexicalIndex(collection_name, avgdl, arrays)
+
+
+def _write_index_file(path: str, collection_name: str, avgdl: float, arrays: Dict[str, np.ndarray]) -> None:
+    layout: Dict[str, Tuple[int, str, List[int]]] = {}
+    offset = 0
+    for name, arr in arrays.items():
+        layout[name] = (offset, arr.dtype.str, list(arr.shape))
+        offset += -(-arr.nbytes // _ALIGN) * _ALIGN
+
+    def header_bytes(data_start: int) -> bytes:
+        shifted = {name: (data_start + off, dtype, shape) for name, (off, dtype, shape) in layout.items()}
+        return json.dumps({"collection_name": collection_name, "avgdl": avgdl, "arrays": shifted}).encode("utf-8")
+
+    # The header holds absolute offsets, so its length depends on where the data starts
+    data_start = 0
+    while True:
+        header = header_bytes(data_start)
+        start = -(-(len(_MAGIC) + 8 + len(header)) // _ALIGN) * _ALIGN
+        if start == data_start:
+            break
+        data_start = start
+
+    parent = os.path.dirname(path) or "."
+    os.makedirs(parent, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=parent, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(_MAGIC)
+            f.write(len(header).to_bytes(8, "little"))
+            f.write(header)
+            for name, arr in arrays.items():
+                f.seek(layout[name][0] + data_start)
+                f.write(np.ascontiguousarray(arr).tobytes())
+            f.truncate(data_start + offset)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+
+
+def lexical_index_path() -> str:
+    return os.path.join(SETTINGS.vector_persist_dir, f"{SETTINGS.collection_name}.bm25")
+
+
+_index: Optional[LexicalIndex] = None
+_index_loaded = False
+_index_lock = threading.Lock()
+
+
+def get_lexical_index() -> Optional[LexicalIndex]:
+    """Process-wide index (memory-mapped on first use); None when disabled or not built yet."""
+    global _index, _index_loaded
+    if not SETTINGS.lexical_index:
+        return None
+    with _index_lock:
+        if not _index_loaded:
+            _index = LexicalIndex.load(lexical_index_path())
+            _index_loaded = True
+        return _index
+
+
+def set_lexical_index(index: Optional[LexicalIndex]) -> None:
+    """Swaps in a freshly written index; queries in flight keep their mapping of the old file."""
+    global _index, _index_loaded
+    with _index_lock:
+        _index, _index_loaded = index, True
+
+
+def reload_lexical_index() -> None:
+    """Makes the next get_lexical_index() read the file again (another process rewrote it)."""
+    global _index, _index_loaded
+    with _index_lock:
+        _index, _index_loaded = None, False
+
+
+def lexical_rank(index: LexicalIndex, questions: Sequence[str], k: int) -> List[List[str]]:
+    """Chunk IDs of the top-k lexical hits per question."""
+    return [[chunk_id for chunk_id, _ in index.search(q, k)] for q in questions]
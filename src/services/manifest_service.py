@@ -0,0 +1,158 @@
+"""
+Manifest of ingested files (path, size, mtime, content hash, chunk IDs).
+Lets ingestion extract and embed only new or changed files and delete the chunks
+of modified or removed ones. The manifest is stored next to the vector store:
+a JSON file in VECTOR_PERSIST_DIR for Chroma, a table row for PGVector.
+"""
+import json
+import os
+import tempfile
+from dataclasses import asdict, dataclass, field
+from typing import Collection, Dict, Iterable, List, Optional
+
+from src.core.constants import APP_NAME
+from src.core.logging import get_logger
+from src.models import SETTINGS
+from src.services.database_service import load_manifest_data, save_manifest_data
+from src.services.ocr_cache_service import file_sha256
+
+logger = get_logger(APP_NAME)
+
+MANIFEST_VERSION = 1
+
+
+@dataclass
+class FileRecord:
+    """One ingested file and the IDs of the chunks it produced."""
+    path: str
+    size: int
+    mtime: float
+    sha256: str
+    chunk_ids: List[str] = field(default_factory=list)
+
+
+@dataclass
+class ManifestDiff:
+    """Files to (re)ingest and records whose chunks must be removed."""
+    # New records (size/mtime/hash as seen when diffing) for files to (re)ingest, in input order
+    to_process: Dict[str, FileRecord] = field(default_factory=dict)
+    stale: List[FileRecord] = field(default_factory=list)  # previous records of changed files
+    deleted: List[FileRecord] = field(default_factory=list)
+    unchanged: int = 0
+
+    @property
+    def file_hashes(self) -> Dict[str, str]:
+        return {path: rec.sha256 for path, rec in self.to_process.items()}
+
+    @property
+    def stale_chunk_ids(self) -> List[str]:
+        return [cid for rec in self.stale + self.deleted for cid in rec.chunk_ids]
+
+
+@dataclass
+class IngestManifest:
+    collection_name: str
+    embedding_model: str
+    files: Dict[str, FileRecord] = field(default_factory=dict)
+    deduplicated: bool = False  # chunk_ids include chunks collapsed by DEDUP_CHUNKS (no vector of their own)
+
+    def matches_settings(self) -> bool:
+        """
+        False when the collection or embedding model changed, or DEDUP_CHUNKS was turned off
+        after collapsing chunks, which requires a full rebuild.
+        """
+        return (
+            self.collection_name == SETTINGS.collection_name
+            and self.embedding_model == SETTINGS.embedding_model
+            and (SETTINGS.dedup_chunks or not self.deduplicated)
+        )
+
+    def diff(self, paths: Iterable[str], scope: Optional[Collection[str]] = None) -> ManifestDiff:
+        """
+        Compares files on disk with the manifest. Size and mtime are checked first;
+        the content hash is only computed when they differ. With scope, only the
+        records of those paths can be reported deleted (a sync of some files only).
+        """
+        result = ManifestDiff()
+        seen = set()
+        for path in paths:
+            seen.add(path)
+            record = self.files.get(path)
+            st = os.stat(path)
+            if record and record.size == st.st_size and record.mtime == st.st_mtime:
+                result.unchanged += 1
+                continue
+            sha = file_sha256(path)
+            if record and record.sha256 == sha:
+                # Touched but not modified: refresh mtime so the hash is skipped next time
+                record.mtime = st.st_mtime
+                result.unchanged += 1
+                continue
+            result.to_process[path] = FileRecord(path=path, size=st.st_size, mtime=st.st_mtime, sha256=sha)
+            if record:
+                result.stale.append(record)
+
+        result.deleted = [
+            rec for path, rec in self.files.items() if path not in seen and (scope is None or path in scope)
+        ]
+        return result
+
+    def to_dict(self) -> dict:
+        return {
+            "version": MANIFEST_VERSION,
+            "collection_name": self.collection_name,
+            "embedding_model": self.embedding_model,
+            "deduplicated": self.deduplicated,
+            "files": {path: asdict(rec) for path, rec in self.files.items()},
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "IngestManifest":
+        return cls(
+            collection_name=data.get("collection_name", ""),
+            embedding_model=data.get("embedding_model", ""),
+            deduplicated=data.get("deduplicated", False),
+            files={path: FileRecord(**rec) for path, rec in data.get("files", {}).items()},
+        )
+
+    @classmethod
+    def empty(cls) -> "IngestManifest":
+        return cls(collection_name=SETTINGS.collection_name, embedding_model=SETTINGS.embedding_model)
+
+
+def manifest_path() -> str:
+    return os.path.join(SETTINGS.vector_persist_dir, f"{SETTINGS.collection_name}.manifest.json")
+
+
+def load_manifest(use_postgres: bool) -> Optional[IngestManifest]:
+    """Returns the stored manifest, or None if there is none (or it is unreadable)."""
+    try:
+        if use_postgres:
+            data = load_manifest_data(SETTINGS.database_url, SETTINGS.collection_name)
+        else:
+            path = manifest_path()
+            if not os.path.isfile(path):
+                return None
+            with open(path, encoding="utf-8") as f:
+                data = json.load(f)
+    except Exception as exc:
+        logger.warning("Could not read ingest manifest. Error=%s", exc)
+        return None
+
+    if not data or data.get("version") != MANIFEST_VERSION:
+        return None
+    return IngestManifest.from_dict(data)
+
+
+def save_manifest(manifest: IngestManifest, use_postgres: bool) -> None:
+    data = manifest.to_dict()
+    if use_postgres:
+        save_manifest_data(SETTINGS.database_url, SETTINGS.collection_name, data)
+        return
+
+    path = manifest_path()
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path) or ".", suffix=".tmp")
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        json.dump(data, f)
+    os.replace(tmp_path, path)
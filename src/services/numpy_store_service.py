@@ -0,0 +1,548 @@
+"""
+Built-in vector store for single-node deployments: a contiguous matrix of unit-length
+embeddings in a memory-mapped file (float32, float16 or int8 with a per-row scale)
+plus a SQLite sidecar holding chunk IDs, texts and metadata. Opening only maps the
+files, so it takes milliseconds; search is a blocked matrix product with a top-k
+selection, optionally narrowed by an IVF (inverted file) index on large collections.
+
+Layout of a collection directory:
+  store.json        dim, dtype, IVF state
+  vectors.bin       rows x dim matrix (grows in steps; rows of deleted chunks are reused)
+  scales.bin        float32 per-row scale (int8 only)
+  state.bin         uint8 per row: 0 free, 1 live and in the IVF lists, 2 live, not in the IVF lists
+  chunks.sqlite     row -> chunk_id, document, metadata
+  ivf_*.npy         IVF centroids, rows grouped by list, list offsets
+
+A store opened with read_only=True (processes serving a collection another process
+writes) maps the files read-only and opens the SQLite file with mode=ro; writes raise
+PermissionError.
+"""
+import json
+import os
+import shutil
+import sqlite3
+import tempfile
+import threading
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.vectorstores import VectorStore
+
+from src.core.constants import APP_NAME
+from src.core.logging import get_logger
+
+logger = get_logger(APP_NAME)
+
+DTYPES = ("float32", "float16", "int8")
+DIR_SUFFIX = ".vecs"  # collection directories are <collection name>.vecs
+_FREE, _INDEXED, _FRESH = 0, 1, 2
+_GROW_ROWS = 4096  # minimum number of rows added when the matrix file grows
+_SEARCH_BLOCK_ROWS = 16384  # rows scored per block, bounds the dequantized copy (and keeps it in cache)
+_KMEANS_SAMPLE = 50_000
+_KMEANS_ITERATIONS = 10
+_SQLITE_MAX_VARS = 900
+
+
+def _unit_rows(vectors: Sequence[Sequence[float]]) -> np.ndarray:
+    arr = np.asarray(vectors, dtype=np.float32)
+    if arr.ndim == 1:
+        arr = arr[None, :]
+    norms = np.linalg.norm(arr, axis=1, keepdims=True)
+    return arr / np.where(norms > 0, norms, 1.0)
+
+
+def _top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    """Indices of the k largest scores, best first."""
+    if len(scores) <= k:
+        return np.argsort(-scores)
+    top = np.argpartition(-scores, k - 1)[:k]
+    return top[np.argsort(-scores[top])]
+
+
+class NumpyVectorStore(VectorStore):
+    """Memory-mapped exact (or IVF) cosine-similarity vector store; see module docstring."""
+
+    def __init__(
+        self,
+        directory: str,
+        embedding_function: Embeddings,
+        dtype: str = "float32",
+        ivf_min_rows: int = 50_000,
+        ivf_nprobe: int = 16,
+        read_only: bool = False,
+        collection_name: Optional[str] = None,
+    ):
+        if dtype not in DTYPES:
+            raise ValueError(f"Unsupported vector dtype: {dtype} (expected one of {DTYPES})")
+        self.directory = directory
+        if collection_name is None:
+            collection_name = os.path.basename(directory.rstrip(os.sep))
+            if collection_name.endswith(DIR_SUFFIX):
+                collection_name = collection_name[:-len(DIR_SUFFIX)]
+        self.collection_name = collection_name
+        self.embedding_function = embedding_function
+        self.ivf_min_rows = ivf_min_rows
+        self.ivf_nprobe = ivf_nprobe
+        self.read_only = read_only
+        self._lock = threading.RLock()
+        if not read_only:
+            os.makedirs(directory, exist_ok=True)
+
+        config = self._read_config()
+        self.dtype = config.get("dtype", dtype)
+        if self.dtype != dtype:
+            logger.warning(
+                "Vector store %s was created with dtype %s; ignoring requested %s",
+                directory,
+                self.dtype,
+                dtype,
+            )
+        self.dim: Optional[int] = config.get("dim")
+        self._has_ivf = bool(config.get("ivf"))
+
+        db_path = os.path.join(directory, "chunks.sqlite")
+        if read_only:
+            uri = f"{Path(db_path).absolute().as_uri()}?mode=ro"
+            self._conn = sqlite3.connect(uri, uri=True, check_same_thread=False)
+        else:
+            self._conn = sqlite3.connect(db_path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS chunks ("
+                "row INTEGER PRIMARY KEY, chunk_id TEXT UNIQUE NOT NULL, document TEXT NOT NULL, metadata TEXT NOT NULL)"
+            )
+            self._conn.commit()
+
+        self._vectors: Optional[np.memmap] = None
+        self._scales: Optional[np.memmap] = None
+        self._state: Optional[np.memmap] = None
+        self._ivf: Optional[Tuple[np.ndarray, np.ndarray, np.ndarray]] = None
+        self._map_files()
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.directory, name)
+
+    def _read_config(self) -> Dict[str, Any]:
+        try:
+            with open(self._path("store.json"), encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+
+    def _write_config(self) -> None:
+        data = {"dim": self.dim, "dtype": self.dtype, "ivf": self._has_ivf}
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+        os.replace(tmp_path, self._path("store.json"))
+
+    @property
+    def _row_bytes(self) -> int:
+        return (self.dim or 0) * np.dtype(self.dtype).itemsize
+
+    def _capacity(self) -> int:
+        path = self._path("vectors.bin")
+        if not self.dim or not os.path.isfile(path):
+            return 0
+        return os.path.getsize(path) // self._row_bytes
+
+    def _map_files(self) -> None:
+        capacity = self._capacity()
+        if capacity == 0:
+            self._vectors = self._scales = self._state = None
+            self._ivf = None
+            return
+        mode = "r" if self.read_only else "r+"
+        self._vectors = np.memmap(self._path("vectors.bin"), dtype=self.dtype, mode=mode, shape=(capacity, self.dim))
+        self._state = np.memmap(self._path("state.bin"), dtype=np.uint8, mode=mode, shape=(capacity,))
+        if self.dtype == "int8":
+            self._scales = np.memmap(self._path("scales.bin"), dtype=np.float32, mode=mode, shape=(capacity,))
+        self._ivf = None
+        if self._has_ivf:
+            self._ivf = (
+                np.load(self._path("ivf_centroids.npy"), mmap_mode="r"),
+                np.load(self._path("ivf_order.npy"), mmap_mode="r"),
+                np.load(self._path("ivf_offsets.npy"), mmap_mode="r"),
+            )
+
+    def _grow(self, rows_needed: int) -> None:
+        capacity = self._capacity()
+        if rows_needed <= capacity:
+            return
+        new_capacity = max(rows_needed, capacity * 2, _GROW_ROWS)
+        self._flush()
+        for name, itemsize in (
+            ("vectors.bin", self._row_bytes),
+            ("state.bin", 1),
+            ("scales.bin", 4 if self.dtype == "int8" else 0),
+        ):
+            if itemsize:
+                with open(self._path(name), "ab") as f:
+                    f.truncate(new_capacity * itemsize)
+        self._map_files()
+
+    def _check_writable(self) -> None:
+        if self.read_only:
+            raise PermissionError(f"Vector store {self.directory} is open read-only")
+
+    def _flush(self) -> None:
+        if self.read_only:
+            return
+        for arr in (self._vectors, self._scales, self._state):
+            if arr is not None:
+                arr.flush()
+
+    def _encode(self, unit: np.ndarray) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+        if self.dtype == "int8":
+            scales = np.abs(unit).max(axis=1) / 127.0
+            scales[scales == 0] = 1.0
+            return np.round(unit / scales[:, None]).astype(np.int8), scales.astype(np.float32)
+        return unit.astype(self.dtype), None
+
+    def add_embeddings(
+        self,
+        texts: Sequence[str],
+        embeddings: Sequence[Sequence[float]],
+        metadatas: Optional[Sequence[dict]] = None,
+        ids: Optional[Sequence[str]] = None,
+    ) -> List[str]:
+        """Stores pre-computed embeddings; existing IDs are overwritten in place (upsert)."""
+        self._check_writable()
+        if not texts:
+            return []
+        metadatas = list(metadatas) if metadatas is not None else [{} for _ in texts]
+        ids = list(ids) if ids is not None else [m.get("chunk_id") or os.urandom(16).hex() for m in metadatas]
+        unit = _unit_rows(embeddings)
+
+        with self._lock:
+            if self.dim is None:
+                self.dim = unit.shape[1]
+                self._write_config()
+            elif unit.shape[1] != self.dim:
+                raise ValueError(f"Embedding dimension {unit.shape[1]} does not match store dimension {self.dim}")
+
+            existing = self._rows_for_ids(ids)
+            n_new = sum(1 for cid in dict.fromkeys(ids) if cid not in existing)
+            free = self._free_rows(n_new)
+            self._grow((max(free) + 1) if free else 0)
+
+            rows: List[int] = []
+            assigned: Dict[str, int] = dict(existing)
+            for cid in ids:
+                if cid not in assigned:
+                    assigned[cid] = free.pop(0)
+                rows.append(assigned[cid])
+
+            row_index = np.asarray(rows)
+            encoded, scales = self._encode(unit)
+            self._vectors[row_index] = encoded
+            if scales is not None:
+                self._scales[row_index] = scales
+            self._state[row_index] = _FRESH
+            self._flush()
+
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO chunks (row, chunk_id, document, metadata) VALUES (?, ?, ?, ?)",
+                [(row, cid, text, json.dumps(meta)) for row, cid, text, meta in zip(rows, ids, texts, metadatas)],
+            )
+            self._conn.commit()
+        return ids
+
+    def _select_in(self, sql: str, values: Sequence[Any]) -> List[tuple]:
+        """Runs sql (with one "IN ({})" placeholder list) over values in SQLite-sized batches."""
+        rows: List[tuple] = []
+        with self._lock:
+            for start in range(0, len(values), _SQLITE_MAX_VARS):
+                batch = list(values[start:start + _SQLITE_MAX_VARS])
+                rows.extend(self._conn.execute(sql.format(",".join("?" * len(batch))), batch).fetchall())
+        return rows
+
+    def _rows_for_ids(self, ids: Sequence[str]) -> Dict[str, int]:
+        return dict(self._select_in("SELECT chunk_id, row FROM chunks WHERE chunk_id IN ({})", ids))
+
+    def _free_rows(self, n: int) -> List[int]:
+        """n row numbers to write new chunks to: freed rows first, then rows past the end."""
+        if n == 0:
+            return []
+        capacity = self._capacity()
+        reusable: List[int] = []
+        if self._state is not None:
+            reusable = np.flatnonzero(self._state[:capacity] == _FREE)[:n].tolist()
+        end = capacity
+        while len(reusable) < n:
+            reusable.append(end)
+            end += 1
+        return reusable
+
+    def add_texts(
+        self,
+        texts: Iterable[str],
+        metadatas: Optional[List[dict]] = None,
+        ids: Optional[List[str]] = None,
+        **kwargs: Any,
+    ) -> List[str]:
+        texts = list(texts)
+        return self.add_embeddings(texts, self.embedding_function.embed_documents(texts), metadatas, ids)
+
+    def delete(self, ids: Optional[List[str]] = None, **kwargs: Any) -> Optional[bool]:
+        self._check_writable()
+        if not ids:
+            return True
+        with self._lock:
+            rows = list(self._rows_for_ids(ids).values())
+            if rows and self._state is not None:
+                self._state[np.asarray(rows)] = _FREE
+                self._flush()
+            self._conn.executemany("DELETE FROM chunks WHERE row = ?", [(r,) for r in rows])
+            self._conn.commit()
+        return True
+
+    @classmethod
+    def from_texts(
+        cls,
+        texts: List[str],
+        embedding: Embeddings,
+        metadatas: Optional[List[dict]] = None,
+        directory: str = "",
+        **kwargs: Any,
+    ) -> "NumpyVectorStore":
+        ids = kwargs.pop("ids", None)
+        store = cls(directory, embedding, **kwargs)
+        store.add_texts(texts, metadatas, ids=ids)
+        return store
+
+    @property
+    def embeddings(self) -> Embeddings:
+        return self.embedding_function
+
+    def count(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM chunks").fetchone()[0]
+
+    def _snapshot(self) -> Tuple[Optional[np.ndarray], Optional[np.ndarray], Optional[np.ndarray], Any]:
+        with self._lock:
+            return self._vectors, self._scales, self._state, self._ivf
+
+    @staticmethod
+    def _score_rows(
+        vectors: np.ndarray,
+        scales: Optional[np.ndarray],
+        rows: Optional[np.ndarray],
+        queries: np.ndarray,
+    ) -> np.ndarray:
+        """Cosine scores (len(rows) x n_queries); rows=None scores the whole matrix in blocks."""
+        def block_scores(block: np.ndarray, block_scales: Optional[np.ndarray]) -> np.ndarray:
+            scores = block.astype(np.float32, copy=False) @ queries.T
+            if block_scales is not None:
+                scores *= block_scales[:, None]
+            return scores
+
+        if rows is not None:
+            return block_scores(vectors[rows], scales[rows] if scales is not None else None)
+        parts = []
+        for start in range(0, len(vectors), _SEARCH_BLOCK_ROWS):
+            end = start + _SEARCH_BLOCK_ROWS
+            parts.append(block_scores(vectors[start:end], scales[start:end] if scales is not None else None))
+        return np.concatenate(parts) if parts else np.empty((0, len(queries)), np.float32)
+
+    def _candidate_rows(self, state: np.ndarray, ivf: Any, query: np.ndarray) -> np.ndarray:
+        centroids, order, offsets = ivf
+        lists = _top_k(np.asarray(centroids) @ query, self.ivf_nprobe)
+        in_lists = np.concatenate([order[offsets[i]:offsets[i + 1]] for i in lists])
+        in_lists = in_lists[state[in_lists] == _INDEXED]
+        return np.concatenate([in_lists, np.flatnonzero(state == _FRESH)])
+
+    def search_rows(self, query_vectors: Sequence[Sequence[float]], k: int) -> List[List[Tuple[int, float]]]:
+        """Top-k (row, cosine score) per query: one matrix product for all queries (or IVF probing)."""
+        vectors, scales, state, ivf = self._snapshot()
+        if vectors is None or not len(query_vectors):
+            return [[] for _ in query_vectors]
+        queries = _unit_rows(query_vectors)
+
+        results: List[List[Tuple[int, float]]] = []
+        if ivf is not None:
+            for query in queries:
+                rows = self._candidate_rows(state, ivf, query)
+                if len(rows) < k:  # probed lists too small: scan every live row
+                    rows = np.flatnonzero(state)
+                scores = self._score_rows(vectors, scales, rows, query[None, :])[:, 0]
+                top = _top_k(scores, k)
+                results.append([(int(rows[i]), float(scores[i])) for i in top])
+            return results
+
+        used = np.flatnonzero(state)
+        if used.size == 0:
+            return [[] for _ in query_vectors]
+        used_rows = int(used[-1]) + 1  # the matrix file has spare capacity past the last used row
+        scores = self._score_rows(vectors[:used_rows], scales[:used_rows] if scales is not None else None, None, queries)
+        scores[state[:used_rows] == _FREE] = -np.inf
+        for j in range(len(queries)):
+            column = scores[:, j]
+            top = [i for i in _top_k(column, k) if np.isfinite(column[i])]
+            results.append([(int(i), float(column[i])) for i in top])
+        return results
+
+    def _documents(self, rows: Sequence[int]) -> Dict[int, Document]:
+        found = self._select_in(
+            "SELECT row, chunk_id, document, metadata FROM chunks WHERE row IN ({})",
+            [int(r) for r in rows],
+        )
+        return {
+            row: Document(page_content=doc, metadata={**json.loads(meta), "chunk_id": cid})
+            for row, cid, doc, meta in found
+        }
+
+    def batch_similarity_search_with_score(
+        self,
+        query_vectors: Sequence[Sequence[float]],
+        k: int = 4,
+    ) -> List[List[Tuple[Document, float]]]:
+        hits = self.search_rows(query_vectors, k)
+        docs = self._documents(sorted({row for per_query in hits for row, _ in per_query}))
+        return [[(docs[row], score) for row, score in per_query if row in docs] for per_query in hits]
+
+    def row_vectors(self, rows: Sequence[int]) -> Dict[int, np.ndarray]:
+        """Stored unit-length embeddings (float32) of the given rows."""
+        vectors, scales, _, _ = self._snapshot()
+        rows = sorted({int(r) for r in rows})
+        if vectors is None or not rows:
+            return {}
+        decoded = self._decode(vectors, scales, np.asarray(rows))
+        return dict(zip(rows, decoded))
+
+    def batch_similarity_search_with_vectors(
+        self,
+        query_vectors: Sequence[Sequence[float]],
+        k: int = 4,
+    ) -> List[List[Tuple[Document, np.ndarray]]]:
+        """Like batch_similarity_search_with_score, with each hit's stored embedding instead of its score."""
+        hits = self.search_rows(query_vectors, k)
+        rows = sorted({row for per_query in hits for row, _ in per_query})
+        docs, vectors = self._documents(rows), self.row_vectors(rows)
+        return [[(docs[row], vectors[row]) for row, _ in per_query if row in docs] for per_query in hits]
+
+    def similarity_search_with_score_by_vector(
+        self, embedding: List[float], k: int = 4, **kwargs: Any
+    ) -> List[Tuple[Document, float]]:
+        return self.batch_similarity_search_with_score([embedding], k)[0]
+
+    def similarity_search_by_vector(self, embedding: List[float], k: int = 4, **kwargs: Any) -> List[Document]:
+        return [doc for doc, _ in self.similarity_search_with_score_by_vector(embedding, k)]
+
+    def similarity_search_with_score(self, query: str, k: int = 4, **kwargs: Any) -> List[Tuple[Document, float]]:
+        return self.similarity_search_with_score_by_vector(self.embedding_function.embed_query(query), k)
+
+    def similarity_search(self, query: str, k: int = 4, **kwargs: Any) -> List[Document]:
+        return [doc for doc, _ in self.similarity_search_with_score(query, k)]
+
+    def _select_relevance_score_fn(self):
+        return lambda score: (score + 1.0) / 2.0  # cosine [-1, 1] -> [0, 1]
+
+    def get_by_ids(self, ids: Sequence[str]) -> Dict[str, Document]:
+        rows = self._rows_for_ids(ids)
+        docs = self._documents(list(rows.values()))
+        return {cid: docs[row] for cid, row in rows.items() if row in docs}
+
+    def get_by_ids_with_vectors(self, ids: Sequence[str]) -> Dict[str, Tuple[Document, np.ndarray]]:
+        rows = self._rows_for_ids(ids)
+        docs, vectors = self._documents(list(rows.values())), self.row_vectors(list(rows.values()))
+        return {cid: (docs[row], vectors[row]) for cid, row in rows.items() if row in docs and row in vectors}
+
+    def iter_chunks(self, batch_size: int = 1000) -> Iterator[List[Document]]:
+        last_row = -1
+        while True:
+            with self._lock:
+                found = self._conn.execute(
+                    "SELECT row, chunk_id, document, metadata FROM chunks WHERE row > ? ORDER BY row LIMIT ?",
+                    (last_row, batch_size),
+                ).fetchall()
+            if not found:
+                return
+            last_row = found[-1][0]
+            yield [
+                Document(page_content=doc, metadata={**json.loads(meta), "chunk_id": cid})
+                for _, cid, doc, meta in found
+            ]
+
+    def optimize(self) -> None:
+        """
+        (Re)builds the IVF index once the store holds ivf_min_rows chunks and more than 10%
+        of them were written since the last build; drops it below ivf_min_rows.
+        """
+        self._check_writable()
+        with self._lock:
+            vectors, scales, state, _ = self._snapshot()
+            if vectors is None:
+                return
+            live_rows = np.flatnonzero(state != _FREE)
+            if len(live_rows) < self.ivf_min_rows:
+                if self._has_ivf:
+                    self._drop_ivf()
+                return
+            fresh = int(np.count_nonzero(state == _FRESH))
+            if self._has_ivf and fresh <= 0.1 * len(live_rows):
+                return
+            self._build_ivf(vectors, scales, state, live_rows)
+
+    def _drop_ivf(self) -> None:
+        self._has_ivf = False
+        self._write_config()
+        if self._state is not None:
+            self._state[self._state == _INDEXED] = _FRESH
+            self._flush()
+        self._map_files()
+
+    def _build_ivf(self, vectors: np.ndarray, scales: Optional[np.ndarray], state: np.ndarray, live_rows: np.ndarray) -> None:
+        rng = np.random.default_rng(0)
+        sample_rows = np.sort(rng.choice(live_rows, size=min(_KMEANS_SAMPLE, len(live_rows)), replace=False))
+        n_lists = int(min(4096, len(sample_rows), max(16, 4 * np.sqrt(len(live_rows)))))
+        sample = self._decode(vectors, scales, sample_rows)
+        centroids = sample[rng.choice(len(sample), size=n_lists, replace=False)]
+        for _ in range(_KMEANS_ITERATIONS):  # spherical k-means
+            assign = np.argmax(sample @ centroids.T, axis=1)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assign, sample)
+            empty = ~sums.any(axis=1)
+            sums[empty] = centroids[empty]
+            centroids = _unit_rows(sums)
+
+        assign = np.empty(len(live_rows), dtype=np.int32)
+        for start in range(0, len(live_rows), _SEARCH_BLOCK_ROWS):
+            block = live_rows[start:start + _SEARCH_BLOCK_ROWS]
+            assign[start:start + len(block)] = np.argmax(self._decode(vectors, scales, block) @ centroids.T, axis=1)
+        order = live_rows[np.argsort(assign, kind="stable")].astype(np.int64)
+        offsets = np.concatenate([[0], np.cumsum(np.bincount(assign, minlength=n_lists))]).astype(np.int64)
+
+        for name, arr in (("ivf_centroids.npy", centroids), ("ivf_order.npy", order), ("ivf_offsets.npy", offsets)):
+            fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".npy")
+            with os.fdopen(fd, "wb") as f:
+                np.save(f, arr)
+            os.replace(tmp_path, self._path(name))
+        state[live_rows] = _INDEXED
+        self._has_ivf = True
+        self._write_config()
+        self._map_files()
+        logger.info("Built IVF index for '%s': %s rows in %s lists", self.collection_name, len(live_rows), n_lists)
+
+    @staticmethod
+    def _decode(vectors: np.ndarray, scales: Optional[np.ndarray], rows: np.ndarray) -> np.ndarray:
+        block = vectors[rows].astype(np.float32)
+        if scales is not None:
+            block *= scales[rows][:, None]
+        return block
+
+    def close(self) -> None:
+        with self._lock:
+            self._flush()
+            self._vectors = self._scales = self._state = None
+            self._ivf = None
+            self._conn.close()
+
+    def drop(self) -> None:
+        """Deletes the collection directory."""
+        self._check_writable()
+        self.close()
+        shutil.rmtree(self.directory, ignore_errors=True)
@@ -0,0 +1,135 @@
+"""
+Persistent, content-addressed cache for OCR page text.
+Entries are keyed by file content hash + page index + DPI + OCR language + engine
+version, so unchanged files are never re-rendered or re-OCR'd across restarts.
+"""
+import hashlib
+import os
+import tempfile
+import threading
+from pathlib import Path
+from typing import Optional
+
+from src.core.constants import APP_NAME
+from src.core.logging import get_logger
+from src.models import SETTINGS
+
+logger = get_logger(APP_NAME)
+
+_HASH_CHUNK_SIZE = 1024 * 1024
+_EVICT_TARGET_RATIO = 0.9  # evict down to 90% of the size limit to avoid evicting on every write
+
+
+def file_sha256(path: str) -> str:
+    """Hex SHA-256 of a file's content, read in 1 MiB chunks."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(_HASH_CHUNK_SIZE), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class OcrCache:
+    """On-disk OCR text cache with size-based (least recently used) eviction."""
+
+    def __init__(self, cache_dir: str, max_bytes: int):
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._size: Optional[int] = None  # computed lazily on first write
+
+    @staticmethod
+    def key(
+        file_hash: str,
+        page_index: int,
+        dpi: int,
+        ocr_language: str,
+        engine_version: str,
+    ) -> str:
+        raw = f"{file_hash}:{page_index}:{dpi}:{ocr_language}:{engine_version}"
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def _entry_path(self, key: str) -> Path:
+        return self.cache_dir / key[:2] / f"{key}.txt"
+
+    def get(self, key: str) -> Optional[str]:
+        """Returns cached text (possibly empty) or None on a miss."""
+        path = self._entry_path(key)
+        try:
+            text = path.read_text(encoding="utf-8")
+        except OSError:
+            with self._lock:
+                self.misses += 1
+            return None
+        try:
+            os.utime(path)  # mtime doubles as last-access time for eviction
+        except OSError:
+            pass
+        with self._lock:
+            self.hits += 1
+        return text
+
+    def put(self, key: str, text: str) -> None:
+        path = self._entry_path(key)
+        data = text.encode("utf-8")
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except OSError as exc:
+            logger.warning("Failed to write OCR cache entry %s. Error=%s", key, exc)
+            return
+
+        with self._lock:
+            if self._size is None:
+                self._size = self._scan_size()
+            else:
+                self._size += len(data)
+            if self._size > self.max_bytes:
+                self._evict()
+
+    def _scan_size(self) -> int:
+        return sum(p.stat().st_size for p in self.cache_dir.glob("*/*.txt"))
+
+    def _evict(self) -> None:
+        """Deletes least recently used entries until the cache is under the target size."""
+        entries = []
+        for p in self.cache_dir.glob("*/*.txt"):
+            try:
+                st = p.stat()
+            except OSError:
+                continue
+            entries.append((st.st_mtime, st.st_size, p))
+        entries.sort()
+
+        size = sum(e[1] for e in entries)
+        target = int(self.max_bytes * _EVICT_TARGET_RATIO)
+        evicted = 0
+        for _, entry_size, p in entries:
+            if size <= target:
+                break
+            try:
+                p.unlink()
+            except OSError:
+                continue
+            size -= entry_size
+            evicted += 1
+        self._size = size
+        logger.debug("OCR cache evicted %s entries (%s bytes remain)", evicted, size)
+
+
+_ocr_cache: OcrCache | None = None
+
+
+def get_ocr_cache() -> Optional[OcrCache]:
+    """Returns the process-wide OCR cache, or None when OCR_CACHE_DIR is empty."""
+    global _ocr_cache
+    if not SETTINGS.ocr_cache_dir:
+        return None
+    if _ocr_cache is None:
+        _ocr_cache = OcrCache(SETTINGS.ocr_cache_dir, SETTINGS.ocr_cache_max_mb * 1024 * 1024)
+    return _ocr_cache
@@ -0,0 +1,42 @@
+"""
+Process-wide HTTP clients for OpenAI. Chat and embedding clients share one pooled
+sync and one pooled async httpx client, so requests reuse keep-alive connections
+instead of opening a new connection per call.
+"""
+from typing import Optional
+
+import httpx
+
+from src.models import SETTINGS
+
+_http_client: Optional[httpx.Client] = None
+_async_http_client: Optional[httpx.AsyncClient] = None
+
+
+def _limits() -> httpx.Limits:
+    return httpx.Limits(
+        max_connections=SETTINGS.openai_max_connections,
+        max_keepalive_connections=SETTINGS.openai_max_keepalive,
+    )
+
+
+def get_http_client() -> httpx.Client:
+    global _http_client
+    if _http_client is None:
+        _http_client = httpx.Client(limits=_limits(), timeout=SETTINGS.openai_timeout)
+    return _http_client
+
+
+def get_async_http_client() -> httpx.AsyncClient:
+    global _async_http_client
+    if _async_http_client is None:
+        _async_http_client = httpx.AsyncClient(limits=_limits(), timeout=SETTINGS.openai_timeout)
+    return _async_http_client
+
+
+async def aclose_http_clients() -> None:
+    """Closes the pooled connections on application shutdown."""
+    if _async_http_client is not None:
+        await _async_http_client.aclose()
+    if _http_client is not None:
+        _http_client.close()
@@ -1,15 +1,25 @@
 import os
-from typing import List, Tuple
+from collections import deque
+from concurrent.futures import Executor
+from dataclasses import dataclass
+from typing import Deque, Iterable, Iterator, List, Mapping, Sequence, Tuple
 
 from langchain_core.documents import Document
 
 from src.core.constants import APP_NAME, IMAGE_EXTENSIONS, MIN_TEXT_LEN
 from src.core.logging import get_logger
-from src.services.decryption_service import DecryptionService
+from src.models import SETTINGS
+from src.services.decryption_service import DecryptionService, PdfPasswordRequired
 from src.services.extraction_service import (
-    extract_image_document,
-    extract_pdf_documents_with_ocr,
+    ExtractionStats,
+    PendingImageExtraction,
+    PendingPdfExtraction,
+    ocr_executor,
+    submit_image_extraction,
+    submit_pdf_extraction,
 )
+from src.services.ocr_cache_service import OcrCache, file_sha256, get_ocr_cache
+from src.services.profiling_service import FileProfiler, file_profiler, profiling
 
 logger = get_logger(APP_NAME)
 _decryption_service: DecryptionService | None = None
@@ -22,14 +32,12 @@ def get_decryption_service() -> DecryptionService:
     return _decryption_service
 
 
-def list_supported_files(docs_dir: str) -> Tuple[List[str], List[str]]:
+def split_supported_files(paths: Iterable[str]) -> Tuple[List[str], List[str]]:
+    """PDFs and images among paths (by extension), in input order; other files are ignored."""
     pdf_files: List[str] = []
     image_files: List[str] = []
-    for name in os.listdir(docs_dir):
-        path = os.path.join(docs_dir, name)
-        if not os.path.isfile(path):
-            continue
-        lower = name.lower()
+    for path in paths:
+        lower = os.path.basename(path).lower()
         if lower.endswith(".pdf"):
             pdf_files.append(path)
         elif os.path.splitext(lower)[1] in IMAGE_EXTENSIONS:
@@ -37,7 +45,20 @@ def list_supported_files(docs_dir: str) -> Tuple[List[str], List[str]]:
     return pdf_files, image_files
 
 
-def load_all_documents(docs_dir: str, ocr_language: str) -> List[Document]:
+def list_supported_files(docs_dir: str) -> Tuple[List[str], List[str]]:
+    paths = (os.path.join(docs_dir, name) for name in os.listdir(docs_dir))
+    return split_supported_files(p for p in paths if os.path.isfile(p))
+
+
+def load_all_documents(
+    docs_dir: str,
+    ocr_language: str,
+    workers: int | None = None,
+) -> List[Document]:
+    """
+    Extracts every supported file in docs_dir. OCR pages of all files share one
+    worker pool (OCR_WORKERS), so both large and many small files use every core.
+    """
     if not os.path.isdir(docs_dir):
         raise FileNotFoundError(f"Docs folder not found: {docs_dir}")
 
@@ -45,53 +66,169 @@ def load_all_documents(docs_dir: str, ocr_language: str) -> List[Document]:
     if not pdf_files and not image_files:
         raise FileNotFoundError(f"No supported files found in: {docs_dir}")
 
-    all_docs: List[Document] = []
+    return load_documents(pdf_files, image_files, ocr_language=ocr_language, workers=workers)
 
-    decryption = get_decryption_service()
-
-    for pdf_path in pdf_files:
-        path_to_use: str | None = None
-        try:
-            try:
-                docs_chunk = extract_pdf_documents_with_ocr(
-                    pdf_path,
-                    min_text_len=MIN_TEXT_LEN,
-                    ocr_language=ocr_language,
-                )
-            except Exception as exc:
-                # Possibly encrypted; try decrypt then extract
-                path_to_use = decryption.decrypt_single_pdf(pdf_path)
-                if path_to_use:
-                    logger.info("Decrypted PDF for extraction: %s", os.path.basename(pdf_path))
-                    docs_chunk = extract_pdf_documents_with_ocr(
-                        path_to_use,
-                        min_text_len=MIN_TEXT_LEN,
-                        ocr_language=ocr_language,
-                    )
-                else:
-                    raise
-            all_docs.extend(docs_chunk)
-            logger.info("Loaded %s", os.path.basename(pdf_path))
-        except Exception as exc:
-            logger.warning("Failed to process %s. Error=%s", pdf_path, exc)
-        finally:
-            if path_to_use and path_to_use != pdf_path and os.path.isfile(path_to_use):
-                try:
-                    os.unlink(path_to_use)
-                except OSError:
-                    pass
-
-    for image_path in image_files:
-        doc = extract_image_document(image_path, ocr_language=ocr_language)
-        if doc:
-            all_docs.append(doc)
-            logger.info("Loaded %s", os.path.basename(image_path))
-        else:
-            logger.warning("No text extracted from image %s", image_path)
 
+def load_documents(
+    pdf_files: Sequence[str],
+    image_files: Sequence[str],
+    ocr_language: str,
+    workers: int | None = None,
+    file_hashes: Mapping[str, str] | None = None,
+) -> List[Document]:
+    """
+    Extracts the given files in order. file_hashes (path -> sha256) avoids rehashing
+    files whose hash is already known, e.g. from the ingest manifest.
+    """
+    all_docs: List[Document] = []
+    for _, docs in iter_documents(
+        pdf_files,
+        image_files,
+        ocr_language=ocr_language,
+        workers=workers,
+        file_hashes=file_hashes,
+        lookahead=len(pdf_files) + len(image_files),
+    ):
+        all_docs.extend(docs)
     return all_docs
 
 
+@dataclass
+class _PendingFile:
+    path: str
+    pending: PendingPdfExtraction | PendingImageExtraction | None
+    profiler: FileProfiler | None = None  # PROFILE_INGEST
+
+
+def _submit_pdf(
+    pdf_path: str,
+    ocr_language: str,
+    executor: Executor | None,
+    cache: OcrCache | None,
+    file_hash: str | None,
+    stats: ExtractionStats | None = None,
+) -> _PendingFile:
+    try:
+        # Encryption is checked when opening, so each file is opened and extracted once;
+        # PDFs MuPDF cannot open are decrypted in memory. Cache keys use the original file's hash.
+        pdf_doc, decrypted = get_decryption_service().open_pdf(pdf_path)
+        if decrypted is not None:
+            logger.info("Decrypted PDF in memory for extraction: %s", os.path.basename(pdf_path))
+        file_hash = file_hash or (file_sha256(pdf_path) if cache else None)
+        with pdf_doc:
+            pending = submit_pdf_extraction(
+                pdf_path,
+                min_text_len=MIN_TEXT_LEN,
+                ocr_language=ocr_language,
+                executor=executor,
+                cache=cache,
+                file_hash=file_hash,
+                stats=stats,
+                pdf_doc=pdf_doc,
+                stream=decrypted,
+            )
+        return _PendingFile(pdf_path, pending)
+    except PdfPasswordRequired:
+        logger.warning("PDF is password protected, skipping: %s", pdf_path)
+    except Exception as exc:
+        logger.warning("Failed to process %s. Error=%s", pdf_path, exc)
+    return _PendingFile(pdf_path, None)
+
+
+def _collect(item: _PendingFile) -> List[Document]:
+    if item.profiler is None:
+        return _collect_pending(item)
+    with profiling(item.profiler):
+        docs = _collect_pending(item)
+    if item.pending is not None:
+        for part in item.pending.profile_parts:
+            item.profiler.add_part(part)
+    item.profiler.save()
+    return docs
+
+
+def _collect_pending(item: _PendingFile) -> List[Document]:
+    if isinstance(item.pending, PendingImageExtraction):
+        doc = item.pending.result()
+        if doc:
+            logger.info("Loaded %s", os.path.basename(item.path))
+            return [doc]
+        logger.warning("No text extracted from image %s", item.path)
+        return []
+
+    try:
+        if item.pending is not None:
+            docs = item.pending.result()
+            logger.info("Loaded %s", os.path.basename(item.path))
+            return docs
+    except Exception as exc:
+        logger.warning("Failed to process %s. Error=%s", item.path, exc)
+    return []
+
+
+def iter_documents(
+    pdf_files: Sequence[str],
+    image_files: Sequence[str],
+    ocr_language: str,
+    workers: int | None = None,
+    file_hashes: Mapping[str, str] | None = None,
+    lookahead: int | None = None,
+    stats: ExtractionStats | None = None,
+) -> Iterator[Tuple[str, List[Document]]]:
+    """
+    Yields (path, page documents) per file, PDFs first, in input order.
+    Files share one OCR worker pool; at most `lookahead` files (default: OCR_WORKERS)
+    are scheduled ahead of the consumer, which bounds the extracted text held in memory.
+    Pass stats to accumulate OCR / skipped blank page counts.
+    """
+    file_hashes = file_hashes or {}
+    stats = stats if stats is not None else ExtractionStats()
+    blank_before = stats.blank_pages_skipped
+    workers = SETTINGS.ocr_workers if workers is None else workers
+    lookahead = max(1, lookahead if lookahead is not None else workers)
+    cache = get_ocr_cache()
+    hits_before, misses_before = (cache.hits, cache.misses) if cache else (0, 0)
+
+    with ocr_executor(workers) as executor:
+        window: Deque[_PendingFile] = deque()
+
+        def submit_all() -> Iterator[_PendingFile]:
+            for pdf_path in pdf_files:
+                profiler = file_profiler(pdf_path)
+                with profiling(profiler):
+                    item = _submit_pdf(
+                        pdf_path, ocr_language, executor, cache, file_hashes.get(pdf_path), stats
+                    )
+                item.profiler = profiler
+                yield item
+            for image_path in image_files:
+                profiler = file_profiler(image_path)
+                with profiling(profiler):
+                    pending = submit_image_extraction(
+                        image_path, ocr_language=ocr_language, executor=executor, cache=cache
+                    )
+                yield _PendingFile(image_path, pending, profiler=profiler)
+
+        for item in submit_all():
+            window.append(item)
+            if len(window) >= lookahead:
+                oldest = window.popleft()
+                yield oldest.path, _collect(oldest)
+        while window:
+            oldest = window.popleft()
+            yield oldest.path, _collect(oldest)
+
+    blank_skipped = stats.blank_pages_skipped - blank_before
+    if blank_skipped:
+        logger.info("Skipped OCR for %s blank pages", blank_skipped)
+    if cache:
+        logger.info(
+            "OCR cache: %s hits, %s misses",
+            cache.hits - hits_before,
+            cache.misses - misses_before,
+        )
+
+
 def export_documents_to_txt(docs: List[Document], output_path: str) -> None:
     """
     Write all extracted document text to a .txt file for inspection.
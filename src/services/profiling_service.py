@@ -0,0 +1,189 @@
+"""
+Opt-in profiling: per-file cProfile output during extraction (PROFILE_INGEST), per-request
+stage timings for /rag (returned as a Server-Timing header), and time-boxed wall-clock
+stack sampling of the running process. All of it is inactive unless asked for.
+"""
+import cProfile
+import os
+import pstats
+import re
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from src.core.constants import APP_NAME, PROFILE_SAMPLE_INTERVAL
+from src.core.logging import get_logger
+from src.models import SETTINGS
+
+logger = get_logger(APP_NAME)
+
+
+def _parts_dir() -> str:
+    return os.path.join(SETTINGS.profile_dir, "parts")
+
+
+def dump_profile_part(profile: cProfile.Profile) -> str:
+    """Writes a partial profile (e.g. of one OCR task in a worker process) for FileProfiler to merge."""
+    os.makedirs(_parts_dir(), exist_ok=True)
+    path = os.path.join(_parts_dir(), f"{uuid.uuid4().hex}.prof")
+    profile.dump_stats(path)
+    return path
+
+
+class FileProfiler:
+    """
+    cProfile of the work done for one file: the calls that schedule and collect it run
+    under active(), and OCR tasks run in worker processes contribute partial profiles
+    (add_part). save() merges them into PROFILE_DIR/ingest/<time>_<file>.prof, which
+    pstats, snakeviz or gprof2dot can read.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.profile = cProfile.Profile()
+        self.parts: List[str] = []
+        self.active_seconds = 0.0
+        self.started = time.time()
+
+    @contextmanager
+    def active(self) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            self.profile.enable()
+        except ValueError as exc:  # another profiler is active in this interpreter
+            logger.debug("Not profiling %s: %s", self.path, exc)
+            yield
+            return
+        try:
+            yield
+        finally:
+            self.profile.disable()
+            self.active_seconds += time.perf_counter() - start
+
+    def add_part(self, path: Optional[str]) -> None:
+        if path:
+            self.parts.append(path)
+
+    def save(self) -> Optional[str]:
+        out_dir = os.path.join(SETTINGS.profile_dir, "ingest")
+        name = re.sub(r"[^\w.-]", "_", os.path.basename(self.path))
+        out_path = os.path.join(out_dir, f"{time.strftime('%Y%m%dT%H%M%S', time.localtime(self.started))}_{name}.prof")
+        try:
+            os.makedirs(out_dir, exist_ok=True)
+            stats = pstats.Stats(self.profile)
+            for part in self.parts:
+                stats.add(part)
+            stats.dump_stats(out_path)
+        except (OSError, TypeError) as exc:
+            logger.warning("Could not write profile of %s: %s", self.path, exc)
+            return None
+        finally:
+            for part in self.parts:
+                try:
+                    os.unlink(part)
+                except OSError:
+                    pass
+        logger.info(
+            "Profile of %s: %s (%.2fs in this process, %s OCR tasks in workers)",
+            os.path.basename(self.path),
+            out_path,
+            self.active_seconds,
+            len(self.parts),
+        )
+        return out_path
+
+
+def file_profiler(path: str) -> Optional[FileProfiler]:
+    """A FileProfiler for path when PROFILE_INGEST is on, else None."""
+    return FileProfiler(path) if SETTINGS.profile_ingest else None
+
+
+@contextmanager
+def profiling(profiler: Optional[FileProfiler]) -> Iterator[None]:
+    if profiler is None:
+        yield
+        return
+    with profiler.active():
+        yield
+
+
+# Per-request stage timings
+
+_request_timings: ContextVar[Optional[Dict[str, float]]] = ContextVar("request_timings", default=None)
+
+
+def start_request_timings() -> Dict[str, float]:
+    """Collects stage_timer durations of the current request (task and the threads it starts) into the returned dict."""
+    timings: Dict[str, float] = {}
+    _request_timings.set(timings)
+    return timings
+
+
+@contextmanager
+def stage_timer(stage: str) -> Iterator[None]:
+    """Adds the duration of the block to the current request's timings; a no-op outside start_request_timings."""
+    timings = _request_timings.get()
+    if timings is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings[stage] = timings.get(stage, 0.0) + time.perf_counter() - start
+
+
+def server_timing_header(timings: Dict[str, float]) -> str:
+    """Server-Timing value (milliseconds), shown per request in browser dev tools."""
+    return ", ".join(f"{stage};dur={seconds * 1000:.1f}" for stage, seconds in timings.items())
+
+
+# Sampling profiler
+
+_sampling_lock = threading.Lock()
+
+
+def _frame_label(code) -> str:
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+def sample_stacks(seconds: float, interval: float = PROFILE_SAMPLE_INTERVAL) -> Optional[Tuple[int, Counter]]:
+    """
+    Wall-clock sampling of every thread of this process for `seconds`: (samples taken,
+    count per stack), stacks root first and prefixed with the thread name. Threads that
+    are waiting show up too, which is what explains a slow request. Returns None if
+    another sampling run is in progress.
+    """
+    if not _sampling_lock.acquire(blocking=False):
+        return None
+    try:
+        me = threading.get_ident()
+        stacks: Counter = Counter()
+        samples = 0
+        deadline = time.monotonic() + seconds
+        while time.monotonic() < deadline:
+            names = {t.ident: t.name for t in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == me:
+                    continue
+                stack: List[str] = []
+                while frame is not None:
+                    stack.append(_frame_label(frame.f_code))
+                    frame = frame.f_back
+                stack.append(names.get(ident, f"thread-{ident}"))
+                stacks[tuple(reversed(stack))] += 1
+            samples += 1
+            time.sleep(interval)
+        return samples, stacks
+    finally:
+        _sampling_lock.release()
+
+
+def collapsed_stacks(stacks: Counter) -> str:
+    """Folded-stack text ("frame;frame;frame count" per line) for flamegraph.pl or speedscope."""
+    return "\n".join(f"{';'.join(stack)} {count}" for stack, count in stacks.most_common()) + "\n"
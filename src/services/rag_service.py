@@ -1,13 +1,42 @@
-from typing import Any, Dict, List, Union
+import asyncio
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Dict, List, Optional, Sequence, Tuple
 
-from langchain_community.vectorstores.chroma import Chroma
-from langchain_community.vectorstores.pgvector import PGVector
+import numpy as np
+from langchain_core.documents import Document
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_openai import ChatOpenAI
 
-from src.core.constants import APP_NAME, RAG_MAX_CONTEXT_CHARS, RAG_TOP_K
+from src.core.constants import (
+    APP_NAME,
+    RAG_HYBRID_CANDIDATES,
+    RAG_MAX_CONTEXT_TOKENS,
+    RAG_MMR_CANDIDATES,
+    RAG_MMR_LAMBDA,
+    RAG_TOP_K,
+    RETRIEVAL_MODES,
+    RRF_K,
+)
 from src.core.logging import get_logger
+from src.core.metrics import CONTEXT_CHUNKS, CONTEXT_TOKENS, LLM_SECONDS, RETRIEVAL_SECONDS
 from src.models import SETTINGS
+from src.services.answer_cache_service import AnswerCache
+from src.services.context_service import (
+    cosine_relevance,
+    get_token_counter,
+    mmr_select,
+    pack_by_tokens,
+    rank_relevance,
+)
+from src.services.dedup_service import SourceRef, chunk_sources
+from src.services.lexical_index_service import LexicalIndex, get_lexical_index, lexical_rank
+from src.services.openai_client_service import get_async_http_client, get_http_client
+from src.services.profiling_service import stage_timer
+from src.services.vectorstore_service import (
+    AnyVectorStore,
+    batch_similarity_search_with_vectors,
+    get_chunks_with_vectors,
+)
 
 logger = get_logger(APP_NAME)
 
@@ -25,40 +54,475 @@ RAG_PROMPT = ChatPromptTemplate.from_messages(
     ]
 )
 
+_chat_model: Optional[ChatOpenAI] = None
+
+_StoredVectors = Dict[str, np.ndarray]  # stored chunk embeddings by _chunk_key
+
+
+def get_chat_model() -> ChatOpenAI:
+    """Process-wide chat client, reusing pooled HTTP connections across requests."""
+    global _chat_model
+    if _chat_model is None:
+        _chat_model = ChatOpenAI(
+            model=SETTINGS.chat_model,
+            temperature=0.2,
+            http_client=get_http_client(),
+            http_async_client=get_async_http_client(),
+        )
+    return _chat_model
+
+
+def _doc_sources(doc: Document, shared: Dict[str, List[SourceRef]]) -> List[SourceRef]:
+    """Every (source, page, used_ocr) a chunk stands for: all files of a deduplicated chunk, else its own."""
+    refs = shared.get(doc.metadata.get("chunk_id") or "")
+    if refs:
+        return refs
+    return [(doc.metadata.get("source"), doc.metadata.get("page"), doc.metadata.get("used_ocr"))]
+
+
+_CONTEXT_SEPARATOR = "\n\n---\n\n"
+
+
+def pack_context(retrieved_docs: List[Document]) -> Tuple[str, List[Document]]:
+    """
+    Context text for the prompt and the chunks it contains: chunks are taken in order
+    while they fit in RAG_MAX_CONTEXT_TOKENS tokens of the chat model.
+    """
+    shared = chunk_sources(retrieved_docs)
+    parts: List[str] = []
+    for doc in retrieved_docs:
+        (source, page, _), *others = _doc_sources(doc, shared)
+        header = f"[Source: {source} | Page: {page}"
+        if others:
+            header += " | Also in: " + "; ".join(f"{s} p.{p}" for s, p, _ in others)
+        parts.append(f"{header}]\n{doc.page_content}")
+
+    count_tokens = get_token_counter(SETTINGS.chat_model)
+    chosen = pack_by_tokens(parts, RAG_MAX_CONTEXT_TOKENS, count_tokens, count_tokens(_CONTEXT_SEPARATOR))
+    context = _CONTEXT_SEPARATOR.join(parts[i] for i in chosen)
+    CONTEXT_TOKENS.labels(model=SETTINGS.chat_model).observe(count_tokens(context))
+    CONTEXT_CHUNKS.observe(len(chosen))
+    return context, [retrieved_docs[i] for i in chosen]
+
+
+def build_context(retrieved_docs: List[Document]) -> str:
+    return pack_context(retrieved_docs)[0]
+
+
+def source_refs(retrieved_docs: List[Document]) -> List[Dict[str, Any]]:
+    shared = chunk_sources(retrieved_docs)
+    return [
+        {"source": source, "page": page, "used_ocr": used_ocr}
+        for doc in retrieved_docs
+        for source, page, used_ocr in _doc_sources(doc, shared)
+    ]
+
+
+def _mmr(
+    docs: List[Document],
+    vectors: Sequence[Sequence[float]],
+    query_vector: Optional[List[float]],
+    k: int,
+    mode: str,
+) -> List[Document]:
+    """k of the candidates by MMR. Relevance is cosine to the query for vector retrieval, else the retrieval rank."""
+    if len(docs) <= k:
+        return docs
+    candidates = np.asarray(vectors, dtype=np.float64)
+    if mode == "vector" and query_vector is not None:
+        relevance = cosine_relevance(query_vector, candidates)
+    else:
+        relevance = rank_relevance(len(docs))
+    return [docs[i] for i in mmr_select(candidates, relevance, k, RAG_MMR_LAMBDA)]
+
+
+def _missing_vectors(hits: Sequence[List[Document]], stored: _StoredVectors, k: int) -> Dict[str, str]:
+    """Text by _chunk_key of the MMR candidates the store returned no embedding for."""
+    return {
+        _chunk_key(d): d.page_content
+        for docs in hits
+        if len(docs) > k
+        for d in docs
+        if _chunk_key(d) not in stored
+    }
+
+
+def _diversify(
+    hits: Sequence[List[Document]],
+    stored: _StoredVectors,
+    query_vectors: Sequence[Optional[List[float]]],
+    k: int,
+    mode: str,
+) -> List[List[Document]]:
+    return [
+        _mmr(docs, [stored[_chunk_key(d)] for d in docs], qv, k, mode) if len(docs) > k else docs
+        for docs, qv in zip(hits, query_vectors)
+    ]
+
+
+async def _adiversify(
+    vectorstore: AnyVectorStore,
+    hits: Sequence[List[Document]],
+    stored: _StoredVectors,
+    query_vectors: Sequence[Optional[List[float]]],
+    k: int,
+    mode: str,
+) -> List[List[Document]]:
+    """
+    Picks k chunks per candidate list by MMR, using the embeddings the store returned with
+    the candidates. Only candidates without one are embedded again (in one call).
+    """
+    missing = _missing_vectors(hits, stored, k)
+    if missing:
+        vectors = await vectorstore.embeddings.aembed_documents(list(missing.values()))
+        stored = {**stored, **dict(zip(missing, vectors))}
+    return _diversify(hits, stored, query_vectors, k, mode)
+
 
 def answer_with_rag(
-    vectorstore: Union[PGVector, Chroma],
+    vectorstore: AnyVectorStore,
     question: str,
     k: int = RAG_TOP_K,
 ) -> Dict[str, Any]:
-    retriever = vectorstore.as_retriever(search_kwargs={"k": k})
-    retrieved_docs = retriever.get_relevant_documents(question)
+    with stage_timer("embed"):
+        query_vector = vectorstore.embeddings.embed_query(question)
+    with RETRIEVAL_SECONDS.labels(mode="vector").time(), stage_timer("retrieve"):
+        hits, stored = _split_vectors(
+            batch_similarity_search_with_vectors(vectorstore, [query_vector], max(k, RAG_MMR_CANDIDATES))
+        )
+    with stage_timer("context"):
+        missing = _missing_vectors(hits, stored, k)
+        if missing:
+            stored.update(zip(missing, vectorstore.embeddings.embed_documents(list(missing.values()))))
+        retrieved_docs = _diversify(hits, stored, [query_vector], k, "vector")[0]
+        context, used_docs = pack_context(retrieved_docs)
 
-    parts: List[str] = []
-    total = 0
-    for doc in retrieved_docs:
-        chunk = (
-            f"[Source: {doc.metadata.get('source')} | Page: {doc.metadata.get('page')}]\n"
-            f"{doc.page_content}"
+    msg = RAG_PROMPT.format_messages(question=question, context=context)
+    with LLM_SECONDS.labels(model=SETTINGS.chat_model, streaming="false").time(), stage_timer("llm"):
+        resp = get_chat_model().invoke(msg)
+
+    return {"answer": resp.content, "sources": source_refs(used_docs)}
+
+
+def reciprocal_rank_fusion(rankings: Sequence[Sequence[str]], k: int = RRF_K) -> List[str]:
+    """IDs ordered by summed 1 / (k + rank) over the rankings they appear in."""
+    scores: Dict[str, float] = {}
+    for ranking in rankings:
+        for rank, item in enumerate(ranking, start=1):
+            scores[item] = scores.get(item, 0.0) + 1.0 / (k + rank)
+    return sorted(scores, key=scores.__getitem__, reverse=True)
+
+
+def _chunk_key(doc: Document) -> str:
+    return doc.metadata.get("chunk_id") or doc.page_content
+
+
+def _split_vectors(
+    hits: Sequence[List[Tuple[Document, Optional[np.ndarray]]]],
+) -> Tuple[List[List[Document]], _StoredVectors]:
+    """Candidate lists without the stored embeddings, and those embeddings by _chunk_key."""
+    stored = {_chunk_key(doc): vec for per_query in hits for doc, vec in per_query if vec is not None}
+    return [[doc for doc, _ in per_query] for per_query in hits], stored
+
+
+def _fuse(
+    vectorstore: AnyVectorStore,
+    k: int,
+    vector_docs: List[Document],
+    lexical_ids: List[str],
+    stored: _StoredVectors,
+) -> List[Document]:
+    """
+    RRF of vector and lexical hits; lexical-only hits are loaded from the vector store,
+    with their embeddings added to stored.
+    """
+    ranked = reciprocal_rank_fusion([[_chunk_key(d) for d in vector_docs], lexical_ids])[:k]
+    by_id = {_chunk_key(d): d for d in vector_docs}
+    for cid, (doc, vec) in get_chunks_with_vectors(vectorstore, [cid for cid in ranked if cid not in by_id]).items():
+        by_id[cid] = doc
+        if vec is not None:
+            stored[_chunk_key(doc)] = vec
+    return [by_id[cid] for cid in ranked if cid in by_id]
+
+
+def resolve_retrieval_mode(mode: Optional[str]) -> Tuple[str, Optional[LexicalIndex]]:
+    """Requested (or default RETRIEVAL_MODE) mode and the BM25 index; "vector" when there is no index."""
+    mode = (mode or SETTINGS.retrieval_mode).lower()
+    if mode not in RETRIEVAL_MODES:
+        raise ValueError(f"Unknown retrieval mode: {mode}")
+    if mode == "vector":
+        return mode, None
+    index = get_lexical_index()
+    if index is None:
+        logger.debug("No lexical index; using vector retrieval")
+        return "vector", None
+    return mode, index
+
+
+async def _avector_search(
+    vectorstore: AnyVectorStore,
+    query_vectors: Sequence[List[float]],
+    k: int,
+) -> Tuple[List[List[Document]], _StoredVectors]:
+    hits = await asyncio.to_thread(batch_similarity_search_with_vectors, vectorstore, query_vectors, k)
+    return _split_vectors(hits)
+
+
+async def aretrieve(
+    vectorstore: AnyVectorStore,
+    question: str,
+    k: int = RAG_TOP_K,
+    query_vector: Optional[List[float]] = None,
+    mode: Optional[str] = None,
+) -> List[Document]:
+    """
+    Top-k chunks for the question. "vector" embeds the question on the async client,
+    "lexical" uses the BM25 index, "hybrid" runs both concurrently and fuses them (RRF).
+    """
+    mode, index = resolve_retrieval_mode(mode)
+    if mode != "lexical" and query_vector is None:
+        query_vector = await vectorstore.embeddings.aembed_query(question)
+    hits, _ = await _aretrieve_many(vectorstore, [question], [query_vector], k, mode, index)
+    return hits[0]
+
+
+async def aretrieve_many(
+    vectorstore: AnyVectorStore,
+    questions: Sequence[str],
+    query_vectors: Sequence[List[float]],
+    k: int = RAG_TOP_K,
+    mode: Optional[str] = None,
+) -> List[List[Document]]:
+    """aretrieve for many questions: one batch_similarity_search plus one pass over the BM25 index."""
+    mode, index = resolve_retrieval_mode(mode)
+    hits, _ = await _aretrieve_many(vectorstore, questions, query_vectors, k, mode, index)
+    return hits
+
+
+async def _aretrieve_many(
+    vectorstore: AnyVectorStore,
+    questions: Sequence[str],
+    query_vectors: Sequence[Optional[List[float]]],
+    k: int,
+    mode: str,
+    index: Optional[LexicalIndex],
+) -> Tuple[List[List[Document]], _StoredVectors]:
+    """Candidates per question, with the stored embeddings the vector store returned for them."""
+    if not questions:
+        return [], {}
+    if index is None:
+        return await _avector_search(vectorstore, query_vectors, k)
+
+    n = max(k, RAG_HYBRID_CANDIDATES)
+    lexical = asyncio.to_thread(lexical_rank, index, questions, n)
+    if mode == "lexical":
+        vector_hits, stored, lexical_ranks = [[] for _ in questions], {}, await lexical
+    else:
+        (vector_hits, stored), lexical_ranks = await asyncio.gather(
+            _avector_search(vectorstore, query_vectors, n), lexical
         )
-        if total + len(chunk) > RAG_MAX_CONTEXT_CHARS:
-            break
-        parts.append(chunk)
-        total += len(chunk)
+    hits = await asyncio.to_thread(
+        lambda: [_fuse(vectorstore, k, v, ids, stored) for v, ids in zip(vector_hits, lexical_ranks)]
+    )
+    return hits, stored
+
+
+@dataclass
+class _Retrieval:
+    """Outcome of the cache lookup + retrieval shared by the async answer paths."""
+    cached: Optional[Dict[str, Any]] = None
+    docs: List[Document] = field(default_factory=list)
+    query_vector: Optional[List[float]] = None
+    generation: Optional[int] = None  # cache generation when the lookup started
+
+
+async def _aretrieve_or_hit(
+    vectorstore: AnyVectorStore,
+    question: str,
+    k: int,
+    mode: str,
+    cache: Optional[AnswerCache],
+    bypass_cache: bool,
+) -> _Retrieval:
+    scope = (k, mode)
+    lookup = cache is not None and not bypass_cache
+    if lookup:
+        cached = cache.get(question, scope)
+        if cached is not None:
+            return _Retrieval(cached=cached)
+    generation = cache.generation if cache is not None else None
 
-    context = "\n\n---\n\n".join(parts)
+    query_vector = None
+    if mode != "lexical" or (cache is not None and cache.similarity_enabled):
+        with stage_timer("embed"):
+            query_vector = await vectorstore.embeddings.aembed_query(question)
+    if lookup and query_vector is not None:
+        cached = cache.get_similar(query_vector, scope)
+        if cached is not None:
+            return _Retrieval(cached=cached)
 
-    llm = ChatOpenAI(model=SETTINGS.chat_model, temperature=0.2)
+    with RETRIEVAL_SECONDS.labels(mode=mode).time(), stage_timer("retrieve"):
+        _, index = resolve_retrieval_mode(mode)
+        candidates, stored = await _aretrieve_many(
+            vectorstore, [question], [query_vector], max(k, RAG_MMR_CANDIDATES), mode, index
+        )
+    with stage_timer("context"):
+        docs = (await _adiversify(vectorstore, candidates, stored, [query_vector], k, mode))[0]
+    return _Retrieval(docs=docs, query_vector=query_vector, generation=generation)
+
+
+async def aanswer_with_rag(
+    vectorstore: AnyVectorStore,
+    question: str,
+    k: int = RAG_TOP_K,
+    cache: Optional[AnswerCache] = None,
+    bypass_cache: bool = False,
+    mode: Optional[str] = None,
+) -> Dict[str, Any]:
+    """
+    Async answer_with_rag: no threadpool thread is held while waiting on OpenAI.
+    With a cache, an exact or similar earlier question is answered without retrieval or
+    an LLM call; bypass_cache skips the lookup but still refreshes the cached answer.
+    mode selects the retrieval (see aretrieve; default RETRIEVAL_MODE).
+    """
+    mode, _ = resolve_retrieval_mode(mode)
+    retrieval = await _aretrieve_or_hit(vectorstore, question, k, mode, cache, bypass_cache)
+    if retrieval.cached is not None:
+        return {**retrieval.cached, "cached": True}
+
+    with stage_timer("context"):
+        context, used_docs = pack_context(retrieval.docs)
     msg = RAG_PROMPT.format_messages(question=question, context=context)
-    resp = llm.invoke(msg)
-
-    sources = [
-        {
-            "source": doc.metadata.get("source"),
-            "page": doc.metadata.get("page"),
-            "used_ocr": doc.metadata.get("used_ocr"),
-        }
-        for doc in retrieved_docs
-    ]
+    with LLM_SECONDS.labels(model=SETTINGS.chat_model, streaming="false").time(), stage_timer("llm"):
+        resp = await get_chat_model().ainvoke(msg)
+
+    result = {"answer": resp.content, "sources": source_refs(used_docs)}
+    if cache is not None:
+        cache.put(question, (k, mode), result, vector=retrieval.query_vector, generation=retrieval.generation)
+    return {**result, "cached": False}
+
+
+async def astream_answer_with_rag(
+    vectorstore: AnyVectorStore,
+    question: str,
+    k: int = RAG_TOP_K,
+    cache: Optional[AnswerCache] = None,
+    bypass_cache: bool = False,
+    mode: Optional[str] = None,
+) -> AsyncIterator[Tuple[str, Any]]:
+    """
+    Streaming aanswer_with_rag yielding (event, data): "sources" once retrieval is done,
+    then "token" deltas of the answer, then "done". A cached answer arrives as one token.
+    The complete answer is cached once the stream finishes.
+    """
+    mode, _ = resolve_retrieval_mode(mode)
+    retrieval = await _aretrieve_or_hit(vectorstore, question, k, mode, cache, bypass_cache)
+    if retrieval.cached is not None:
+        yield "sources", retrieval.cached["sources"]
+        yield "token", retrieval.cached["answer"]
+        yield "done", {"cached": True}
+        return
+
+    context, used_docs = pack_context(retrieval.docs)
+    sources = source_refs(used_docs)
+    yield "sources", sources
+
+    msg = RAG_PROMPT.format_messages(question=question, context=context)
+    parts: List[str] = []
+    with LLM_SECONDS.labels(model=SETTINGS.chat_model, streaming="true").time():
+        async for chunk in get_chat_model().astream(msg):
+            if chunk.content:
+                parts.append(chunk.content)
+                yield "token", chunk.content
+
+    if cache is not None:
+        result = {"answer": "".join(parts), "sources": sources}
+        cache.put(question, (k, mode), result, vector=retrieval.query_vector, generation=retrieval.generation)
+    yield "done", {"cached": False}
+
+
+async def abatch_answer_with_rag(
+    vectorstore: AnyVectorStore,
+    questions: Sequence[str],
+    k: int = RAG_TOP_K,
+    cache: Optional[AnswerCache] = None,
+    bypass_cache: bool = False,
+    max_concurrency: int = 8,
+    mode: Optional[str] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Answers many questions, in order: uncached questions are embedded in one batched call
+    and retrieved together (aretrieve_many), then answered by at most max_concurrency
+    concurrent LLM calls. A failing item gets an "error" entry instead of failing the batch.
+    """
+    mode, index = resolve_retrieval_mode(mode)
+    scope = (k, mode)
+    results: List[Optional[Dict[str, Any]]] = [None] * len(questions)
+    lookup = cache is not None and not bypass_cache
+    generation = cache.generation if cache is not None else None
+
+    pending: List[int] = []
+    for i, question in enumerate(questions):
+        if not question.strip():
+            results[i] = {"error": "Empty question."}
+        elif lookup and (cached := cache.get(question, scope)) is not None:
+            results[i] = {**cached, "cached": True}
+        else:
+            pending.append(i)
+
+    def fail(indices: Sequence[int], exc: Exception) -> None:
+        logger.error("Batch RAG failed for %s questions: %s", len(indices), exc)
+        for i in indices:
+            results[i] = {"error": type(exc).__name__}
+
+    retrieved: Dict[int, Tuple[Optional[List[float]], List[Document]]] = {}
+    if pending:
+        try:
+            if mode != "lexical" or (cache is not None and cache.similarity_enabled):
+                vectors = await vectorstore.embeddings.aembed_documents([questions[i] for i in pending])
+            else:
+                vectors = [None] * len(pending)
+            to_retrieve: List[int] = []
+            for i, vector in zip(pending, vectors):
+                if lookup and vector is not None and (cached := cache.get_similar(vector, scope)) is not None:
+                    results[i] = {**cached, "cached": True}
+                else:
+                    to_retrieve.append(i)
+                    retrieved[i] = (vector, [])
+            query_vectors = [retrieved[i][0] for i in to_retrieve]
+            with RETRIEVAL_SECONDS.labels(mode=mode).time():
+                hits, stored = await _aretrieve_many(
+                    vectorstore,
+                    [questions[i] for i in to_retrieve],
+                    query_vectors,
+                    max(k, RAG_MMR_CANDIDATES),
+                    mode,
+                    index,
+                )
+            hits = await _adiversify(vectorstore, hits, stored, query_vectors, k, mode)
+            for i, docs in zip(to_retrieve, hits):
+                retrieved[i] = (retrieved[i][0], docs)
+        except Exception as exc:
+            fail([i for i in pending if results[i] is None], exc)
+            retrieved.clear()
+
+    semaphore = asyncio.Semaphore(max(1, max_concurrency))
+    llm = get_chat_model()
+
+    async def answer(i: int, vector: Optional[List[float]], docs: List[Document]) -> None:
+        async with semaphore:
+            try:
+                context, used_docs = pack_context(docs)
+                msg = RAG_PROMPT.format_messages(question=questions[i], context=context)
+                with LLM_SECONDS.labels(model=SETTINGS.chat_model, streaming="false").time():
+                    resp = await llm.ainvoke(msg)
+            except Exception as exc:
+                fail([i], exc)
+                return
+        result = {"answer": resp.content, "sources": source_refs(used_docs)}
+        if cache is not None:
+            cache.put(questions[i], scope, result, vector=vector, generation=generation)
+        results[i] = {**result, "cached": False}
 
-    return {"answer": resp.content, "sources": sources}
+    await asyncio.gather(*(answer(i, vector, docs) for i, (vector, docs) in retrieved.items()))
+    return results  # type: ignore[return-value]
@@ -1,22 +1,95 @@
 import os
-from typing import List, Union
+import shutil
+import sys
+from typing import TYPE_CHECKING, Any, Dict, Iterator, List, Optional, Sequence, Tuple, Union
 
+import numpy as np
 import psycopg2
 from langchain_community.vectorstores.chroma import Chroma
-from langchain_community.vectorstores.pgvector import PGVector
 from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
 from langchain_openai import OpenAIEmbeddings
 
 from src.core.constants import APP_NAME
 from src.core.logging import get_logger
+from src.core.metrics import VECTOR_SEARCH_SECONDS, VECTOR_UPSERT_SECONDS
 from src.models import SETTINGS
-from src.services.database_service import ensure_pgvector_extension
+from src.services.database_service import (
+    batch_nearest_chunks,
+    copy_embeddings,
+    delete_embeddings,
+    drop_vector_index,
+    ensure_pgvector_extension,
+    ensure_vector_index,
+    fetch_chunks,
+    iter_collection_rows,
+    rename_collection,
+)
+from src.services.embedding_cache_service import CachedEmbeddings
+from src.services.manifest_service import load_manifest
+from src.services.numpy_store_service import DIR_SUFFIX, NumpyVectorStore
+from src.services.openai_client_service import get_async_http_client, get_http_client
+
+if TYPE_CHECKING:
+    from langchain_community.vectorstores.pgvector import PGVector
 
 logger = get_logger(APP_NAME)
 
+AnyVectorStore = Union["PGVector", Chroma, NumpyVectorStore]
+
+_PGVECTOR_MODULE = "langchain_community.vectorstores.pgvector"
+_DELETE_BATCH_SIZE = 500
+# Keyed by DistanceStrategy values (a str enum)
+_PG_DISTANCE_OPERATORS = {
+    "cosine": "<=>",
+    "l2": "<->",
+    "inner": "<#>",
+}
+_embeddings: Optional[Embeddings] = None
+
+
+def _is_pgvector(vectorstore: Any) -> bool:
+    """
+    PGVector is imported with the first Postgres store (its SQLAlchemy models take longer
+    to import than the rest of the API), so without that import no store can be one.
+    """
+    module = sys.modules.get(_PGVECTOR_MODULE)
+    return module is not None and isinstance(vectorstore, module.PGVector)
+
+
+def get_embeddings() -> Embeddings:
+    """
+    Process-wide embeddings client on the pooled HTTP clients. Wrapped in the persistent embedding cache unless
+    EMBEDDING_CACHE_PATH is empty; stores built with it also cache query embeddings.
+    """
+    global _embeddings
+    if _embeddings is None:
+        embeddings: Embeddings = OpenAIEmbeddings(
+            model=SETTINGS.embedding_model,
+            http_client=get_http_client(),
+            http_async_client=get_async_http_client(),
+        )
+        if SETTINGS.embedding_cache_path:
+            embeddings = CachedEmbeddings(
+                embeddings,
+                model=SETTINGS.embedding_model,
+                cache_path=SETTINGS.embedding_cache_path,
+                max_entries=SETTINGS.embedding_cache_max_entries,
+            )
+        _embeddings = embeddings
+    return _embeddings
+
+
+def _build_local_store(chunks: List[Document], embeddings: Embeddings) -> Union[Chroma, NumpyVectorStore]:
+    """Local storage (Chroma or the NumPy store on disk, by VECTOR_BACKEND) when Postgres is not available."""
+    if SETTINGS.vector_backend == "numpy":
+        vectorstore = _open_numpy(embeddings, SETTINGS.collection_name)
+        vectorstore.add_documents(chunks)
+        return vectorstore
+    return _build_chroma(chunks, embeddings)
+
 
-def _build_chroma(chunks: List[Document], embeddings: OpenAIEmbeddings) -> Chroma:
-    """Local storage (Chroma on disk) when Postgres is not available."""
+def _build_chroma(chunks: List[Document], embeddings: Embeddings) -> Chroma:
     persist_dir = SETTINGS.vector_persist_dir
     os.makedirs(persist_dir, exist_ok=True)
     logger.info("Using local vector store (SQLite/Chroma) at %s", persist_dir)
@@ -28,23 +101,412 @@ def _build_chroma(chunks: List[Document], embeddings: OpenAIEmbeddings) -> Chrom
     )
 
 
-def build_vectorstore(chunks: List[Document]) -> Union[PGVector, Chroma]:
-    embeddings = OpenAIEmbeddings(model=SETTINGS.embedding_model)
+def build_vectorstore(chunks: List[Document]) -> AnyVectorStore:
+    embeddings = get_embeddings()
+
+    if SETTINGS.use_postgres:
+        try:
+            vectorstore = open_vectorstore()
+        except psycopg2.OperationalError as exc:
+            logger.warning(
+                "Postgres unavailable (%s). Falling back to local vector store.",
+                exc,
+            )
+            return _build_local_store(chunks, embeddings)
+        add_chunks(vectorstore, chunks)
+        optimize_vectorstore(vectorstore)
+        return vectorstore
+
+    return _build_local_store(chunks, embeddings)
+
+
+def staging_collection_name() -> str:
+    """Collection that full rebuilds are written to before being promoted to the live name."""
+    return f"{SETTINGS.collection_name}__staging"
+
+
+def numpy_store_dir(collection_name: str) -> str:
+    return os.path.join(SETTINGS.vector_persist_dir, f"{collection_name}{DIR_SUFFIX}")
+
+
+def _open_local_store(
+    embeddings: Embeddings,
+    collection_name: str,
+    read_only: bool = False,
+) -> Union[Chroma, NumpyVectorStore]:
+    """Opens the local store selected by VECTOR_BACKEND (Chroma or the NumPy store)."""
+    if SETTINGS.vector_backend == "numpy":
+        return _open_numpy(embeddings, collection_name, read_only)
+    return _open_chroma(embeddings, collection_name)
+
+
+def _open_numpy(embeddings: Embeddings, collection_name: str, read_only: bool = False) -> NumpyVectorStore:
+    if not read_only:
+        os.makedirs(SETTINGS.vector_persist_dir, exist_ok=True)
+    logger.info(
+        "Using local vector store (NumPy memmap, %s%s) at %s",
+        SETTINGS.vector_dtype,
+        ", read-only" if read_only else "",
+        SETTINGS.vector_persist_dir,
+    )
+    return NumpyVectorStore(
+        numpy_store_dir(collection_name),
+        embeddings,
+        dtype=SETTINGS.vector_dtype,
+        ivf_min_rows=SETTINGS.vector_ivf_min_rows,
+        ivf_nprobe=SETTINGS.vector_ivf_nprobe,
+        read_only=read_only,
+        collection_name=collection_name,
+    )
+
+
+def _open_chroma(embeddings: Embeddings, collection_name: str) -> Chroma:
+    persist_dir = SETTINGS.vector_persist_dir
+    os.makedirs(persist_dir, exist_ok=True)
+    logger.info("Using local vector store (SQLite/Chroma) at %s", persist_dir)
+    return Chroma(
+        collection_name=collection_name,
+        embedding_function=embeddings,
+        persist_directory=persist_dir,
+    )
+
+
+def open_vectorstore(collection_name: Optional[str] = None, read_only: bool = False) -> AnyVectorStore:
+    """
+    Attaches to a collection (default: COLLECTION_NAME) without adding documents;
+    creates it if missing. Used by incremental ingestion, which adds and deletes chunks by ID.
+    read_only opens the NumPy store without write access (it must exist); Chroma and
+    PGVector are opened as usual.
+    """
+    embeddings = get_embeddings()
+    collection_name = collection_name or SETTINGS.collection_name
 
     if SETTINGS.use_postgres:
         try:
+            from langchain_community.vectorstores.pgvector import PGVector
+
             ensure_pgvector_extension(SETTINGS.database_url)
-            return PGVector.from_documents(
-                documents=chunks,
-                embedding=embeddings,
-                collection_name=SETTINGS.collection_name,
+            return PGVector(
                 connection_string=SETTINGS.database_url,
+                embedding_function=embeddings,
+                collection_name=collection_name,
             )
         except psycopg2.OperationalError as exc:
             logger.warning(
                 "Postgres unavailable (%s). Falling back to local vector store.",
                 exc,
             )
-            return _build_chroma(chunks, embeddings)
+            return _open_local_store(embeddings, collection_name, read_only)
 
-    return _build_chroma(chunks, embeddings)
+    return _open_local_store(embeddings, collection_name, read_only)
+
+
+def attach_vectorstore(reload: bool = False) -> Optional[AnyVectorStore]:
+    """
+    Opens the live collection left by an earlier ingest, without ingesting, so a new
+    process can serve /rag right away. Returns None when there is nothing complete to
+    attach to: no ingest manifest (it is written only once a collection is complete),
+    one for another collection or embedding model, or no local store files.
+    reload is for collections another process changed since this one opened them: Chroma
+    caches its index per process, so cached clients are dropped first. The store is only
+    read here (ingestion opens its own), so the NumPy store is opened read-only.
+    """
+    use_postgres = SETTINGS.use_postgres
+    manifest = load_manifest(use_postgres)
+    if manifest is None or not manifest.matches_settings() or not manifest.files:
+        return None
+    if not use_postgres:
+        if SETTINGS.vector_backend == "numpy":
+            present = os.path.isdir(numpy_store_dir(SETTINGS.collection_name))
+        else:
+            present = os.path.isfile(os.path.join(SETTINGS.vector_persist_dir, "chroma.sqlite3"))
+        if not present:
+            return None
+        if reload and SETTINGS.vector_backend != "numpy":
+            from chromadb.api.client import SharedSystemClient
+
+            SharedSystemClient.clear_system_cache()  # clients in use keep working
+    vectorstore = open_vectorstore(read_only=not use_postgres)
+    if use_postgres and not _is_pgvector(vectorstore):
+        return None  # Postgres went away after the manifest was read; do not serve an empty local store
+    return vectorstore
+
+
+def reset_vectorstore(vectorstore: AnyVectorStore) -> AnyVectorStore:
+    """Drops every vector in the collection and returns a store attached to the empty collection."""
+    if _is_pgvector(vectorstore):
+        logger.info("Resetting collection '%s'", vectorstore.collection_name)
+        drop_vector_index(SETTINGS.database_url, vectorstore.collection_name)
+        vectorstore.delete_collection()
+        vectorstore.create_collection()
+        return vectorstore
+    if isinstance(vectorstore, NumpyVectorStore):
+        logger.info("Resetting collection '%s'", vectorstore.collection_name)
+        vectorstore.drop()
+        return _open_numpy(vectorstore.embeddings, vectorstore.collection_name)
+    name = vectorstore._collection.name
+    logger.info("Resetting collection '%s'", name)
+    vectorstore.delete_collection()
+    return _open_chroma(vectorstore.embeddings, name)
+
+
+def promote_collection(staging: AnyVectorStore) -> AnyVectorStore:
+    """
+    Replaces the live collection with a fully built staging collection and returns a
+    store attached to it. Readers keep using the old collection until this swap, and
+    stores already attached to it keep working after it.
+    """
+    live_name = SETTINGS.collection_name
+    if _is_pgvector(staging):
+        optimize_vectorstore(staging)  # index built once, after the bulk load
+        rename_collection(SETTINGS.database_url, staging.collection_name, live_name)
+    elif isinstance(staging, NumpyVectorStore):
+        staging.optimize()
+        staging.close()
+        live_dir = numpy_store_dir(live_name)
+        retired_dir = f"{live_dir}.old"
+        shutil.rmtree(retired_dir, ignore_errors=True)
+        if os.path.isdir(live_dir):
+            os.rename(live_dir, retired_dir)
+        os.rename(staging.directory, live_dir)
+        shutil.rmtree(retired_dir, ignore_errors=True)
+    else:
+        # Renamed aside, not deleted: stores still attached to it (this process until the
+        # swap, followers until their next poll) query it by ID. Dropped at the next promotion.
+        retired_name = f"{live_name}__retired"
+        _drop_chroma_collection(staging, retired_name)
+        try:
+            staging._client.get_collection(live_name).modify(name=retired_name)
+        except Exception:
+            pass  # no live collection yet (ValueError or NotFoundError depending on chromadb version)
+        staging._collection.modify(name=live_name)
+    logger.info("Promoted rebuilt collection to '%s'", live_name)
+    return open_vectorstore()
+
+
+def _drop_chroma_collection(vectorstore: Chroma, name: str) -> None:
+    try:
+        vectorstore._client.delete_collection(name)
+    except Exception:
+        pass  # not there (ValueError or NotFoundError depending on chromadb version)
+
+
+def optimize_vectorstore(vectorstore: AnyVectorStore) -> None:
+    """
+    Post-ingest maintenance: brings the pgvector ANN index in line with PG_INDEX_TYPE, or
+    (re)builds the NumPy store's IVF index when due; no-op for Chroma.
+    """
+    if _is_pgvector(vectorstore):
+        ensure_vector_index(
+            SETTINGS.database_url,
+            vectorstore.collection_name,
+            _PG_DISTANCE_OPERATORS[vectorstore._distance_strategy],
+            SETTINGS.pg_index_type,
+            hnsw_m=SETTINGS.pg_hnsw_m,
+            hnsw_ef_construction=SETTINGS.pg_hnsw_ef_construction,
+        )
+    elif isinstance(vectorstore, NumpyVectorStore):
+        vectorstore.optimize()
+
+
+def vectorstore_backend(vectorstore: AnyVectorStore) -> str:
+    """Backend name used as a metrics label."""
+    if _is_pgvector(vectorstore):
+        return "pgvector"
+    if isinstance(vectorstore, NumpyVectorStore):
+        return "numpy"
+    return "chroma"
+
+
+def add_chunks(vectorstore: AnyVectorStore, chunks: Sequence[Document]) -> List[str]:
+    """Embeds and stores chunks under their metadata["chunk_id"]."""
+    if not chunks:
+        return []
+    ids = [chunk.metadata["chunk_id"] for chunk in chunks]
+    if _is_pgvector(vectorstore):
+        vectors = vectorstore.embeddings.embed_documents([chunk.page_content for chunk in chunks])
+        upsert_embeddings(vectorstore, chunks, vectors)
+        return ids
+    return vectorstore.add_documents(list(chunks), ids=ids)
+
+
+def upsert_embeddings(
+    vectorstore: AnyVectorStore,
+    chunks: Sequence[Document],
+    vectors: Sequence[Sequence[float]],
+) -> None:
+    """Stores pre-computed embeddings for chunks under their metadata["chunk_id"] (replacing existing IDs)."""
+    if not chunks:
+        return
+    ids = [chunk.metadata["chunk_id"] for chunk in chunks]
+    texts = [chunk.page_content for chunk in chunks]
+    metadatas = [chunk.metadata for chunk in chunks]
+    with VECTOR_UPSERT_SECONDS.labels(backend=vectorstore_backend(vectorstore)).time():
+        if _is_pgvector(vectorstore):
+            copy_embeddings(SETTINGS.database_url, vectorstore.collection_name, ids, texts, vectors, metadatas)
+        elif isinstance(vectorstore, NumpyVectorStore):
+            vectorstore.add_embeddings(texts, vectors, metadatas, ids)
+        else:
+            vectorstore._collection.upsert(
+                ids=ids,
+                embeddings=[list(v) for v in vectors],
+                metadatas=metadatas,
+                documents=texts,
+            )
+
+
+def delete_chunks(vectorstore: AnyVectorStore, chunk_ids: Sequence[str]) -> None:
+    for start in range(0, len(chunk_ids), _DELETE_BATCH_SIZE):
+        batch = list(chunk_ids[start:start + _DELETE_BATCH_SIZE])
+        if _is_pgvector(vectorstore):
+            delete_embeddings(SETTINGS.database_url, vectorstore.collection_name, batch)
+        else:
+            vectorstore.delete(ids=batch)
+
+
+def batch_similarity_search(
+    vectorstore: AnyVectorStore,
+    query_vectors: Sequence[Sequence[float]],
+    k: int,
+) -> List[List[Document]]:
+    """
+    Top-k chunks for many query embeddings at once, in input order: one multi-query
+    call for Chroma, one LATERAL-join round trip for PGVector (through its ANN index),
+    one matrix product for the NumPy store.
+    """
+    return [[doc for doc, _ in hits] for hits in _timed_batch_search(vectorstore, query_vectors, k, False)]
+
+
+def batch_similarity_search_with_vectors(
+    vectorstore: AnyVectorStore,
+    query_vectors: Sequence[Sequence[float]],
+    k: int,
+) -> List[List[Tuple[Document, np.ndarray]]]:
+    """
+    Like batch_similarity_search, with the stored embedding of each hit (returned by
+    the same query, so the hits need not be embedded again, e.g. for MMR).
+    """
+    return _timed_batch_search(vectorstore, query_vectors, k, True)
+
+
+def _timed_batch_search(
+    vectorstore: AnyVectorStore,
+    query_vectors: Sequence[Sequence[float]],
+    k: int,
+    with_vectors: bool,
+) -> List[List[Tuple[Document, Optional[np.ndarray]]]]:
+    if not query_vectors:
+        return []
+    with VECTOR_SEARCH_SECONDS.labels(backend=vectorstore_backend(vectorstore)).time():
+        return _batch_similarity_search(vectorstore, query_vectors, k, with_vectors)
+
+
+def _batch_similarity_search(
+    vectorstore: AnyVectorStore,
+    query_vectors: Sequence[Sequence[float]],
+    k: int,
+    with_vectors: bool,
+) -> List[List[Tuple[Document, Optional[np.ndarray]]]]:
+    if isinstance(vectorstore, NumpyVectorStore):
+        if with_vectors:
+            return vectorstore.batch_similarity_search_with_vectors(query_vectors, k)
+        hits = vectorstore.batch_similarity_search_with_score(query_vectors, k)
+        return [[(doc, None) for doc, _ in per_query] for per_query in hits]
+    if _is_pgvector(vectorstore):
+        rows = batch_nearest_chunks(
+            SETTINGS.database_url,
+            vectorstore.collection_name,
+            query_vectors,
+            k,
+            operator=_PG_DISTANCE_OPERATORS[vectorstore._distance_strategy],
+            ef_search=SETTINGS.pg_hnsw_ef_search,
+            probes=SETTINGS.pg_ivfflat_probes,
+            with_vectors=with_vectors,
+        )
+        return [[(Document(page_content=doc, metadata=meta), vec) for doc, meta, vec in hits] for hits in rows]
+
+    include = ["documents", "metadatas"] + (["embeddings"] if with_vectors else [])
+    result = vectorstore._collection.query(
+        query_embeddings=[list(v) for v in query_vectors],
+        n_results=k,
+        include=include,
+    )
+    embeddings = result["embeddings"] if with_vectors else [[None] * len(docs) for docs in result["documents"]]
+    return [
+        [
+            (Document(page_content=doc, metadata=meta or {}), _as_vector(vec))
+            for doc, meta, vec in zip(docs, metas, vecs)
+        ]
+        for docs, metas, vecs in zip(result["documents"], result["metadatas"], embeddings)
+    ]
+
+
+def _as_vector(vector: Any) -> Optional[np.ndarray]:
+    return None if vector is None else np.asarray(vector, dtype=np.float32)
+
+
+def get_chunks(vectorstore: AnyVectorStore, chunk_ids: Sequence[str]) -> Dict[str, Document]:
+    """Stored chunks by chunk ID (IDs not in the collection are left out)."""
+    if isinstance(vectorstore, NumpyVectorStore):
+        return vectorstore.get_by_ids(chunk_ids) if chunk_ids else {}
+    return {cid: doc for cid, (doc, _) in _get_chunks(vectorstore, chunk_ids, False).items()}
+
+
+def get_chunks_with_vectors(
+    vectorstore: AnyVectorStore,
+    chunk_ids: Sequence[str],
+) -> Dict[str, Tuple[Document, np.ndarray]]:
+    """Stored chunks by chunk ID together with their stored embeddings."""
+    if isinstance(vectorstore, NumpyVectorStore):
+        return vectorstore.get_by_ids_with_vectors(chunk_ids) if chunk_ids else {}
+    return _get_chunks(vectorstore, chunk_ids, True)
+
+
+def _get_chunks(
+    vectorstore: AnyVectorStore,
+    chunk_ids: Sequence[str],
+    with_vectors: bool,
+) -> Dict[str, Tuple[Document, Optional[np.ndarray]]]:
+    if not chunk_ids:
+        return {}
+    if _is_pgvector(vectorstore):
+        rows = fetch_chunks(SETTINGS.database_url, vectorstore.collection_name, chunk_ids, with_vectors=with_vectors)
+    else:
+        include = ["documents", "metadatas"] + (["embeddings"] if with_vectors else [])
+        result = vectorstore._collection.get(ids=list(chunk_ids), include=include)
+        embeddings = result["embeddings"] if with_vectors else [None] * len(result["ids"])
+        rows = zip(result["ids"], result["documents"], result["metadatas"], embeddings)
+    return {
+        cid: (Document(page_content=doc, metadata={**(meta or {}), "chunk_id": cid}), _as_vector(vec))
+        for cid, doc, meta, vec in rows
+    }
+
+
+def iter_collection_chunks(
+    vectorstore: AnyVectorStore,
+    batch_size: int = 1000,
+) -> Iterator[List[Document]]:
+    """Every stored chunk of the collection, in batches, with metadata["chunk_id"] set."""
+    if isinstance(vectorstore, NumpyVectorStore):
+        yield from vectorstore.iter_chunks(batch_size)
+        return
+    if _is_pgvector(vectorstore):
+        batches = iter_collection_rows(SETTINGS.database_url, vectorstore.collection_name, batch_size)
+    else:
+        def chroma_batches() -> Iterator[list]:
+            offset = 0
+            while True:
+                result = vectorstore._collection.get(
+                    include=["documents", "metadatas"], limit=batch_size, offset=offset
+                )
+                if not result["ids"]:
+                    return
+                yield list(zip(result["ids"], result["documents"], result["metadatas"]))
+                offset += len(result["ids"])
+
+        batches = chroma_batches()
+    for rows in batches:
+        yield [
+            Document(page_content=doc, metadata={**(meta or {}), "chunk_id": cid})
+            for cid, doc, meta in rows
+        ]
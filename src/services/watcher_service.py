@@ -0,0 +1,222 @@
+"""
+Continuous ingestion of DOCS_DIR (WATCH_DOCS). File events come from watchdog (inotify
+on Linux) when it is installed, otherwise from scanning the folder every
+WATCH_POLL_SECONDS. A changed file is ingested once its size and mtime have not changed
+for WATCH_DEBOUNCE_SECONDS, so scans still being written are not read half-way; the
+files that settle together are synced as one batch by the running process.
+Install with: pip install watchdog
+"""
+import os
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+try:
+    from watchdog.events import FileSystemEvent, FileSystemEventHandler
+    from watchdog.observers import Observer
+except ImportError:
+    Observer = None  # type: ignore[assignment,misc]
+    FileSystemEventHandler = object  # type: ignore[assignment,misc]
+
+from src.core.constants import APP_NAME, IMAGE_EXTENSIONS
+from src.core.logging import get_logger
+from src.core.metrics import WATCH_BATCHES, WATCH_INGEST_LAG_SECONDS, WATCH_LAG_SECONDS, WATCH_QUEUE_DEPTH
+from src.services.coordination_service import IngestLockBusy
+
+logger = get_logger(APP_NAME)
+
+# Events that can change a file; opening or reading one (as extraction does) is not a change
+_CHANGE_EVENTS = ("created", "modified", "deleted", "moved", "closed")
+
+_Signature = Optional[Tuple[int, int]]  # (size, mtime_ns); None when the file is gone
+
+
+def _is_supported(path: str) -> bool:
+    lower = os.path.basename(path).lower()
+    return lower.endswith(".pdf") or os.path.splitext(lower)[1] in IMAGE_EXTENSIONS
+
+
+def _signature(path: str) -> _Signature:
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_size, st.st_mtime_ns
+
+
+@dataclass
+class _Pending:
+    first_seen: float  # monotonic time of the first change not ingested yet
+    changed_at: float  # monotonic time the signature last changed
+    signature: _Signature
+
+
+class _EventHandler(FileSystemEventHandler):
+    def __init__(self, watcher: "DocsWatcher"):
+        super().__init__()
+        self.watcher = watcher
+
+    def on_any_event(self, event: "FileSystemEvent") -> None:
+        if event.is_directory or event.event_type not in _CHANGE_EVENTS:
+            return
+        self.watcher.notify(event.src_path)
+        dest_path = getattr(event, "dest_path", "")
+        if dest_path:
+            self.watcher.notify(dest_path)
+
+
+class DocsWatcher:
+    """
+    Watches the files directly in docs_dir (not subfolders, like ingestion) and calls
+    ingest(paths) on a daemon thread with the files that changed and settled. If
+    ingest raises IngestLockBusy, the files are retried on a later check; other
+    errors are logged and the files wait for their next change or a full ingest.
+    """
+
+    def __init__(
+        self,
+        docs_dir: str,
+        ingest: Callable[[List[str]], None],
+        debounce: float,
+        interval: float,
+        polling: bool = False,
+    ):
+        self.docs_dir = docs_dir
+        self.ingest = ingest
+        self.debounce = debounce
+        self.interval = interval
+        self.backend = "polling" if polling or Observer is None else "watchdog"
+        self._pending: Dict[str, _Pending] = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._observer: Any = None
+        self._snapshot: Dict[str, _Signature] = {}
+        self.batches = 0
+        self.files_ingested = 0
+        self.last_error: Optional[str] = None
+
+    def start(self) -> "DocsWatcher":
+        if self.backend == "watchdog":
+            self._observer = Observer()
+            self._observer.schedule(_EventHandler(self), self.docs_dir, recursive=False)
+            self._observer.start()
+        else:
+            self._snapshot = self._scan()
+        WATCH_QUEUE_DEPTH.set_function(self.queue_depth)
+        WATCH_LAG_SECONDS.set_function(self.lag_seconds)
+        self._thread = threading.Thread(target=self._run, name="docs-watcher", daemon=True)
+        self._thread.start()
+        logger.info("Watching %s for changes (%s)", self.docs_dir, self.backend)
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._observer is not None:
+            self._observer.stop()
+            self._observer.join(timeout=5)
+        if self._thread is not None:
+            self._thread.join()
+        WATCH_QUEUE_DEPTH.set_function(lambda: 0)
+        WATCH_LAG_SECONDS.set_function(lambda: 0)
+
+    def notify(self, path: str) -> None:
+        """Records a possible change of path (a file directly in docs_dir)."""
+        if os.path.dirname(os.path.abspath(path)) != os.path.abspath(self.docs_dir) or not _is_supported(path):
+            return
+        path = os.path.join(self.docs_dir, os.path.basename(path))  # as listed by ingestion
+        now = time.monotonic()
+        with self._lock:
+            pending = self._pending.get(path)
+            if pending is None:
+                self._pending[path] = _Pending(now, now, _signature(path))
+            else:
+                pending.changed_at = now
+
+    def queue_depth(self) -> int:
+        with self._lock:
+            return len(self._pending)
+
+    def lag_seconds(self) -> float:
+        """Age of the oldest change not ingested yet; 0 when there is none."""
+        with self._lock:
+            if not self._pending:
+                return 0.0
+            return time.monotonic() - min(p.first_seen for p in self._pending.values())
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "enabled": True,
+            "docs_dir": self.docs_dir,
+            "backend": self.backend,
+            "queue_depth": self.queue_depth(),
+            "lag_seconds": round(self.lag_seconds(), 3),
+            "batches": self.batches,
+            "files_ingested": self.files_ingested,
+            "last_error": self.last_error,
+        }
+
+    def _scan(self) -> Dict[str, _Signature]:
+        try:
+            names = os.listdir(self.docs_dir)
+        except OSError as exc:
+            logger.warning("Could not list %s. Error=%s", self.docs_dir, exc)
+            return self._snapshot
+        paths = (os.path.join(self.docs_dir, name) for name in names)
+        return {path: _signature(path) for path in paths if _is_supported(path) and os.path.isfile(path)}
+
+    def _poll(self) -> None:
+        snapshot = self._scan()
+        for path in snapshot.keys() | self._snapshot.keys():
+            if snapshot.get(path) != self._snapshot.get(path):
+                self.notify(path)
+        self._snapshot = snapshot
+
+    def _settled(self) -> List[str]:
+        """Takes the pending files whose size and mtime held for the debounce period."""
+        now = time.monotonic()
+        ready = []
+        with self._lock:
+            for path, pending in self._pending.items():
+                signature = _signature(path)
+                if signature != pending.signature:
+                    pending.signature = signature
+                    pending.changed_at = now
+                elif now - pending.changed_at >= self.debounce:
+                    ready.append(path)
+            return ready
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            if self.backend == "polling":
+                self._poll()
+            ready = self._settled()
+            if ready:
+                self._ingest(ready)
+
+    def _ingest(self, paths: List[str]) -> None:
+        with self._lock:
+            taken = {path: self._pending.pop(path) for path in paths}
+        try:
+            self.ingest(paths)
+        except IngestLockBusy as exc:
+            WATCH_BATCHES.labels(outcome="busy").inc()
+            logger.info("%s changed files wait for the running ingest: %s", len(paths), exc)
+            with self._lock:
+                for path, pending in taken.items():
+                    pending.first_seen = min(pending.first_seen, self._pending.get(path, pending).first_seen)
+                    self._pending[path] = pending  # changed again meanwhile: checked again anyway
+            return
+        except Exception as exc:
+            WATCH_BATCHES.labels(outcome="error").inc()
+            self.last_error = str(exc)
+            logger.exception("Could not ingest %s changed files", len(paths))
+            return
+        done = time.monotonic()
+        for pending in taken.values():
+            WATCH_INGEST_LAG_SECONDS.observe(done - pending.first_seen)
+        WATCH_BATCHES.labels(outcome="ingested").inc()
+        self.batches += 1
+        self.files_ingested += len(paths)
+        self.last_error = None
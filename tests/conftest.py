@@ -0,0 +1,41 @@
+import dataclasses
+import os
+import sys
+
+import pytest
+
+# Settings are read at import time: keep the tests off Postgres, OpenAI and the shared caches
+os.environ.setdefault("OPENAI_API_KEY", "test")
+os.environ["DATABASE_URL"] = ""
+os.environ["EMBEDDING_CACHE_PATH"] = ""
+os.environ["OCR_CACHE_DIR"] = ""
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from langchain_core.documents import Document  # noqa: E402
+from langchain_core.embeddings import DeterministicFakeEmbedding  # noqa: E402
+
+
+@pytest.fixture
+def embeddings() -> DeterministicFakeEmbedding:
+    return DeterministicFakeEmbedding(size=16)
+
+
+@pytest.fixture
+def settings(monkeypatch, tmp_path):
+    """Replaces SETTINGS in the given modules with a copy using tmp_path and the given overrides."""
+    from src.models import SETTINGS
+
+    def apply(*modules, **overrides):
+        patched = dataclasses.replace(SETTINGS, vector_persist_dir=str(tmp_path / "vectors"), **overrides)
+        for module in modules:
+            monkeypatch.setattr(module, "SETTINGS", patched)
+        return patched
+
+    return apply
+
+
+def make_chunk(chunk_id: str, text: str = "", source: str = "a.pdf", page: int = 1) -> Document:
+    return Document(
+        page_content=text or f"text of {chunk_id}",
+        metadata={"source": source, "page": page, "used_ocr": False, "chunk_id": chunk_id},
+    )
@@ -0,0 +1,72 @@
+import pytest
+
+from src.services.answer_cache_service import AnswerCache
+
+SCOPE = (4, "lexical")
+
+
+def _cache(similarity: float = 0.0) -> AnswerCache:
+    return AnswerCache(max_entries=10, ttl_seconds=60, similarity_threshold=similarity)
+
+
+def test_exact_lookup_counts_misses_when_similarity_is_disabled():
+    cache = _cache()
+    assert cache.get("Who pays the rent?", SCOPE) is None
+    cache.put("Who pays the rent?", SCOPE, {"answer": "the tenant"})
+    assert cache.get("who pays the rent", SCOPE) == {"answer": "the tenant"}
+    assert cache.get("Who pays the deposit?", SCOPE) is None
+    assert cache.get_similar([1.0, 0.0], SCOPE) is None  # disabled: no lookup, no second miss
+
+    stats = cache.stats()
+    assert (stats["exact_hits"], stats["misses"], stats["hit_rate"]) == (1, 2, pytest.approx(1 / 3, abs=1e-4))
+
+
+def test_similarity_lookup_counts_one_miss_per_question():
+    cache = _cache(similarity=0.9)
+    cache.put("Who pays the rent?", SCOPE, {"answer": "the tenant"}, vector=[1.0, 0.0])
+
+    assert cache.get("Who must pay the rent?", SCOPE) is None
+    assert cache.get_similar([0.99, 0.05], SCOPE) == {"answer": "the tenant"}
+    assert cache.get("When does the lease end?", SCOPE) is None
+    assert cache.get_similar([0.0, 1.0], SCOPE) is None
+
+    stats = cache.stats()
+    assert (stats["exact_hits"], stats["similar_hits"], stats["misses"]) == (0, 1, 1)
+
+
+def test_answers_computed_before_a_clear_are_not_stored():
+    cache = _cache()
+    generation = cache.generation
+    cache.clear()  # e.g. a re-ingest finished while the answer was being generated
+    cache.put("Who pays the rent?", SCOPE, {"answer": "stale"}, generation=generation)
+    assert cache.get("Who pays the rent?", SCOPE) is None
+
+    cache.put("Who pays the rent?", SCOPE, {"answer": "fresh"}, generation=cache.generation)
+    assert cache.get("Who pays the rent?", SCOPE) == {"answer": "fresh"}
+
+
+def test_clear_drops_entries_and_embeddings():
+    cache = _cache(similarity=0.9)
+    cache.put("Who pays the rent?", SCOPE, {"answer": "the tenant"}, vector=[1.0, 0.0])
+    cache.clear()
+    assert cache.get_similar([1.0, 0.0], SCOPE) is None
+    assert cache.stats()["entries"] == 0
+
+
+def test_scopes_expiry_and_lru_eviction(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr("src.services.answer_cache_service.time.time", lambda: now[0])
+    cache = AnswerCache(max_entries=2, ttl_seconds=60, similarity_threshold=0.9)
+    cache.put("q1", SCOPE, {"answer": 1}, vector=[1.0, 0.0])
+    cache.put("q2", SCOPE, {"answer": 2}, vector=[0.0, 1.0])
+    assert cache.get("q1", (8, "lexical")) is None  # other scope
+    assert cache.get("q1", SCOPE) == {"answer": 1}  # q1 is now the most recently used
+
+    cache.put("q3", SCOPE, {"answer": 3}, vector=[0.7, 0.7])
+    assert cache.get_similar([0.0, 1.0], SCOPE) is None  # q2 evicted, with its embedding
+    assert cache.get_similar([1.0, 0.05], SCOPE) == {"answer": 1}
+
+    now[0] += 61
+    assert cache.get("q3", SCOPE) is None
+    assert cache.get_similar([1.0, 0.05], SCOPE) is None
+    assert cache.stats()["entries"] == 0
@@ -0,0 +1,60 @@
+import pytest
+
+from src.services.dedup_service import DedupIndex, DedupStats
+
+from conftest import make_chunk
+
+CLAUSE = (
+    "The tenant shall pay the monthly rent of five thousand reais to the landlord by the fifth "
+    "business day of each month, by bank transfer to the account informed in writing"
+)
+
+
+@pytest.fixture
+def index(tmp_path):
+    index = DedupIndex(str(tmp_path / "docs.dedup.sqlite"), threshold=0.8)
+    index.begin("docs")
+    yield index
+    index.close()
+
+
+def test_near_duplicates_collapse_into_the_first_chunk(index):
+    stats = DedupStats()
+    kept = index.add(
+        [
+            make_chunk("v1", CLAUSE, source="v1.pdf"),
+            make_chunk("v2", CLAUSE + ".", source="v2.pdf"),
+            make_chunk("other", "The landlord pays the property tax and the building insurance every year"),
+        ],
+        stats,
+    )
+    assert [c.metadata["chunk_id"] for c in kept] == ["v1", "other"]
+    assert (stats.chunks_seen, stats.duplicates) == (3, 1)
+    assert [source for source, _, _ in index.sources(["v1"])["v1"]] == ["v1.pdf", "v2.pdf"]
+
+
+def test_release_deletes_a_stored_vector_only_with_its_last_member(index):
+    index.add([make_chunk("v1", CLAUSE), make_chunk("v2", CLAUSE), make_chunk("v3", CLAUSE)])
+
+    assert index.release(["v1"]) == []  # stored chunk, still standing for v2 and v3
+    assert index.release(["v3", "untracked"]) == ["untracked"]
+    assert index.release(["v2"]) == ["v1"]
+    assert index.sources(["v1"]) == {}
+
+    # The group is gone: the same text is stored again
+    assert [c.metadata["chunk_id"] for c in index.add([make_chunk("v4", CLAUSE)])] == ["v4"]
+
+
+def test_close_without_commit_discards_the_run(tmp_path):
+    path = str(tmp_path / "docs.dedup.sqlite")
+    index = DedupIndex(path)
+    index.begin("docs")
+    index.add([make_chunk("a", CLAUSE)])
+    index.commit()
+    index.begin("docs")
+    index.release(["a"])
+    index.close()
+
+    reopened = DedupIndex(path)
+    assert list(reopened.sources(["a"])) == ["a"]
+    reopened.close()
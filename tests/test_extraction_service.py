@@ -0,0 +1,20 @@
+import pytest
+
+from src.services.extraction_service import OCR_ENGINES, OcrEngine
+
+
+def test_engine_without_image_to_string_fails_when_created():
+    class VersionOnly(OcrEngine):
+        name = "version-only"
+
+        @staticmethod
+        def version() -> str:
+            return "0"
+
+    with pytest.raises(TypeError):
+        VersionOnly("eng")
+
+
+def test_registered_engines_are_complete():
+    for engine_cls in OCR_ENGINES.values():
+        assert not engine_cls.__abstractmethods__
@@ -0,0 +1,58 @@
+from src.services.lexical_index_service import LexicalIndex, LexicalIndexBuilder, tokenize
+
+from conftest import make_chunk
+
+
+def _ids(index: LexicalIndex, query: str, k: int = 10):
+    return [cid for cid, _ in index.search(query, k)]
+
+
+def _build(path, chunks, base=None, removed=()):
+    builder = LexicalIndexBuilder(base)
+    builder.remove(removed)
+    builder.add(chunks)
+    return builder.write(str(path), "docs")
+
+
+def test_search_ranks_exact_identifiers(tmp_path):
+    index = _build(tmp_path / "i.bm25", [
+        make_chunk("a", "Clause 12.3: the tenant pays the rent monthly"),
+        make_chunk("b", "CNPJ 12.345.678/0001-90 is the landlord"),
+        make_chunk("c", "the landlord pays property taxes"),
+    ])
+    assert index.n_docs == 3
+    assert _ids(index, "who pays the rent", 1) == ["a"]
+    assert _ids(index, "12.345.678/0001-90", 1) == ["b"]
+    assert _ids(index, "nothing matches zzz") == []
+
+
+def test_merge_removes_replaces_and_adds_chunks(tmp_path):
+    base = _build(tmp_path / "base.bm25", [
+        make_chunk("a", "rent is due monthly"),
+        make_chunk("b", "deposit returned at the end"),
+        make_chunk("c", "late rent incurs a penalty"),
+    ])
+    merged = _build(
+        tmp_path / "merged.bm25",
+        [make_chunk("c", "late payment of the deposit incurs interest"), make_chunk("d", "rent increases yearly")],
+        base=base,
+        removed=["a"],
+    )
+
+    assert sorted(merged.chunk_ids.astype(str)) == ["b", "c", "d"]
+    assert sorted(_ids(merged, "rent")) == ["d"]
+    assert sorted(_ids(merged, "deposit")) == ["b", "c"]
+    assert _ids(merged, "penalty") == []
+    kept = ["deposit returned at the end", "late payment of the deposit incurs interest", "rent increases yearly"]
+    assert merged.avgdl == sum(len(tokenize(t)) for t in kept) / 3
+
+    reloaded = LexicalIndex.load(str(tmp_path / "merged.bm25"))
+    assert sorted(_ids(reloaded, "deposit")) == ["b", "c"]
+    assert sorted(_ids(base, "rent")) == ["a", "c"]  # the base file is not modified
+
+
+def test_removing_every_chunk_writes_an_empty_index(tmp_path):
+    base = _build(tmp_path / "base.bm25", [make_chunk("a", "rent")])
+    empty = _build(tmp_path / "empty.bm25", [], base=base, removed=["a"])
+    assert empty.n_docs == 0
+    assert empty.search("rent", 5) == []
@@ -0,0 +1,63 @@
+import os
+
+from src.services.manifest_service import FileRecord, IngestManifest, file_sha256
+
+
+def _write(path, content: bytes, mtime: float = 1_000_000.0) -> str:
+    path.write_bytes(content)
+    os.utime(path, (mtime, mtime))
+    return str(path)
+
+
+def _record(path: str, chunk_ids) -> FileRecord:
+    st = os.stat(path)
+    return FileRecord(path=path, size=st.st_size, mtime=st.st_mtime, sha256=file_sha256(path), chunk_ids=list(chunk_ids))
+
+
+def _manifest(*records: FileRecord) -> IngestManifest:
+    return IngestManifest("docs", "model", files={rec.path: rec for rec in records})
+
+
+def test_diff_classifies_new_changed_touched_unchanged_and_deleted(tmp_path):
+    unchanged = _write(tmp_path / "unchanged.pdf", b"same")
+    touched = _write(tmp_path / "touched.pdf", b"touched")
+    changed = _write(tmp_path / "changed.pdf", b"old")
+    deleted = _write(tmp_path / "deleted.pdf", b"gone")
+    manifest = _manifest(
+        _record(unchanged, ["u1"]), _record(touched, ["t1"]), _record(changed, ["c1", "c2"]), _record(deleted, ["d1"])
+    )
+    os.remove(deleted)
+    _write(tmp_path / "touched.pdf", b"touched", mtime=2_000_000.0)
+    _write(tmp_path / "changed.pdf", b"new content", mtime=2_000_000.0)
+    new = _write(tmp_path / "new.pdf", b"new")
+
+    diff = manifest.diff([unchanged, touched, changed, new])
+
+    assert list(diff.to_process) == [changed, new]
+    assert diff.to_process[changed].sha256 == file_sha256(changed)
+    assert diff.unchanged == 2
+    assert [rec.path for rec in diff.stale] == [changed]
+    assert [rec.path for rec in diff.deleted] == [deleted]
+    assert diff.stale_chunk_ids == ["c1", "c2", "d1"]
+    assert manifest.files[touched].mtime == 2_000_000.0  # refreshed, so the hash is skipped next time
+
+
+def test_diff_with_scope_only_reports_scoped_deletions(tmp_path):
+    kept = _write(tmp_path / "kept.pdf", b"kept")
+    removed = _write(tmp_path / "removed.pdf", b"removed")
+    outside = _write(tmp_path / "outside.pdf", b"outside")
+    manifest = _manifest(_record(kept, ["k"]), _record(removed, ["r"]), _record(outside, ["o"]))
+    os.remove(removed)
+
+    diff = manifest.diff([kept], scope={kept, removed})
+
+    assert diff.to_process == {}
+    assert [rec.path for rec in diff.deleted] == [removed]
+    assert diff.stale_chunk_ids == ["r"]
+
+
+def test_round_trip_keeps_records_and_dedup_flag(tmp_path):
+    path = _write(tmp_path / "a.pdf", b"a")
+    manifest = _manifest(_record(path, ["a1"]))
+    manifest.deduplicated = True
+    assert IngestManifest.from_dict(manifest.to_dict()) == manifest
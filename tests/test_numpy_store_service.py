@@ -0,0 +1,130 @@
+import numpy as np
+import pytest
+
+from src.services.numpy_store_service import NumpyVectorStore
+
+DIM = 8
+
+
+def _vectors(n: int, seed: int = 0) -> np.ndarray:
+    return np.random.default_rng(seed).standard_normal((n, DIM)).astype(np.float32)
+
+
+def _open(tmp_path, embeddings, **kwargs) -> NumpyVectorStore:
+    return NumpyVectorStore(str(tmp_path / "docs.vecs"), embeddings, **kwargs)
+
+
+def _add(store: NumpyVectorStore, ids, vectors) -> None:
+    store.add_embeddings([f"text {cid}" for cid in ids], vectors, [{"source": f"{cid}.pdf"} for cid in ids], ids)
+
+
+def _top_id(store: NumpyVectorStore, vector) -> str:
+    return store.batch_similarity_search_with_score([vector], 1)[0][0][0].metadata["chunk_id"]
+
+
+@pytest.mark.parametrize("dtype", ["float32", "float16", "int8"])
+def test_search_finds_each_stored_vector(tmp_path, embeddings, dtype):
+    store = _open(tmp_path, embeddings, dtype=dtype)
+    vectors = _vectors(20)
+    _add(store, [f"c{i}" for i in range(20)], vectors)
+
+    for i, vector in enumerate(vectors):
+        doc, score = store.batch_similarity_search_with_score([vector], 1)[0][0]
+        assert doc.metadata == {"source": f"c{i}.pdf", "chunk_id": f"c{i}"}
+        assert score == pytest.approx(1.0, abs=0.02)
+    assert store.collection_name == "docs"
+
+
+def test_upsert_overwrites_in_place(tmp_path, embeddings):
+    store = _open(tmp_path, embeddings)
+    vectors = _vectors(3)
+    _add(store, ["a", "b", "c"], vectors)
+    _add(store, ["a"], vectors[2:3] * -1)
+
+    assert store.count() == 3
+    assert _top_id(store, -vectors[2]) == "a"
+    assert store.get_by_ids(["a"])["a"].page_content == "text a"
+
+
+def test_deleted_rows_are_reused(tmp_path, embeddings):
+    store = _open(tmp_path, embeddings)
+    vectors = _vectors(5)
+    _add(store, [f"c{i}" for i in range(4)], vectors[:4])
+    capacity = store._capacity()
+    row = store._rows_for_ids(["c1"])["c1"]
+
+    store.delete(["c1"])
+    assert store.count() == 3
+    assert "c1" not in store.get_by_ids(["c1"])
+    assert all(doc.metadata["chunk_id"] != "c1" for doc, _ in store.batch_similarity_search_with_score([vectors[1]], 4)[0])
+
+    _add(store, ["new"], vectors[4:5])
+    assert store._rows_for_ids(["new"])["new"] == row
+    assert store._capacity() == capacity
+    assert _top_id(store, vectors[4]) == "new"
+
+
+def test_reopen_keeps_vectors_and_creation_dtype(tmp_path, embeddings):
+    store = _open(tmp_path, embeddings, dtype="int8")
+    vectors = _vectors(10)
+    _add(store, [f"c{i}" for i in range(10)], vectors)
+    store.close()
+
+    reopened = _open(tmp_path, embeddings, dtype="float32")
+    assert reopened.dtype == "int8"
+    assert reopened.count() == 10
+    assert _top_id(reopened, vectors[7]) == "c7"
+    stored = reopened.row_vectors([reopened._rows_for_ids(["c7"])["c7"]])
+    unit = vectors[7] / np.linalg.norm(vectors[7])
+    assert float(next(iter(stored.values())) @ unit) == pytest.approx(1.0, abs=0.01)
+
+
+def test_ivf_index_is_built_and_dropped(tmp_path, embeddings):
+    store = _open(tmp_path, embeddings, ivf_min_rows=50, ivf_nprobe=4)
+    vectors = _vectors(200)
+    _add(store, [f"c{i}" for i in range(200)], vectors)
+    store.optimize()
+    assert store._has_ivf
+
+    fresh = _vectors(1, seed=1)
+    _add(store, ["fresh"], fresh)  # not in the IVF lists yet, still searched
+    assert _top_id(store, fresh[0]) == "fresh"
+    assert _top_id(store, vectors[123]) == "c123"
+
+    store.delete([f"c{i}" for i in range(180)])
+    store.optimize()
+    assert not store._has_ivf
+    assert _top_id(store, vectors[190]) == "c190"
+
+
+def test_read_only_store_reads_and_refuses_writes(tmp_path, embeddings):
+    writer = _open(tmp_path, embeddings)
+    vectors = _vectors(4)
+    _add(writer, ["a", "b", "c", "d"], vectors)
+
+    reader = _open(tmp_path, embeddings, read_only=True)
+    assert reader.count() == 4
+    assert _top_id(reader, vectors[2]) == "c"
+    for write in (
+        lambda: _add(reader, ["e"], vectors[:1]),
+        lambda: reader.delete(["a"]),
+        reader.optimize,
+        reader.drop,
+    ):
+        with pytest.raises(PermissionError):
+            write()
+    assert writer.count() == 4
+
+
+def test_read_only_store_must_exist(tmp_path, embeddings):
+    with pytest.raises(Exception):
+        _open(tmp_path, embeddings, read_only=True)
+    assert not (tmp_path / "docs.vecs").exists()
+
+
+def test_drop_removes_the_directory(tmp_path, embeddings):
+    store = _open(tmp_path, embeddings)
+    _add(store, ["a"], _vectors(1))
+    store.drop()
+    assert not (tmp_path / "docs.vecs").exists()
+    assert _open(tmp_path, embeddings).count() == 0
@@ -0,0 +1,18 @@
+import numpy as np
+
+from src.services.context_service import mmr_select, rank_relevance
+from src.services.rag_service import reciprocal_rank_fusion
+
+
+def test_rrf_favours_items_ranked_by_both_lists():
+    fused = reciprocal_rank_fusion([["a", "b", "c"], ["c", "d", "a"]], k=60)
+    assert fused[:2] == ["a", "c"]
+    assert set(fused) == {"a", "b", "c", "d"}
+
+
+def test_mmr_skips_near_duplicates_of_picked_items():
+    rng = np.random.default_rng(0)
+    a, b = rng.standard_normal(8), rng.standard_normal(8)
+    candidates = np.stack([a, a + 0.01 * rng.standard_normal(8), a + 0.02 * rng.standard_normal(8), b])
+    assert list(mmr_select(candidates, np.array([1.0, 0.99, 0.98, 0.5]), 2, 0.7)) == [0, 3]
+    assert sorted(mmr_select(candidates, rank_relevance(4), 4, 0.7)) == [0, 1, 2, 3]
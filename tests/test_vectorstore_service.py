@@ -0,0 +1,78 @@
+import os
+
+import numpy as np
+import pytest
+
+from src.services import vectorstore_service as vss
+
+from conftest import make_chunk
+
+
+def _use_numpy(settings, monkeypatch, embeddings):
+    settings(vss, vector_backend="numpy")
+    monkeypatch.setattr(vss, "_embeddings", embeddings)
+
+
+def test_numpy_store_name_excludes_directory_suffix(settings, monkeypatch, embeddings):
+    _use_numpy(settings, monkeypatch, embeddings)
+    store = vss.open_vectorstore("docs")
+    assert store.collection_name == "docs"
+    assert store.directory == vss.numpy_store_dir("docs")
+
+
+def test_rebuild_over_leftover_staging_promotes_only_new_chunks(settings, monkeypatch, embeddings):
+    _use_numpy(settings, monkeypatch, embeddings)
+    live = vss.open_vectorstore()
+    vss.add_chunks(live, [make_chunk("old")])
+
+    # An aborted earlier rebuild left rows in the staging collection
+    leftover = vss.open_vectorstore(vss.staging_collection_name())
+    vss.add_chunks(leftover, [make_chunk("stale")])
+    leftover.close()
+
+    staging = vss.reset_vectorstore(vss.open_vectorstore(vss.staging_collection_name()))
+    assert staging.directory == vss.numpy_store_dir(vss.staging_collection_name())
+    assert staging.count() == 0
+    vss.add_chunks(staging, [make_chunk("new1"), make_chunk("new2")])
+
+    promoted = vss.promote_collection(staging)
+    assert promoted.collection_name == vss.SETTINGS.collection_name
+    assert set(vss.get_chunks(promoted, ["old", "stale", "new1", "new2"])) == {"new1", "new2"}
+    assert sorted(os.listdir(vss.SETTINGS.vector_persist_dir)) == [os.path.basename(promoted.directory)]
+
+
+def test_chroma_promotion_keeps_the_old_collection_readable(settings, monkeypatch, embeddings):
+    settings(vss, vector_backend="chroma")
+    monkeypatch.setattr(vss, "_embeddings", embeddings)
+    live = vss.open_vectorstore()
+    vss.add_chunks(live, [make_chunk("old")])
+
+    staging = vss.reset_vectorstore(vss.open_vectorstore(vss.staging_collection_name()))
+    vss.add_chunks(staging, [make_chunk("new")])
+    promoted = vss.promote_collection(staging)
+
+    # The store served until the swap still answers from the old collection
+    assert [d.metadata["chunk_id"] for d in live.similarity_search("text of old", k=1)] == ["old"]
+    assert set(vss.get_chunks(promoted, ["old", "new"])) == {"new"}
+
+    # The next promotion drops the retired collection
+    staging = vss.reset_vectorstore(vss.open_vectorstore(vss.staging_collection_name()))
+    vss.add_chunks(staging, [make_chunk("newer")])
+    promoted = vss.promote_collection(staging)
+    names = {c.name for c in promoted._client.list_collections()}
+    assert names == {vss.SETTINGS.collection_name, f"{vss.SETTINGS.collection_name}__retired"}
+    assert set(vss.get_chunks(promoted, ["new", "newer"])) == {"newer"}
+
+
+def test_search_and_lookup_return_the_stored_vectors(settings, monkeypatch, embeddings):
+    _use_numpy(settings, monkeypatch, embeddings)
+    store = vss.open_vectorstore()
+    vss.add_chunks(store, [make_chunk("a"), make_chunk("b")])
+    expected = np.asarray(embeddings.embed_documents(["text of a"])[0])
+    expected /= np.linalg.norm(expected)
+
+    (doc, vector), = vss.batch_similarity_search_with_vectors(store, [expected], 1)[0][:1]
+    assert doc.metadata["chunk_id"] == "a"
+    assert vector @ expected == pytest.approx(1.0, abs=1e-5)
+    doc, vector = vss.get_chunks_with_vectors(store, ["a", "missing"])["a"]
+    assert vector @ expected == pytest.approx(1.0, abs=1e-5)